@@ -0,0 +1,37 @@
+# app/api/auth.py
+from __future__ import annotations
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# служебные эндпоинты (выгрузки, метрики, профилирование) — по токену в заголовке
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+# отдельный токен для скрейпа /metrics — чтобы Prometheus не держал админский
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def _bearer(authorization: Optional[str]) -> Optional[str]:
+    scheme, _, token = (authorization or "").partition(" ")
+    return token if scheme.lower() == "bearer" else None
+
+
+def require_admin(authorization: Optional[str] = Header(default=None)) -> None:
+    """Dependency: `Authorization: Bearer <ADMIN_API_TOKEN>`; без настроенного токена эндпоинты закрыты."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="not found")
+    token = _bearer(authorization)
+    if token is None or not hmac.compare_digest(token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="bad token")
+
+
+def require_metrics(authorization: Optional[str] = Header(default=None)) -> None:
+    """Dependency для /metrics: Bearer METRICS_TOKEN или админский токен; без обоих — закрыто."""
+    tokens = [t for t in (METRICS_TOKEN, ADMIN_API_TOKEN) if t]
+    if not tokens:
+        raise HTTPException(status_code=404, detail="not found")
+    token = _bearer(authorization)
+    if token is None or not any(hmac.compare_digest(token, t) for t in tokens):
+        raise HTTPException(status_code=401, detail="bad token")
@@ -0,0 +1,29 @@
+# app/api/export.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.api.auth import require_admin
+from app.db.export import MEDIA_TYPES, iter_export
+
+router = APIRouter(prefix="/export", dependencies=[Depends(require_admin)])
+
+
+@router.get("/dreams")
+def export_dreams(fmt: Literal["csv", "jsonl", "html"] = "jsonl", user_id: Optional[int] = None):
+    """
+    Потоковая выгрузка снов (все пользователи или один user_id).
+    Синхронный генератор Starlette крутит в threadpool — event loop не блокируется,
+    а в памяти держится одна пачка строк.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    name = f"dreams-{user_id or 'all'}-{stamp}.{fmt}"
+    return StreamingResponse(
+        iter_export(fmt, user_id),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
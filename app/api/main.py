@@ -1,8 +1,42 @@
 from __future__ import annotations
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Dream Assistant API")
+from fastapi import Depends, FastAPI, Response
+
+from app.api import export, profiling, usage, webhook
+from app.api.auth import require_metrics
+from app.core.metrics import render_latest
+
+# polling (бот — отдельный процесс app.bot.main) | webhook (апдейты принимает этот сервис)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if BOT_MODE == "webhook":
+        await webhook.startup()
+    try:
+        yield
+    finally:
+        if BOT_MODE == "webhook":
+            await webhook.shutdown()
+
+
+app = FastAPI(title="Dream Assistant API", lifespan=lifespan)
+app.include_router(webhook.router)
+app.include_router(export.router)
+app.include_router(usage.router)
+app.include_router(profiling.router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+# сервис публичный (в webhook-режиме на нём же апдейты Telegram) — метрики только по токену
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics)])
+def metrics():
+    # Prometheus text format; в webhook-режиме здесь же метрики хэндлеров бота
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,55 @@
+# app/api/profiling.py
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.auth import require_admin
+from app.core.profiling import (
+    PROFILE_INTERVAL_MS,
+    PROFILE_MAX_SECONDS,
+    ProfilerBusy,
+    list_captures,
+    profile,
+    read_capture,
+)
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000),
+    idle: bool = False,
+):
+    """
+    Сэмплирует этот процесс (в webhook-режиме — вместе с ботом) `seconds` секунд.
+    Ответ — folded-стеки: `flamegraph.pl profile.folded > profile.svg` или speedscope.
+    """
+    try:
+        folded = await asyncio.to_thread(profile, seconds, interval_ms=interval_ms, idle=idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="profiling is already running")
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.folded"'},
+    )
+
+
+@router.get("/slow-updates")
+def slow_updates(limit: int = Query(50, ge=1, le=1000)):
+    """Снимки медленных апдейтов (SLOW_UPDATE_MS), новые первыми."""
+    return {"captures": list_captures()[:limit]}
+
+
+@router.get("/slow-updates/{name}")
+def slow_update(name: str):
+    capture = read_capture(name)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="not found")
+    return capture
@@ -0,0 +1,32 @@
+# app/api/usage.py
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.auth import require_admin
+from app.db.llm_usage import daily_usage
+
+router = APIRouter(prefix="/usage", dependencies=[Depends(require_admin)])
+
+MAX_DAYS = 366
+
+
+@router.get("/llm/daily")
+def llm_usage_daily(since: Optional[date] = None, until: Optional[date] = None, feature: Optional[str] = None):
+    """
+    Дневные итоги журнала LLM: вызовы, ошибки, токены, задержки (p50/p95)
+    по фиче/модели/кэшу. Данные обновляются раз в час (app.jobs.llm_usage).
+    """
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=30)
+    if since > until or (until - since).days > MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"since..until must be an ordered range of at most {MAX_DAYS} days")
+    rows = daily_usage(since, until, feature)
+    totals = {
+        k: sum(r[k] for r in rows)
+        for k in ("calls", "errors", "prompt_tokens", "completion_tokens")
+    }
+    return {"since": since, "until": until, "totals": totals, "days": rows}
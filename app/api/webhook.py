@@ -0,0 +1,157 @@
+# app/api/webhook.py
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, Header, HTTPException, Request
+from loguru import logger
+
+# публичный https-адрес сервиса без пути, например https://dreambot.example.com
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# сколько апдейтов держим в памяти процесса (делится между шардами);
+# переполнение -> 503, Telegram повторит доставку
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# = число шардов: долгий LLM-вызов держит только свой шард, поэтому их с запасом
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+# параллельных HTTPS-доставок от Telegram. 1 — апдейты приходят строго по одному
+# и встают в очереди в порядке update_id (ответ мгновенный — после put_nowait,
+# так что пропускную способность это почти не режет). Больше 1 — два апдейта
+# одного чата могут прийти одновременно и встать в очередь в обратном порядке.
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "1"))
+
+router = APIRouter()
+
+
+def _shard_key(update: Update) -> int:
+    """Чат (или пользователь) апдейта — по нему апдейты одного чата идут в одну очередь."""
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else update.update_id
+
+
+class WebhookRuntime:
+    """
+    Bot + Dispatcher процесса и ограниченные очереди апдейтов.
+    Очереди шардированы по чату: у каждой один воркер, поэтому апдейты одного
+    чата внутри процесса обрабатываются в том порядке, в каком пришли.
+
+    Порядок апдейтов чата гарантирован только при одном webhook-процессе и
+    WEBHOOK_MAX_CONNECTIONS=1. При нескольких воркерах uvicorn/репликах лок чата
+    в Redis (app.bot.fsm) лишь не даёт обрабатывать их одновременно: кто первым
+    взял лок, тот и идёт, и два апдейта одного чата из разных процессов могут
+    выполниться в обратном порядке.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, *, queue_size: int, workers: int) -> None:
+        self.bot = bot
+        self.dp = dp
+        per_shard = max(1, queue_size // max(1, workers))
+        self.queues: List[asyncio.Queue[Update]] = [asyncio.Queue(maxsize=per_shard) for _ in range(max(1, workers))]
+        self._tasks: List[asyncio.Task] = []
+
+    def put_nowait(self, update: Update) -> None:
+        """asyncio.QueueFull, если шард чата переполнен."""
+        self.queues[_shard_key(update) % len(self.queues)].put_nowait(update)
+
+    def qsize(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+    async def _worker(self, queue: asyncio.Queue[Update]) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                logger.exception("[webhook] update {} failed", update.update_id)
+            finally:
+                queue.task_done()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self.queues]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues)), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("[webhook] {} updates dropped on shutdown", self.qsize())
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+_runtime: Optional[WebhookRuntime] = None
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+async def startup() -> None:
+    global _runtime, _scheduler_task
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET is required in webhook mode")
+
+    # ленивый импорт: в режиме polling API не тянет за собой весь бот
+    from app.bot.main import build_bot, build_dispatcher, start_scheduler
+    from app.db.write_behind import writer
+
+    bot = build_bot()
+    dp = build_dispatcher()
+    writer.start()
+    _runtime = WebhookRuntime(bot, dp, queue_size=WEBHOOK_QUEUE_SIZE, workers=WEBHOOK_WORKERS)
+    _runtime.start()
+    _scheduler_task = start_scheduler(bot)
+
+    if WEBHOOK_URL:
+        # каждый воркер uvicorn вызывает это при старте — операция идемпотентная
+        await bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+    logger.info("[webhook] ready path={} workers={} queue={}", WEBHOOK_PATH, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE)
+
+
+async def shutdown() -> None:
+    global _runtime, _scheduler_task
+    if _scheduler_task:
+        _scheduler_task.cancel()
+        _scheduler_task = None
+    if _runtime:
+        await _runtime.stop()
+        # после дренажа очередей — дописать накопленные строки
+        from app.db.write_behind import writer
+        await writer.stop()
+        await _runtime.bot.session.close()
+        await _runtime.dp.storage.close()
+        await _runtime.dp.fsm.events_isolation.close()
+        _runtime = None
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+):
+    if _runtime is None:
+        raise HTTPException(status_code=503, detail="webhook is not running")
+    if not hmac.compare_digest(x_telegram_bot_api_secret_token or "", WEBHOOK_SECRET):
+        raise HTTPException(status_code=403, detail="bad secret token")
+
+    update = Update.model_validate(await request.json(), context={"bot": _runtime.bot})
+    try:
+        _runtime.put_nowait(update)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="busy")
+    return {"ok": True}
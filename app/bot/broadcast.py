@@ -0,0 +1,194 @@
+# app/bot/broadcast.py
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from loguru import logger
+from sqlalchemy import text
+
+from app.db.base import SessionLocal
+
+# Telegram: ~30 сообщений/сек на бота глобально и ~1/сек в один чат — держим запас
+BROADCAST_RPS = float(os.getenv("BROADCAST_RPS", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+_PROGRESS_EVERY = 1000
+
+
+class TokenBucket:
+    """
+    Глобальный лимит отправки: rate токенов в секунду, ёмкость burst.
+    pause() — общий стоп для всех воркеров (после TelegramRetryAfter).
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastStats:
+    label: str
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    retries: int = 0
+    started: float = field(default_factory=time.monotonic)
+    blocked_chat_ids: List[int] = field(default_factory=list)
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def log(self, final: bool = False) -> None:
+        rate = self.done / self.elapsed if self.elapsed > 0 else 0.0
+        logger.info(
+            "[broadcast] {} {} {}/{} sent={} blocked={} failed={} retries={} {:.1f} msg/s {:.0f}s",
+            self.label, "done" if final else "progress", self.done, self.total,
+            self.sent, self.blocked, self.failed, self.retries, rate, self.elapsed,
+        )
+
+
+def disable_notifications(tg_ids: List[int]) -> None:
+    """Пользователь заблокировал бота / удалил аккаунт — выключаем ему все рассылки."""
+    if not tg_ids:
+        return
+    with SessionLocal() as s:
+        user_ids = s.execute(
+            text("""
+                UPDATE users
+                SET remind_enabled = false,
+                    notify_moon_phase = false,
+                    notify_daily_time = NULL,
+                    next_astro_ping_utc = NULL
+                WHERE tg_id = ANY(:ids)
+                RETURNING id
+            """),
+            {"ids": list(tg_ids)},
+        ).scalars().all()
+        s.commit()
+
+    from app.bot.reminders import unschedule_for_user  # ленивый импорт: reminders -> jobs -> broadcast
+    for uid in user_ids:
+        unschedule_for_user(uid)
+
+
+async def _send_one(bot: Bot, bucket: TokenBucket, stats: BroadcastStats,
+                    chat_id: int, text: str, parse_mode: Optional[str]) -> None:
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        await bucket.acquire()
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            stats.sent += 1
+            return
+        except TelegramRetryAfter as e:
+            stats.retries += 1
+            logger.warning("[broadcast] {} flood control: retry after {}s", stats.label, e.retry_after)
+            bucket.pause(e.retry_after)
+        except TelegramForbiddenError:
+            stats.blocked += 1
+            stats.blocked_chat_ids.append(chat_id)
+            return
+        except TelegramBadRequest as e:
+            if "chat not found" in str(e).lower():
+                stats.blocked += 1
+                stats.blocked_chat_ids.append(chat_id)
+            else:
+                stats.failed += 1
+                logger.warning("[broadcast] {} bad request chat={}: {}", stats.label, chat_id, e)
+            return
+        except (TelegramNetworkError, TelegramServerError) as e:
+            stats.retries += 1
+            logger.warning("[broadcast] {} {} chat={} attempt={}", stats.label, type(e).__name__, chat_id, attempt)
+            await asyncio.sleep(1.0 + attempt)
+        except Exception:
+            stats.failed += 1
+            logger.exception("[broadcast] {} send failed chat={}", stats.label, chat_id)
+            return
+    stats.failed += 1
+
+
+async def broadcast(
+    bot: Bot,
+    chat_ids: Iterable[int],
+    text: str,
+    *,
+    label: str = "broadcast",
+    parse_mode: Optional[str] = "HTML",
+    rps: float = BROADCAST_RPS,
+    concurrency: int = BROADCAST_CONCURRENCY,
+) -> BroadcastStats:
+    """
+    Рассылка одного текста по списку чатов.
+    Общий token bucket (rps), не больше concurrency запросов в полёте,
+    TelegramRetryAfter ставит на паузу всех, заблокировавшим бота выключаем уведомления.
+    """
+    # каждому чату — одно сообщение за рассылку (лимит ~1 msg/s на чат)
+    ids = list(dict.fromkeys(chat_ids))
+    stats = BroadcastStats(label=label, total=len(ids))
+    if not ids:
+        return stats
+
+    bucket = TokenBucket(rps)
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for chat_id in ids:
+        queue.put_nowait(chat_id)
+
+    async def worker() -> None:
+        while True:
+            try:
+                chat_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _send_one(bot, bucket, stats, chat_id, text, parse_mode)
+            if stats.done % _PROGRESS_EVERY == 0:
+                stats.log()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(ids))))))
+
+    stats.log(final=True)
+    if stats.blocked_chat_ids:
+        try:
+            # синхронный UPDATE — не держим им event loop
+            await asyncio.to_thread(disable_notifications, stats.blocked_chat_ids)
+        except Exception:
+            logger.exception("[broadcast] {} failed to disable blocked users", label)
+    return stats
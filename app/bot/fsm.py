@@ -0,0 +1,42 @@
+# app/bot/fsm.py
+from __future__ import annotations
+
+import os
+from typing import Tuple
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from loguru import logger
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+# redis — состояния FSM общие для всех воркеров/реплик; memory — только для одного процесса
+FSM_STORAGE = os.getenv("FSM_STORAGE", "redis" if REDIS_URL else "memory").lower()
+# брошенные анкеты (DreamForm, AstroForm, …) сами исчезают из Redis
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL_SECONDS", "86400"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# максимум, сколько держим лок чата, если воркер умер посреди апдейта
+FSM_LOCK_TIMEOUT = int(os.getenv("FSM_LOCK_TIMEOUT_SECONDS", "60"))
+
+
+def build_fsm() -> Tuple[BaseStorage, BaseEventIsolation]:
+    """
+    Хранилище FSM + изоляция событий для Dispatcher.
+    Изоляция берёт лок на ключ (бот, чат, пользователь) на время обработки апдейта,
+    поэтому два апдейта одного пользователя не обрабатываются параллельно даже
+    в разных процессах. Порядок она не держит: лок достаётся тому, кто первым
+    его запросил (см. app.api.webhook.WebhookRuntime).
+    """
+    if FSM_STORAGE != "redis" or not REDIS_URL:
+        return MemoryStorage(), SimpleEventIsolation()
+
+    from redis.asyncio import ConnectionPool, Redis
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisEventIsolation, RedisStorage
+
+    pool = ConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS)
+    redis = Redis(connection_pool=pool)
+    key_builder = DefaultKeyBuilder(with_bot_id=True)
+
+    storage = RedisStorage(redis, key_builder=key_builder, state_ttl=FSM_STATE_TTL, data_ttl=FSM_STATE_TTL)
+    isolation = RedisEventIsolation(redis, key_builder=key_builder, lock_kwargs={"timeout": FSM_LOCK_TIMEOUT})
+    logger.info("[fsm] redis storage ttl={}s pool={}", FSM_STATE_TTL, REDIS_MAX_CONNECTIONS)
+    return storage, isolation
@@ -1,13 +1,14 @@
 # app/bot/handlers/astrology.py
 from __future__ import annotations
+import asyncio
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
-from app.db.base import SessionLocal
-from app.db.models import User
+from datetime import datetime, timezone
+from app.db.users import UserRecord
+from app.db.write_behind import writer
 from app.core.astrology_service import AstroInput, build_facts, render_llm
 
 router = Router(name="astrology")
@@ -27,7 +28,7 @@ async def cmd_astrology(m: Message, state: FSMContext):
     )
 
 @router.message(AstroForm.input_line, F.text)
-async def on_line(m: Message, state: FSMContext):
+async def on_line(m: Message, state: FSMContext, db_user: UserRecord):
     line = (m.text or "").strip()
     parts = [p.strip() for p in line.split(";")]
     if len(parts) < 2:
@@ -44,24 +45,23 @@ async def on_line(m: Message, state: FSMContext):
 
     ai = AstroInput(full_name=full_name, birth_date=birth_date, birth_time=birth_time, birthplace=birthplace)
     facts = build_facts(ai)
-    html = render_llm(facts, ai)
-
-    # сохраним профиль
-    from sqlalchemy import text as sqt
-    with SessionLocal() as s:
-        user = s.query(User).filter_by(tg_id=m.from_user.id).one_or_none()
-        if not user:
-            user = User(tg_id=m.from_user.id, username=m.from_user.username, is_premium=True)
-            s.add(user); s.commit(); s.refresh(user)
-        s.execute(
-            sqt("""
-                INSERT INTO astrology_profiles (user_id, full_name, birth_date, birth_time, birthplace, report_html)
-                VALUES (:uid, :fn, :bd, :bt, :bp, :html)
-            """),
-            {"uid": user.id, "fn": full_name, "bd": birth_date.date(),
-             "bt": birth_time, "bp": birthplace, "html": html}
-        )
-        s.commit()
+    # обычно это чтение кэша прогнозов; на промахе — вызов LLM, поэтому не в event loop
+    html = await asyncio.to_thread(render_llm, facts, ai)
 
     await m.answer(html, parse_mode="HTML")
     await state.clear()
+
+    # сохраним профиль — в фоне пачкой, ответ уже ушёл
+    try:
+        bt = datetime.strptime(birth_time, "%H:%M").time() if birth_time else None
+    except ValueError:
+        bt = None
+    writer.enqueue("astrology_profiles", {
+        "user_id": db_user.id,
+        "full_name": full_name,
+        "birth_date": birth_date.date(),
+        "birth_time": bt,
+        "birthplace": birthplace,
+        "report_html": html,
+        "created_at": datetime.now(timezone.utc),
+    })
@@ -1,23 +1,28 @@
 # app/bot/handlers/dreams.py
 from __future__ import annotations
 
+import os
 import re
+from html import escape
 from datetime import datetime, date, time, timedelta
 from zoneinfo import ZoneInfo
 
 from aiogram import Router, F
-from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
-from app.db.base import SessionLocal
-from app.db.models import User, Dream
+from app.db.dream_search import SEARCH_PAGE_SIZE, SearchPage, search_dreams
+from app.db.journal import Cursor, decode_cursor, encode_cursor, journal_rows
+from app.db.users import UserRecord
 
 router = Router()
 
 # ===== FSM =====
 class DreamsForm(StatesGroup):
     waiting_date = State()
+    waiting_query = State()
 
 
 DATE_RE = re.compile(r"^\s*(\d{2})\.(\d{2})\.(\d{4})\s*$")  # ДД.ММ.ГГГГ
@@ -35,7 +40,102 @@ def _parse_date(text: str) -> date | None:
         return None
 
 
+# ===== Дневник: постраничный просмотр =====
+
+JOURNAL_PAGE_SIZE = int(os.getenv("JOURNAL_PAGE_SIZE", "5"))
+# длинные сны обрезаем, страницу держим заметно ниже лимита Telegram (4096)
+JOURNAL_ENTRY_CHARS = int(os.getenv("JOURNAL_ENTRY_CHARS", "700"))
+JOURNAL_MESSAGE_CHARS = int(os.getenv("JOURNAL_MESSAGE_CHARS", "3500"))
+
+
+def _clip(text: str, limit: int) -> str:
+    text = (text or "—").strip()
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def _journal_view(user: UserRecord, direction: str, cursor: Cursor | None) -> tuple[str, InlineKeyboardMarkup] | None:
+    """
+    direction: "latest" | "o" (старше курсора) | "n" (новее курсора).
+    Одна keyset-выборка на страницу; None — в эту сторону записей нет.
+    """
+    tz = _local_tz(user)
+    rows = journal_rows(
+        user.id,
+        older_than=cursor if direction == "o" else None,
+        newer_than=cursor if direction == "n" else None,
+        limit=JOURNAL_PAGE_SIZE + 1,
+    )
+    if not rows:
+        return None
+    more = len(rows) > JOURNAL_PAGE_SIZE
+    rows = rows[:JOURNAL_PAGE_SIZE]
+
+    # набираем записи в порядке движения, пока укладываемся в размер сообщения
+    shown, size = [], 0
+    for e in rows:
+        when = e.created_at.astimezone(tz).strftime("%d.%m.%Y %H:%M")
+        piece = f"<b>{when}</b>\n{escape(_clip(e.text, JOURNAL_ENTRY_CHARS))}"
+        if shown and size + len(piece) > JOURNAL_MESSAGE_CHARS:
+            more = True
+            break
+        shown.append((e, piece))
+        size += len(piece) + 2
+    if direction == "n":
+        shown.reverse()  # на экране всегда от новых к старым
+
+    has_older = more if direction != "n" else True
+    has_newer = more if direction == "n" else direction == "o"
+
+    nav = []
+    if has_older:
+        oldest = shown[-1][0]
+        nav.append(InlineKeyboardButton(text="←", callback_data=f"dj:o:{encode_cursor((oldest.created_at, oldest.id))}"))
+    if has_newer:
+        newest = shown[0][0]
+        nav.append(InlineKeyboardButton(text="→", callback_data=f"dj:n:{encode_cursor((newest.created_at, newest.id))}"))
+    kb = [nav] if nav else []
+    kb.append([InlineKeyboardButton(text="📅 По дате", callback_data="dj:date")])
+
+    body = "📜 <b>Дневник снов</b>\n\n" + "\n\n".join(p for _, p in shown)
+    return body, InlineKeyboardMarkup(inline_keyboard=kb)
+
+
 @router.message(F.text == "📜 Мои сны")
+async def open_journal(m: Message, state: FSMContext, db_user: UserRecord) -> None:
+    await state.clear()
+    view = _journal_view(db_user, "latest", None)
+    if view is None:
+        await m.answer("😴 В дневнике пока нет записей. Нажмите «✍ Записать сон».")
+        return
+    body, kb = view
+    await m.answer(body, parse_mode="HTML", reply_markup=kb)
+
+
+@router.callback_query(F.data.startswith("dj:"))
+async def on_journal_nav(cq: CallbackQuery, state: FSMContext, db_user: UserRecord) -> None:
+    if cq.data == "dj:date":
+        await cq.answer()
+        await ask_date(cq.message, state)
+        return
+
+    _, direction, raw = cq.data.split(":", 2)
+    try:
+        cursor = decode_cursor(raw)
+    except ValueError:
+        await cq.answer()
+        return
+    view = _journal_view(db_user, direction, cursor)
+    if view is None:
+        # запись на границе могли удалить — просто возвращаемся к свежим
+        view = _journal_view(db_user, "latest", None)
+        if view is None:
+            await cq.answer("В дневнике нет записей", show_alert=True)
+            return
+    body, kb = view
+    await cq.message.edit_text(body, parse_mode="HTML", reply_markup=kb)
+    await cq.answer()
+
+
 async def ask_date(m: Message, state: FSMContext) -> None:
     await state.set_state(DreamsForm.waiting_date)
     await m.answer(
@@ -46,7 +146,7 @@ async def ask_date(m: Message, state: FSMContext) -> None:
 
 
 @router.message(DreamsForm.waiting_date, F.text)
-async def get_dream_by_date(m: Message, state: FSMContext) -> None:
+async def get_dream_by_date(m: Message, state: FSMContext, db_user: UserRecord) -> None:
     # 1) валидация даты
     d = _parse_date(m.text or "")
     if not d:
@@ -56,64 +156,95 @@ async def get_dream_by_date(m: Message, state: FSMContext) -> None:
         )
         return
 
-    tg_id = m.from_user.id
+    # 2) границы суток в ЛОКАЛЬНОЙ зоне пользователя (пользователь — из UserMiddleware)
+    tz = _local_tz(db_user)
+    start_local = datetime.combine(d, time.min).replace(tzinfo=tz)
+    end_local = start_local + timedelta(days=1)
 
-    # 2) ищем пользователя и его часовой пояс
-    with SessionLocal() as s:
-        user: User | None = s.query(User).filter(User.tg_id == tg_id).first()
+    # 3) открываем дневник с конца этого дня: та же keyset-страница с листанием ←/→
+    await state.clear()
+    day_end: Cursor = (end_local, 0)
+    last = journal_rows(db_user.id, older_than=day_end, limit=1)
+    if not last or last[0].created_at < start_local:
+        await m.answer(f"😴 Записей за {d.strftime('%d.%m.%Y')} не найдено.")
+        return
 
-        if not user:
-            await state.clear()
-            await m.answer("Не нашли вас в базе. Попробуйте начать заново командой /start.")
-            return
+    body, kb = _journal_view(db_user, "o", day_end)
+    await m.answer(body, parse_mode="HTML", reply_markup=kb)
 
-        # 3) границы суток в ЛОКАЛЬНОЙ зоне пользователя
-        try:
-            tz = ZoneInfo(user.tz or "UTC")
-        except Exception:
-            tz = ZoneInfo("UTC")
-
-        start_local = datetime.combine(d, time.min).replace(tzinfo=tz)
-        end_local = start_local + timedelta(days=1)
-
-        # 4) достаём сны за день (created_at хранится как timestamptz — сравнение идёт корректно)
-        dreams = (
-            s.query(Dream)
-            .filter(
-                Dream.user_id == user.id,
-                Dream.created_at >= start_local,
-                Dream.created_at < end_local,
-            )
-            .order_by(Dream.created_at.asc())
-            .all()
-        )
 
-    # 5) ответ
-    if not dreams:
-        await state.clear()
-        await m.answer(f"😴 Записей за {d.strftime('%d.%m.%Y')} не найдено.")
+# ===== Поиск по снам =====
+
+def _local_tz(user: UserRecord) -> ZoneInfo:
+    try:
+        return ZoneInfo(user.tz or "UTC")
+    except Exception:
+        return ZoneInfo("UTC")
+
+
+def _render_search(query: str, page: SearchPage, tz: ZoneInfo) -> str:
+    if not page.hits:
+        return f"🔎 По запросу «{escape(query)}» ничего не найдено."
+    head = f"🔎 <b>Поиск: «{escape(query)}»</b>"
+    if page.fuzzy:
+        head += "\n<i>Точных совпадений нет — похожие записи:</i>"
+    pieces = [head]
+    for i, hit in enumerate(page.hits, start=page.offset + 1):
+        when = hit.created_at.astimezone(tz).strftime("%d.%m.%Y %H:%M")
+        pieces.append(f"<b>{i}. {when}</b>\n{hit.snippet}")
+    return "\n\n".join(pieces)
+
+
+def _kb_search(page: SearchPage) -> InlineKeyboardMarkup | None:
+    mode = "f" if page.fuzzy else "t"
+    row = []
+    if page.offset > 0:
+        row.append(InlineKeyboardButton(text="←", callback_data=f"dsr:{mode}:{max(0, page.offset - SEARCH_PAGE_SIZE)}"))
+    if page.has_more:
+        row.append(InlineKeyboardButton(text="→", callback_data=f"dsr:{mode}:{page.offset + len(page.hits)}"))
+    return InlineKeyboardMarkup(inline_keyboard=[row]) if row else None
+
+
+async def _send_search(m: Message, state: FSMContext, user: UserRecord, query: str) -> None:
+    page = search_dreams(user.id, query)
+    # запрос держим в данных FSM: в callback_data (64 байта) кириллица не помещается
+    await state.set_state(None)
+    await state.update_data(search_q=query)
+    await m.answer(_render_search(query, page, _local_tz(user)), parse_mode="HTML", reply_markup=_kb_search(page))
+
+
+@router.message(Command("search"))
+async def cmd_search(m: Message, state: FSMContext, command: CommandObject, db_user: UserRecord) -> None:
+    query = (command.args or "").strip()
+    if not query:
+        await state.set_state(DreamsForm.waiting_query)
+        await m.answer("🔎 Что ищем в ваших снах? Напишите слово или фразу.\nДля отмены — /cancel")
         return
+    await _send_search(m, state, db_user, query)
 
-    # Если позже введёте несколько записей в день — выведем всё по порядку
-    pieces = []
-    for i, dr in enumerate(dreams, start=1):
-        t_local = dr.created_at.astimezone(tz).strftime("%H:%M")
-        parts = [f"<b>Сон #{i} • {t_local}</b>"]
-        parts.append(dr.text or "—")
-        # можно добавить символы/эмоции/подсказки, если захотите:
-        # if dr.symbols: parts.append(f"🔖 Символы: { ... }")
-        # if dr.actions: parts.append(f"💡 Подсказки: { ... }")
-        pieces.append("\n".join(parts))
 
-    await state.clear()
-    await m.answer(
-        f"📜 <b>Ваши сны за {d.strftime('%d.%m.%Y')}</b>:\n\n" + "\n\n".join(pieces),
-        parse_mode="HTML",
+@router.message(DreamsForm.waiting_query, F.text, ~F.text.startswith("/"))
+async def on_search_query(m: Message, state: FSMContext, db_user: UserRecord) -> None:
+    await _send_search(m, state, db_user, (m.text or "").strip())
+
+
+@router.callback_query(F.data.startswith("dsr:"))
+async def on_search_page(cq: CallbackQuery, state: FSMContext, db_user: UserRecord) -> None:
+    query = (await state.get_data()).get("search_q")
+    if not query:
+        await cq.answer("Поиск устарел — повторите /search", show_alert=True)
+        return
+    _, mode, raw_offset = cq.data.split(":", 2)
+    page = search_dreams(db_user.id, query, offset=max(0, int(raw_offset)), fuzzy=(mode == "f"))
+    await cq.message.edit_text(
+        _render_search(query, page, _local_tz(db_user)), parse_mode="HTML", reply_markup=_kb_search(page)
     )
+    await cq.answer()
 
 
 # Опционально: быстрая отмена
 @router.message(DreamsForm.waiting_date, F.text == "/cancel")
+@router.message(DreamsForm.waiting_query, F.text == "/cancel")
 async def cancel(m: Message, state: FSMContext) -> None:
     await state.clear()
     await m.answer("Отменил. Возвращаюсь в меню.")
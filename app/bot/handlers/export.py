@@ -0,0 +1,47 @@
+# app/bot/handlers/export.py
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
+from loguru import logger
+
+from app.db.export import export_to_file
+from app.db.users import UserRecord
+
+router = Router(name="export")
+
+FORMATS = ("csv", "jsonl", "html")
+
+
+@router.message(Command("export"))
+async def cmd_export(m: Message, command: CommandObject, db_user: UserRecord) -> None:
+    fmt = (command.args or "html").strip().lower()
+    if fmt not in FORMATS:
+        await m.answer("Формат: /export [html|csv|jsonl] — по умолчанию html.")
+        return
+
+    try:
+        tz = ZoneInfo(db_user.tz or "UTC")
+    except Exception:
+        tz = ZoneInfo("UTC")
+
+    # пишем во временный файл потоково (в отдельном потоке), затем отдаём документом
+    fd, path = tempfile.mkstemp(prefix="dreams-", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        await m.answer("⏳ Готовлю выгрузку дневника…")
+        await asyncio.to_thread(export_to_file, fmt, path, db_user.id, tz=tz)
+        name = f"dreams-{datetime.now(tz).strftime('%Y%m%d')}.{fmt}"
+        await m.answer_document(FSInputFile(path, filename=name), caption="📜 Ваш дневник снов")
+    except Exception:
+        logger.exception("[export] user={} fmt={} failed", db_user.id, fmt)
+        await m.answer("Не удалось подготовить выгрузку. Попробуйте позже.")
+    finally:
+        os.remove(path)
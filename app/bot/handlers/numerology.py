@@ -1,13 +1,14 @@
+import asyncio
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from loguru import logger
 from app.core.numerology_service import analyze_numerology
-from app.db.base import SessionLocal
-from app.db.models import User, NumerologyProfile  # добавим модель ниже
+from app.db.users import UserRecord
+from app.db.write_behind import writer
 from app.core.telegram_html import sanitize_tg_html
 
 router = Router(name="numerology")
@@ -25,7 +26,7 @@ async def entry(msg: Message, state: FSMContext):
     )
 
 @router.message(Form.wait_data)
-async def process(msg: Message, state: FSMContext):
+async def process(msg: Message, state: FSMContext, db_user: UserRecord):
     """
     Ожидаем строку: "ФИО; ДД.ММ.ГГГГ"
     Пример: "Иванов Иван Иванович; 22.07.2001"
@@ -59,7 +60,8 @@ async def process(msg: Message, state: FSMContext):
     # 3) LLM (нумерология)
     try:
         logger.info("[numerology] start name='{}' birth='{}'", full_name, birth_date_str)
-        html = analyze_numerology(full_name, birth_date_str)
+        # на попадании в кэш интерпретаций — без LLM; промах не должен держать event loop
+        html = await asyncio.to_thread(analyze_numerology, full_name, birth_date_str)
         html = sanitize_tg_html(html)        # ⬅️ ДО отправки
        
     except Exception:
@@ -71,20 +73,15 @@ async def process(msg: Message, state: FSMContext):
     # 4) ответ пользователю
     await msg.answer(html, parse_mode="HTML")
 
-    # 5) сохранение в БД (не мешает пользователю)
+    # 5) сохранение в БД (в фоне пачкой, не мешает пользователю)
     try:
-        with SessionLocal() as db:
-            user = db.query(User).filter_by(tg_id=msg.from_user.id).first()
-            if user:
-                db.add(
-                    NumerologyProfile(
-                        user_id=user.id,
-                        full_name=full_name,
-                        birth_date=birth_date,
-                        report_html=html,
-                    )
-                )
-                db.commit()
+        writer.enqueue("numerology_profiles", {
+            "user_id": db_user.id,
+            "full_name": full_name,
+            "birth_date": birth_date,
+            "report_html": html,
+            "created_at": datetime.now(timezone.utc),
+        })
     except Exception:
         logger.exception("numerology save failed")
 
@@ -10,6 +10,7 @@ from aiogram.enums import ParseMode
 from app.bot.ui import BUY_30, BUY_90, main_kb, kb_premium
 from app.db.base import SessionLocal
 from app.db.models import User, Payment
+from app.db.users import invalidate_user
 
 router = Router(name="payments")
 
@@ -116,6 +117,7 @@ async def on_success_payment(m: Message) -> None:
             total_amount=sp.total_amount,  # в минимальных единицах (копейки/центах)
         ))
         s.commit()
+    invalidate_user(m.from_user.id)  # is_premium мог смениться
 
     # 3) отвечаем пользователю
     until = user.premium_expires_at.astimezone().strftime("%d.%m.%Y")
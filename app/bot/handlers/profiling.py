@@ -0,0 +1,49 @@
+# app/bot/handlers/profiling.py
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from aiogram import F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+
+from app.core.profiling import PROFILE_MAX_SECONDS, ProfilerBusy, list_captures, profile
+
+router = Router(name="profiling")
+
+# Telegram id админов через запятую; пусто — команды не матчатся ни у кого
+ADMIN_USER_IDS = {int(x) for x in os.getenv("ADMIN_USER_IDS", "").replace(" ", "").split(",") if x}
+
+_admin = F.from_user.id.in_(ADMIN_USER_IDS)
+
+
+@router.message(Command("profile"), _admin)
+async def cmd_profile(m: Message, command: CommandObject) -> None:
+    """/profile [сек] — профиль процесса бота (в polling-режиме HTTP-эндпоинта нет)."""
+    try:
+        seconds = min(float(command.args or 10), PROFILE_MAX_SECONDS)
+    except ValueError:
+        await m.answer(f"Формат: /profile [секунды], не больше {PROFILE_MAX_SECONDS}.")
+        return
+    await m.answer(f"⏱ Профилирую {seconds:g} с…")
+    try:
+        folded = await asyncio.to_thread(profile, seconds)
+    except ProfilerBusy:
+        await m.answer("Профилирование уже идёт.")
+        return
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    await m.answer_document(
+        BufferedInputFile(folded.encode("utf-8"), filename=f"profile-{stamp}.folded"),
+        caption="flamegraph.pl / speedscope",
+    )
+
+
+@router.message(Command("slow"), _admin)
+async def cmd_slow(m: Message) -> None:
+    names = list_captures()[:10]
+    if not names:
+        await m.answer("Медленных апдейтов не было (или SLOW_UPDATE_MS=0).")
+        return
+    await m.answer("Последние медленные апдейты:\n" + "\n".join(names))
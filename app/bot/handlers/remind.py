@@ -9,12 +9,12 @@ from datetime import time
 from sqlalchemy import text
 
 from app.db.base import SessionLocal
-from app.db.models import User
+from app.db.users import UserRecord
 from app.bot.reminders import (
     schedule_for_user,
-    unschedule_for_user,
     toggle_remind,
 )
+from app.jobs.astrology_notifications import next_daily_fire_utc
 
 # чтобы текст кнопок совпадал с главным меню и взять наше новое инлайн-меню
 from app.bot.ui import REMIND_BTN, reminders_menu_kb
@@ -193,7 +193,7 @@ async def toggle_moon_phase(q: types.CallbackQuery):
 # =========================================
 
 @remind_router.callback_query(F.data.startswith("d:tp:"))
-async def on_timepicker_dream(q: types.CallbackQuery):
+async def on_timepicker_dream(q: types.CallbackQuery, db_user: UserRecord):
     prefix = "d"
     action, h, m = _parse_tp(q.data)
 
@@ -221,23 +221,16 @@ async def on_timepicker_dream(q: types.CallbackQuery):
         return
 
     if action == "save":
-        tg_id = q.from_user.id
         picked = time(cur_h, cur_m)
 
         with SessionLocal() as s:
-            user = s.query(User).filter(User.tg_id == tg_id).first()
-            if not user:
-                await q.answer("Сначала /start", show_alert=True)
-                return
-            user.remind_time = picked
-            user.remind_enabled = True
+            s.execute(
+                text("UPDATE users SET remind_time=:t, remind_enabled=true WHERE id=:id"),
+                {"t": picked, "id": db_user.id},
+            )
             s.commit()
-            # пересоздаём задачу
-            try:
-                unschedule_for_user(user.id)
-            except Exception:
-                pass
-            schedule_for_user(q.bot, user.id, user.tg_id, user.tz, _t_to_str(picked))
+        # пересоздаём задачу
+        schedule_for_user(db_user.id, db_user.tg_id, db_user.tz, _t_to_str(picked))
 
         await _back_to_reminders_menu(q, toast="Время для записи снов сохранено")
         return
@@ -246,7 +239,7 @@ async def on_timepicker_dream(q: types.CallbackQuery):
 
 
 @remind_router.callback_query(F.data.startswith("a:tp:"))
-async def on_timepicker_astro(q: types.CallbackQuery):
+async def on_timepicker_astro(q: types.CallbackQuery, db_user: UserRecord):
     prefix = "a"
     action, h, m = _parse_tp(q.data)
 
@@ -273,11 +266,12 @@ async def on_timepicker_astro(q: types.CallbackQuery):
         return
 
     if action == "save":
-        tg_id = q.from_user.id
         t_str = f"{cur_h:02d}:{cur_m:02d}"
         with SessionLocal() as s:
-            s.execute(text("UPDATE users SET notify_daily_time=:t WHERE tg_id=:tg"),
-                      {"t": t_str, "tg": tg_id})
+            s.execute(
+                text("UPDATE users SET notify_daily_time=:t, next_astro_ping_utc=:n WHERE id=:id"),
+                {"t": t_str, "n": next_daily_fire_utc(t_str, db_user.tz), "id": db_user.id},
+            )
             s.commit()
 
         await _back_to_reminders_menu(q, toast="Время ежедневного астропрогноза сохранено")
@@ -1,8 +1,9 @@
 # app/bot/handlers/stats.py
 from __future__ import annotations
 
-from collections import Counter, defaultdict
+from collections import defaultdict
 from datetime import datetime, timedelta
+from html import escape
 from typing import Iterable, List, Tuple
 
 import zoneinfo
@@ -12,7 +13,10 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from sqlalchemy import and_
 
 from app.db.base import SessionLocal
-from app.db.models import User, Dream
+from app.db.dream_tags import count_with_tag, dreams_with_tag, top_tags
+from app.db.models import Dream
+from app.db.users import UserRecord
+from app.core.llm_router import Feature
 from app.core.premium import premium_analysis  # твоя обёртка (api/stub режимы)
 
 router = Router(name="stats")
@@ -55,18 +59,6 @@ def _count_emotions(dreams: Iterable[Dream]) -> Tuple[int, int]:
                 neg += 1
     return pos, neg
 
-def _top_symbols(dreams: Iterable[Dream], n: int = 3) -> List[Tuple[str, int]]:
-    cnt = Counter()
-    for d in dreams:
-        if not d.symbols:
-            continue
-        for item in d.symbols:
-            key = (item.get("key") if isinstance(item, dict) else item) or ""
-            key = str(key).strip().lower()
-            if key:
-                cnt[key] += 1
-    return cnt.most_common(n)
-
 def _bar10(cur: int, prev: int) -> str:
     """Небольшая полоска динамики (10 ячеек)."""
     if prev < 0: prev = 0
@@ -130,7 +122,7 @@ def _ai_blocks_or_stub(
             f"Сводка:\n{ctx}"
         )
         try:
-            html = premium_analysis(prompt)  # вернет HTML/текст
+            html = premium_analysis(prompt, feature=Feature.STATS)  # вернет HTML/текст
             # Пытаемся разрезать по абзацам — если не получится, положим целиком во «Вывод»
             parts = [p.strip() for p in html.split("\n") if p.strip()]
             if len(parts) >= 2:
@@ -180,21 +172,17 @@ async def ask_period(m: types.Message) -> None:
 import os
 
 @router.callback_query(F.data.startswith("stats:"))
-async def show_stats(cb: types.CallbackQuery) -> None:
+async def show_stats(cb: types.CallbackQuery, db_user: UserRecord) -> None:
     await cb.answer()
     _, days_str = cb.data.split(":")
     days = 7 if days_str == "7" else 30
 
-    with SessionLocal() as s:
-        user = s.query(User).filter_by(tg_id=cb.from_user.id).one_or_none()
-        if not user:
-            await cb.message.answer("Не нашёл профиль. Напишите /start, чтобы зарегистрироваться.")
-            return
-
-        tz = _user_tz_or_utc(user.tz)
-        now_local = datetime.now(tz)
-        start, end, prev_start, prev_end = _period_bounds(now_local, days)
+    user = db_user
+    tz = _user_tz_or_utc(user.tz)
+    now_local = datetime.now(tz)
+    start, end, prev_start, prev_end = _period_bounds(now_local, days)
 
+    with SessionLocal() as s:
         # Берём «сырые» записи
         cur_q = (
             s.query(Dream)
@@ -234,8 +222,8 @@ async def show_stats(cb: types.CallbackQuery) -> None:
         emo_line = f"🙂 {pos} · 😔 {neg} (всего {pos+neg})"
         emotions_missing = False
 
-    # Символы
-    top_list = _top_symbols(cur, n=3)
+    # Символы — агрегируются в Postgres
+    top_list = top_tags(user.id, "symbols", since=start, until=end, n=3)
     if top_list:
         top_str = ", ".join(f"{k} — {c}" for k, c in top_list)
         top1 = top_list[0][0]
@@ -278,4 +266,60 @@ async def show_stats(cb: types.CallbackQuery) -> None:
     lines.append("🧭 <b>Общий вывод</b>")
     lines.append(summ_block)
 
-    await cb.message.edit_text("\n".join(lines), parse_mode="HTML")
+    await cb.message.edit_text("\n".join(lines), parse_mode="HTML", reply_markup=_kb_drilldown(top_list))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Детализация по символу: где и как часто встречался
+
+_TAG_KIND_CODES = {"symbols": "s", "emotions": "e"}
+
+
+def _tag_callback(kind: str, term: str) -> str | None:
+    """callback_data кнопки детализации; None — не влезает в лимит Telegram (64 байта)."""
+    data = f"stx:{_TAG_KIND_CODES[kind]}:{term}"
+    return data if len(data.encode("utf-8")) <= 64 else None
+
+
+def _parse_tag_callback(data: str) -> Tuple[str, str] | None:
+    """Обратно в (kind, term); None — чужие/битые данные."""
+    prefix, _, rest = data.partition(":")
+    code, _, term = rest.partition(":")
+    kind = next((k for k, c in _TAG_KIND_CODES.items() if c == code), None)
+    if prefix != "stx" or kind is None or not term:
+        return None
+    return kind, term
+
+
+def _kb_drilldown(top_list: List[Tuple[str, int]]) -> InlineKeyboardMarkup | None:
+    rows = []
+    for key, _ in top_list:
+        data = _tag_callback("symbols", key)
+        if data is not None:
+            rows.append([InlineKeyboardButton(text=f"🔖 {key}", callback_data=data)])
+    return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+
+@router.callback_query(F.data.startswith("stx:"))
+async def show_tag_drilldown(cb: types.CallbackQuery, db_user: UserRecord) -> None:
+    await cb.answer()
+    parsed = _parse_tag_callback(cb.data)
+    if parsed is None:
+        return
+    kind, term = parsed
+    tz = _user_tz_or_utc(db_user.tz)
+
+    total = count_with_tag(db_user.id, kind, term)
+    month = count_with_tag(db_user.id, kind, term, since=datetime.now(tz) - timedelta(days=30))
+    recent = dreams_with_tag(db_user.id, kind, term, limit=5)
+
+    label = "Символ" if kind == "symbols" else "Эмоция"
+    lines = [
+        f"🔎 <b>{label}: {escape(term)}</b>",
+        f"• Всего снов: <b>{total}</b>",
+        f"• За последние 30 дней: <b>{month}</b>",
+    ]
+    if recent:
+        dates = ", ".join(h.created_at.astimezone(tz).strftime("%d.%m.%Y") for h in recent)
+        lines.append(f"• Последние: {dates}")
+    await cb.message.answer("\n".join(lines), parse_mode="HTML")
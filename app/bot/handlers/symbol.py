@@ -1,43 +1,84 @@
-import json
+import hashlib
+import os
+from html import escape
+from typing import List
+
 from aiogram import Router, types
 from aiogram.filters import Command
-from app.core.nlp import load_symbols_from_json
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from app.core.cache import TTLCache
+from app.core.nlp import _norm
+from app.core.symbol_index import get_symbol_index
 
 router = Router()
 
+# inline-режим (@bot змея): готовые списки результатов по префиксу запроса
+INLINE_RESULTS = 20
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "5000"))
+# словарь меняется только с релизом — держим долго
+INLINE_CACHE_TTL = float(os.getenv("INLINE_CACHE_TTL_SECONDS", "3600"))
+# сколько секунд Telegram может отдавать наш ответ из своего кэша
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "3600"))
+
+_inline_cache: TTLCache[str, List[InlineQueryResultArticle]] = TTLCache(INLINE_CACHE_SIZE, INLINE_CACHE_TTL)
+
+
+def render_symbol(key: str, info: dict) -> str:
+    meaning = info.get("meaning", "—")
+    actions = info.get("actions", []) or []
+    return (
+        f"<b>Символ: {escape(key)}</b>\n"
+        f"Значение: {escape(meaning)}\n\n" +
+        ("Действия:\n" + "\n".join([f"• {escape(a)}" for a in actions]) if actions else "Действия: —")
+    )
+
+
 @router.message(Command("symbol"))
 async def cmd_symbol(message: types.Message):
     args = (message.text or "").split(maxsplit=1)
     if len(args) < 2:
         await message.answer("Формат: /symbol <слово>\nНапример: /symbol змея")
         return
-    query = args[1].strip().lower()
-
-    symbols = load_symbols_from_json()
-    # прямое совпадение ключа
-    if query in symbols:
-        info = symbols[query]
-    else:
-        # поиск по синонимам
-        info = None
-        for key, data in symbols.items():
-            syns = [s.lower() for s in data.get("synonyms", [])] + [key.lower()]
-            if query in syns:
-                info = data
-                info = {"_key": key, **data}
-                break
-
-    if not info:
-        await message.answer("В словаре пока нет такого символа.")
+    query = args[1].strip()
+
+    index = get_symbol_index()
+    # ключ или синоним — одним обращением к индексу
+    hit = index.get(query)
+    if not hit:
+        # нет точного совпадения — подскажем по префиксу
+        hints = index.suggest(query, limit=5)
+        if hints:
+            await message.answer("Точного совпадения нет. Возможно: " + ", ".join(escape(h) for h in hints))
+        else:
+            await message.answer("В словаре пока нет такого символа.")
         return
 
-    key = info.get("_key") or query
-    meaning = info.get("meaning", "—")
-    actions = info.get("actions", []) or []
+    key, info = hit
+    await message.answer(render_symbol(key, info), parse_mode="HTML")
+
 
-    text = (
-        f"**Символ: {key}**\n"
-        f"Значение: {meaning}\n\n" +
-        ("Действия:\n" + "\n".join([f"• {a}" for a in actions]) if actions else "Действия: —")
+def _article(key: str, info: dict) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=hashlib.md5(key.encode("utf-8")).hexdigest(),
+        title=key,
+        description=(info.get("meaning") or "")[:120],
+        input_message_content=InputTextMessageContent(message_text=render_symbol(key, info), parse_mode="HTML"),
     )
-    await message.answer(text)
+
+
+def inline_results(query: str) -> List[InlineQueryResultArticle]:
+    """Статьи для inline-запроса; собираются один раз на префикс и берутся из LRU."""
+    prefix = _norm(query)
+    cached = _inline_cache.get(prefix)
+    if cached is not None:
+        return cached
+    index = get_symbol_index()
+    results = [_article(key, index.symbols[key]) for key in index.suggest(prefix, limit=INLINE_RESULTS)]
+    _inline_cache.set(prefix, results)
+    return results
+
+
+@router.inline_query()
+async def on_inline_query(q: types.InlineQuery):
+    # ответ не зависит от пользователя — пусть Telegram кэширует его для всех
+    await q.answer(inline_results(q.query), cache_time=INLINE_CACHE_TIME, is_personal=False)
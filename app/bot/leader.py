@@ -0,0 +1,112 @@
+# app/bot/leader.py
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Callable, Optional
+
+from apscheduler.schedulers.base import BaseScheduler
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.base import engine
+
+# общий ключ advisory-lock для всех реплик бота
+LEADER_LOCK_KEY = int(os.getenv("SCHEDULER_LOCK_KEY", "7340001"))
+LEADER_CHECK_SECONDS = float(os.getenv("SCHEDULER_LEADER_CHECK_SECONDS", "15"))
+
+
+class AdvisoryLock:
+    """
+    Сессионный pg_advisory_lock на выделенном соединении.
+    Держится, пока живо соединение: упал процесс/сеть — Postgres сам отпустит лок.
+    """
+
+    def __init__(self, engine: Engine, key: int) -> None:
+        self._engine = engine
+        self._key = key
+        self._conn: Optional[Connection] = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    def try_acquire(self) -> bool:
+        conn = self._engine.connect()
+        try:
+            ok = bool(conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": self._key}).scalar())
+            conn.commit()
+        except Exception:
+            conn.invalidate()
+            raise
+        if ok:
+            self._conn = conn
+        else:
+            conn.close()
+        return ok
+
+    def still_held(self) -> bool:
+        """Соединение живо — значит и лок наш."""
+        if self._conn is None:
+            return False
+        try:
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+            return True
+        except Exception:
+            # не возвращаем соединение в пул: вдруг лок на нём всё ещё висит
+            self._conn.invalidate()
+            self._conn = None
+            return False
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self._key})
+            self._conn.commit()
+            self._conn.close()
+        except Exception:
+            self._conn.invalidate()
+        finally:
+            self._conn = None
+
+
+async def run_scheduler_leadership(
+    scheduler: BaseScheduler,
+    on_elected: Callable[[], None],
+    *,
+    interval: float = LEADER_CHECK_SECONDS,
+) -> None:
+    """
+    Все реплики запускают планировщик на паузе (задачи можно добавлять/удалять),
+    исполняет джобы только держатель advisory-lock.
+    Потеряли соединение с локом — сразу ставим на паузу и снова претендуем.
+    """
+    lock = AdvisoryLock(engine, LEADER_LOCK_KEY)
+    if not scheduler.running:
+        scheduler.start(paused=True)
+
+    try:
+        while True:
+            try:
+                if lock.held:
+                    if not lock.still_held():
+                        logger.warning("[scheduler] lost leader lock, pausing")
+                        scheduler.pause()
+                elif lock.try_acquire():
+                    logger.info("[scheduler] elected leader")
+                    try:
+                        on_elected()
+                    except Exception:
+                        lock.release()
+                        raise
+                    scheduler.resume()
+            except Exception:
+                logger.exception("[scheduler] leader election failed")
+            await asyncio.sleep(interval)
+    finally:
+        if lock.held:
+            scheduler.pause()
+            lock.release()
@@ -1,24 +1,34 @@
 # app/bot/main.py
 import os
 import asyncio
+from datetime import datetime, timezone
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from prometheus_client import start_http_server
 
 from app.bot.ui import main_kb, HELP_TEXT, kb_premium
 from app.core.premium import premium_analysis
-from app.db.base import SessionLocal
-from app.db.models import User, Dream
+from app.db.users import UserRecord
+from app.db.write_behind import writer
 
 # платежи
 from app.bot.handlers.payments import router as payments_router
 # напоминания
 from app.bot.handlers.remind import remind_router
-from app.bot.reminders import scheduler, bootstrap_existing
+from app.bot.reminders import scheduler, bootstrap_existing, set_bot
+from app.bot.leader import run_scheduler_leadership
+from app.bot.fsm import build_fsm
+from app.bot.middlewares.user import UserMiddleware
+from app.bot.middlewares.metrics import MetricsMiddleware
+from app.bot.middlewares.profiling import SlowUpdateMiddleware
+from app.core.profiling import SLOW_UPDATE_MS, SlowUpdateWatch
 # «мои сны»
 from app.bot.handlers.dreams import router as dreams_router
 # статистика
@@ -27,36 +37,49 @@ from app.bot.handlers.stats import router as stats_router
 from app.bot.handlers import numerology
 #астрология
 from app.bot.handlers.astrology import router as astrology_router
+# выгрузка дневника
+from app.bot.handlers.export import router as export_router
+# словарь символов
+from app.bot.handlers.symbol import router as symbol_router
+# профилирование (только админы)
+from app.bot.handlers.profiling import router as profiling_router
+
+# polling (по умолчанию) | webhook — см. app/api/webhook.py
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# пусто — api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+# polling: порт HTTP-сервера с /metrics (в webhook-режиме метрики отдаёт FastAPI); 0 — не поднимать
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# без авторизации — поэтому по умолчанию только локально; 0.0.0.0 — если порт виден лишь внутренней сети
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
 
 class DreamForm(StatesGroup):
     awaiting_text = State()
 
 router = Router(name="main")
 
-async def _analyze_and_reply(m: Message, text: str, user: User) -> None:
+async def _analyze_and_reply(m: Message, text: str, user: UserRecord) -> None:
     """
-    Премиум-единственный путь: сохраняем сон и отвечаем через premium_analysis().
+    Премиум-единственный путь: отвечаем через premium_analysis() и сохраняем сон.
     Никакого базового локального анализа больше не делаем.
     """
     html = premium_analysis(text)
     from app.core.premium import extract_symbols_emotions
     symbols, emotions = extract_symbols_emotions(html)
-    # сохраняем сон сразу
-    with SessionLocal() as s:
-        db_user = s.query(User).filter_by(id=user.id).one()
-        dream = Dream(
-            user_id=db_user.id,
-            text=text,
-            # поля базового анализа больше не заполняем
-            symbols=symbols,
-            emotions=emotions,
-            actions=None,
-        )
-        s.add(dream)
-        s.commit()
+
+    # запись сна — в фоне пачкой (app/db/write_behind.py): enqueue не блокирует,
+    # и ставим её до ответа, чтобы сон сохранился, даже если отправка упадёт
+    writer.enqueue("dreams", {
+        "user_id": user.id,
+        "text": text,
+        # поля базового анализа больше не заполняем
+        "symbols": symbols,
+        "emotions": emotions,
+        "actions": None,
+        "created_at": datetime.now(timezone.utc),
+    })
 
     # всегда отвечаем премиум-разбором (api или stub — управляется PREMIUM_MODE)
-    
     await m.answer(html, parse_mode=ParseMode.HTML)
 
 @router.message(Command("start"))
@@ -84,26 +107,14 @@ async def btn_log_dream(m: Message, state: FSMContext) -> None:
     )
 
 @router.message(DreamForm.awaiting_text, F.text)
-async def on_dream_text(m: Message, state: FSMContext) -> None:
+async def on_dream_text(m: Message, state: FSMContext, db_user: UserRecord) -> None:
     text = (m.text or "").strip()
     if len(text) < 10:
         await m.answer("Нужно чуть подробнее — хотя бы 10–15 символов 😊", reply_markup=main_kb())
         return
 
-    # создаём/получаем пользователя; ВАЖНО: is_premium=True по умолчанию
-    with SessionLocal() as s:
-        user = s.query(User).filter_by(tg_id=m.from_user.id).one_or_none()
-        if not user:
-            user = User(
-                tg_id=m.from_user.id,
-                username=m.from_user.username or None,
-                is_premium=True,            # <- теперь премиум включён на создании
-            )
-            s.add(user)
-            s.commit()
-            s.refresh(user)
-
-    await _analyze_and_reply(m, text, user)
+    # пользователь уже найден/создан в UserMiddleware (is_premium=True по умолчанию)
+    await _analyze_and_reply(m, text, db_user)
     await state.clear()
     await m.answer("Готово ✅", reply_markup=main_kb())
 
@@ -129,29 +140,76 @@ async def fallback_show_menu(m: Message, state: FSMContext) -> None:
         return
     await m.answer("Выберите действие:", reply_markup=main_kb())
 
-async def main() -> None:
+def build_bot() -> Bot:
     token = os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("BOT_TOKEN is not set")
-
-    bot = Bot(token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
+    session = None
+    if TELEGRAM_API_URL:
+        # свой Bot API сервер (локальный telegram-bot-api или фейк для нагрузки — app.devtools)
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+    return Bot(token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def build_dispatcher() -> Dispatcher:
+    storage, events_isolation = build_fsm()
+    dp = Dispatcher(storage=storage, events_isolation=events_isolation)
+
+    # пользователь из кэша/одним upsert — до хэндлеров сообщений и колбэков
+    dp.message.outer_middleware(UserMiddleware())
+    dp.callback_query.outer_middleware(UserMiddleware())
+    # время/ошибки выбранного хэндлера (внутренний middleware — наследуется всеми роутерами)
+    for name in ("message", "callback_query", "inline_query"):
+        dp.observers[name].middleware(MetricsMiddleware(name))
+    # снимки медленных апдейтов; при SLOW_UPDATE_MS=0 middleware нет — нет и накладных расходов
+    if SLOW_UPDATE_MS > 0:
+        watch = SlowUpdateWatch(SLOW_UPDATE_MS)
+        for name in ("message", "callback_query", "inline_query"):
+            dp.observers[name].middleware(SlowUpdateMiddleware(name, watch))
 
     # dp.include_router(payments_router)
+    dp.include_router(profiling_router)
     dp.include_router(stats_router)
     dp.include_router(dreams_router)
+    dp.include_router(export_router)
+    dp.include_router(symbol_router)
     dp.include_router(numerology.router)
     dp.include_router(astrology_router)
     dp.include_router(remind_router)
     dp.include_router(router)
+    return dp
 
-    await bot.delete_webhook(drop_pending_updates=True)
 
-    if not scheduler.running:
-        scheduler.start()
+def start_scheduler(bot: Bot) -> asyncio.Task:
+    """Планировщик стартует на паузе; джобы исполняет только реплика-лидер."""
+    set_bot(bot)
+    return asyncio.create_task(
+        run_scheduler_leadership(scheduler, on_elected=lambda: bootstrap_existing(bot))
+    )
+
+
+async def main() -> None:
+    if BOT_MODE == "webhook":
+        # апдейты принимает FastAPI (app.api.main) — запускать через uvicorn
+        raise RuntimeError("BOT_MODE=webhook: run `uvicorn app.api.main:app` instead of polling")
+
+    bot = build_bot()
+    dp = build_dispatcher()
+
+    await bot.delete_webhook(drop_pending_updates=True)
 
-    bootstrap_existing(bot)
-    await dp.start_polling(bot)
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, addr=METRICS_ADDR)
+
+    writer.start()
+    leader_task = start_scheduler(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        leader_task.cancel()
+        await writer.stop()
+        await dp.storage.close()
+        await dp.fsm.events_isolation.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,51 @@
+# app/bot/middlewares/metrics.py
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import CancelHandler, SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from app.core.metrics import HANDLER_ERRORS, HANDLER_LATENCY, HANDLERS_IN_FLIGHT
+
+
+def _handler_name(handler: HandlerObject | None) -> str:
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    module = (getattr(callback, "__module__", "") or "").rsplit(".", 1)[-1]
+    return f"{module}.{getattr(callback, '__qualname__', type(callback).__name__)}"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: вызывается уже для выбранного хэндлера
+    (data["handler"]) — пишет его время, число выполняющихся и ошибки.
+    """
+
+    def __init__(self, event: str) -> None:
+        self.event = event
+        self.in_flight = HANDLERS_IN_FLIGHT.labels(event)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = _handler_name(data.get("handler"))
+        started = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            return await handler(event, data)
+        except (SkipHandler, CancelHandler):
+            raise
+        except Exception as e:
+            HANDLER_ERRORS.labels(self.event, name, type(e).__name__).inc()
+            raise
+        finally:
+            self.in_flight.dec()
+            HANDLER_LATENCY.labels(self.event, name).observe(time.perf_counter() - started)
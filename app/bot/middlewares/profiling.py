@@ -0,0 +1,43 @@
+# app/bot/middlewares/profiling.py
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.bot.middlewares.metrics import _handler_name
+from app.core.profiling import SlowUpdateWatch
+
+
+class SlowUpdateMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: хэндлер дольше порога — снимок стеков и апдейта
+    (app.core.profiling.SlowUpdateWatch). Регистрируется только при SLOW_UPDATE_MS > 0.
+    """
+
+    def __init__(self, event: str, watch: SlowUpdateWatch) -> None:
+        self.event = event
+        self.watch = watch
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        token = self.watch.begin()
+        error = None
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.watch.end(
+                token,
+                event=self.event,
+                handler=_handler_name(data.get("handler")),
+                update=data.get("event_update", event),
+                error=error,
+            )
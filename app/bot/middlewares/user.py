@@ -0,0 +1,30 @@
+# app/bot/middlewares/user.py
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+
+from app.db.users import get_or_create_user
+
+
+class UserMiddleware(BaseMiddleware):
+    """
+    Один раз на апдейт находит (или создаёт) пользователя и кладёт его
+    в data["db_user"] — хэндлеры получают его аргументом `db_user: UserRecord`.
+    Апдейты без живого отправителя (нет from_user, бот, анонимный админ группы)
+    до хэндлеров не доходят: им некого записывать, а db_user у хэндлеров обязателен.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        tg_user: TgUser | None = data.get("event_from_user")
+        if tg_user is None or tg_user.is_bot:
+            return None
+        data["db_user"] = get_or_create_user(tg_user.id, tg_user.username)
+        return await handler(event, data)
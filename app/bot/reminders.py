@@ -1,62 +1,171 @@
 # app/bot/reminders.py
 from __future__ import annotations
 
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
 from aiogram import Bot
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_SUBMITTED,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import text
-from app.db.base import SessionLocal
+from loguru import logger
+from sqlalchemy import select, text
+from app.core.astrology_math import next_phase_change
+from app.core.metrics import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_LAG, SCHEDULER_JOBS_MISSED
+from app.db.base import SessionLocal, engine
+from app.db.keyset import iter_keyset
+from app.db.models import User
 from app.jobs.astrology_notifications import (
     check_moon_phase_changes,
     send_daily_astro_ping,
 )
-# app/bot/reminders.py
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-
-# ГЛОБАЛЬНЫЙ планировщик этого модуля (экспортируемый)
-scheduler = AsyncIOScheduler(timezone="UTC")
+from app.jobs.astrology_forecasts import ASTRO_PREGEN_HOUR_UTC, pregenerate_tomorrow
+from app.jobs.llm_usage import rollup_recent
 import pytz
 
-scheduler = AsyncIOScheduler(timezone="UTC")
+JOBS_TABLE = "apscheduler_jobs"
+
+# ГЛОБАЛЬНЫЙ планировщик этого модуля (экспортируемый).
+# Напоминания пользователей живут в Postgres: переживают рестарт и видны всем репликам.
+# Глобальные джобы описаны в коде и пересоздаются при старте — им хватает памяти.
+# Исполняет джобы только лидер (см. app.bot.leader), остальные реплики держат
+# планировщик на паузе и лишь пишут/удаляют задачи в общем хранилище.
+scheduler = AsyncIOScheduler(
+    timezone="UTC",
+    jobstores={
+        "default": SQLAlchemyJobStore(engine=engine, tablename=JOBS_TABLE),
+        "memory": MemoryJobStore(),
+    },
+    job_defaults={"coalesce": True, "misfire_grace_time": 300},
+)
 JOB_PREFIX = "remind_user_"
-# глобальные задачи (работают для всех пользователей)
+
+# ---- метрики джоб: длительность от отправки в executor до результата ----
+_job_started: dict[str, float] = {}
+
+
+def _job_label(job_id: str) -> str:
+    # remind_user_42 -> remind_user: по пользователю метрики не дробим
+    return re.sub(r"_?\d+$", "", job_id) or job_id
+
+
+def _on_job_submitted(event: JobSubmissionEvent) -> None:
+    _job_started[event.job_id] = time.perf_counter()
+    if event.scheduled_run_times:
+        lag = datetime.now(timezone.utc) - event.scheduled_run_times[-1]
+        SCHEDULER_JOB_LAG.labels(_job_label(event.job_id)).observe(max(0.0, lag.total_seconds()))
+
+
+def _on_job_finished(event: JobExecutionEvent) -> None:
+    job = _job_label(event.job_id)
+    if event.code == EVENT_JOB_MISSED:
+        SCHEDULER_JOBS_MISSED.labels(job).inc()
+        return
+    started = _job_started.pop(event.job_id, None)
+    if started is not None:
+        outcome = "error" if event.exception else "ok"
+        SCHEDULER_JOB_DURATION.labels(job, outcome).observe(time.perf_counter() - started)
+
+
+scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
+scheduler.add_listener(_on_job_finished, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+
+# бот для задач из БД: в хранилище кладём только сериализуемые аргументы (tg_id)
+_bot: Bot | None = None
+
+# глобальные задачи (работают для всех пользователей).
+# daily_astro_ping раз в минуту заодно будит лидера, чтобы он подхватывал
+# напоминания, добавленные другими репликами.
+# Смена фазы Луны — не опрос, а одна date-джоба на точный момент перехода
+# (см. arm_moon_phase_job), после срабатывания она переставляет себя.
+MOON_PHASE_JOB_ID = "moon_phase_changes"
+# запас после расчётного момента — чтобы moon_phase() уже вернула новую фазу
+MOON_PHASE_FIRE_DELAY = timedelta(seconds=1)
+
 scheduler.add_job(
-    check_moon_phase_changes,
+    send_daily_astro_ping,
     trigger="cron",
-    minute="*/30",
+    minute="*",  # дешёвый индексный запрос — можно раз в минуту
     kwargs={"bot": None, "session_maker": SessionLocal},
-    id="moon_phase_changes",
+    id="daily_astro_ping",
+    jobstore="memory",
     replace_existing=True,
 )
 
+# прогнозы на завтра — 12 вызовов LLM раз в сутки вместо вызова на каждый /astrology
 scheduler.add_job(
-    send_daily_astro_ping,
+    pregenerate_tomorrow,
     trigger="cron",
-    minute="*/5",
-    kwargs={"bot": None, "session_maker": SessionLocal},
-    id="daily_astro_ping",
+    hour=ASTRO_PREGEN_HOUR_UTC,
+    minute=0,
+    id="astro_forecasts_pregen",
+    jobstore="memory",
+    replace_existing=True,
+    misfire_grace_time=3600,
+)
+
+# дневные итоги журнала LLM (llm_usage -> llm_usage_daily)
+scheduler.add_job(
+    rollup_recent,
+    trigger="cron",
+    minute=5,
+    id="llm_usage_rollup",
+    jobstore="memory",
     replace_existing=True,
 )
 
+async def _moon_phase_tick() -> None:
+    try:
+        await check_moon_phase_changes(bot=_bot, session_maker=SessionLocal)
+    finally:
+        arm_moon_phase_job()
+
+
+def arm_moon_phase_job(run_at: datetime | None = None) -> None:
+    """Поставить (или переставить) рассылку о смене фазы на следующий переход."""
+    if run_at is None:
+        run_at = next_phase_change(datetime.now(timezone.utc)) + MOON_PHASE_FIRE_DELAY
+    scheduler.add_job(
+        _moon_phase_tick,
+        trigger="date",
+        run_date=run_at,
+        id=MOON_PHASE_JOB_ID,
+        jobstore="memory",
+        replace_existing=True,
+    )
+    logger.info("[scheduler] next moon phase broadcast at {}", run_at.isoformat())
+
+
 def _job_id(user_id: int) -> str:
     return f"{JOB_PREFIX}{user_id}"
 
 
-async def send_reminder(bot: Bot, chat_id: int) -> None:
-    await bot.send_message(chat_id, "🌤 Доброе утро! Запишите сон, если помните. /help")
+def set_bot(bot: Bot) -> None:
+    global _bot
+    _bot = bot
+
+
+async def send_reminder(chat_id: int) -> None:
+    if _bot is None:
+        return
+    await _bot.send_message(chat_id, "🌤 Доброе утро! Запишите сон, если помните. /help")
 
 
-def schedule_for_user(bot: Bot, user_id: int, tg_id: int, tz: str, t_str: str) -> None:
+def schedule_for_user(user_id: int, tg_id: int, tz: str, t_str: str) -> None:
     """
     Создаём (или пере-создаём) задачу будильника для пользователя.
     t_str: строка HH:MM в его локальном часовом поясе.
     """
-    # если была старая — удаляем молча
-    try:
-        scheduler.remove_job(_job_id(user_id))
-    except Exception:
-        pass
-
     # разложим время
     hh, mm = map(int, t_str.split(":", 1))
 
@@ -64,10 +173,11 @@ def schedule_for_user(bot: Bot, user_id: int, tg_id: int, tz: str, t_str: str) -
     user_tz = pytz.timezone(tz or "UTC")
 
     trigger = CronTrigger(hour=hh, minute=mm, timezone=user_tz)
+    # replace_existing — старая задача перезаписывается одной операцией в хранилище
     scheduler.add_job(
         send_reminder,
         trigger=trigger,
-        args=[bot, tg_id],
+        args=[tg_id],
         id=_job_id(user_id),
         replace_existing=True,
     )
@@ -80,33 +190,43 @@ def unschedule_for_user(user_id: int) -> None:
         pass
 
 
+def _reminders_seeded() -> bool:
+    with SessionLocal() as s:
+        return bool(s.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {JOBS_TABLE} WHERE id LIKE :p)"),
+            {"p": f"{JOB_PREFIX}%"},
+        ).scalar())
+
 
 def bootstrap_existing(bot: Bot) -> None:
     """
-    Поднимаем задачи из БД для всех, у кого remind_enabled = true.
+    Вызывается, когда процесс стал лидером.
+    Напоминания уже лежат в хранилище — из users поднимаем их только при первом
+    запуске (пустая таблица задач), чтобы не пересоздавать всё на каждом старте.
     """
-    with SessionLocal() as s:
-        rows = s.execute(
-            text(
-                """
-                SELECT id, tg_id, tz
-                FROM users
-                WHERE remind_enabled = true
-                """
-            )
-        ).fetchall()
-
-    for r in rows:
-        t_str = "08:30"
-        schedule_for_user(bot, r.id, r.tg_id, r.tz, t_str)
-
-    # <<< ДОБАВЬ ЭТО: подставляем bot в глобальные джобы >>>
-    try:
-        scheduler.modify_job("moon_phase_changes", kwargs={"bot": bot, "session_maker": SessionLocal})
-    except Exception:
-        pass
+    set_bot(bot)
+
+    if not _reminders_seeded():
+        stmt = (
+            select(User.id, User.tg_id, User.tz, User.remind_time)
+            .where(User.remind_enabled.is_(True))
+        )
+        seeded = 0
+        for rows in iter_keyset(SessionLocal, stmt, User.id, batch_size=1000):
+            for r in rows:
+                t_str = r.remind_time.strftime("%H:%M") if r.remind_time else "08:30"
+                schedule_for_user(r.id, r.tg_id, r.tz, t_str)
+                seeded += 1
+        logger.info("[scheduler] seeded {} reminders into job store", seeded)
+
+    # сразу сверяем фазу (переход мог случиться, пока лидера не было) —
+    # тик сам переставит джобу на следующий точный момент
+    arm_moon_phase_job(datetime.now(timezone.utc))
+
+    # подставляем bot в глобальные джобы
     try:
-        scheduler.modify_job("daily_astro_ping", kwargs={"bot": bot, "session_maker": SessionLocal})
+        scheduler.modify_job("daily_astro_ping", jobstore="memory",
+                             kwargs={"bot": bot, "session_maker": SessionLocal})
     except Exception:
         pass
 
@@ -25,6 +25,8 @@ HELP_TEXT = (
     "<b>Команды:</b>\n"
     "• <code>/menu</code> — показать клавиатуру\n"
     "• <code>/help</code> — помощь\n"
+    "• <code>/search слово</code> — поиск по вашим снам\n"
+    "• <code>/export</code> — выгрузить дневник (html, csv или jsonl)\n"
 )
 
 # Константы для премиума 
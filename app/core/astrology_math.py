@@ -1,10 +1,8 @@
 # app/core/astrology_math.py
 from __future__ import annotations
-from datetime import datetime, timezone
+from datetime import datetime, timedelta
 
-# Опорная дата Новолуния (NASA JPL близко к 2000-01-06 18:14 UTC)
-_BASE_NEW_MOON = datetime(2000, 1, 6, 18, 14, tzinfo=timezone.utc)
-_SYNODIC = 29.530588  # длина лунного цикла в днях
+from app.core.lunar import FIRST_QUARTER, FULL, LAST_QUARTER, NEW, phase_table
 
 def _e(symbol: str) -> str:
     """Добавляем variation selector (U+FE0F), чтобы эмодзи всегда были цветными."""
@@ -21,6 +19,11 @@ _EMOJI = {
     "wan_cres": _e("🌘"),
 }
 
+SIGNS = (
+    "Овен", "Телец", "Близнецы", "Рак", "Лев", "Дева",
+    "Весы", "Скорпион", "Стрелец", "Козерог", "Водолей", "Рыбы",
+)
+
 def sun_sign(d: datetime) -> str:
     """Определяем солнечный знак по дате рождения (тропический зодиак)."""
     m, day = d.month, d.day
@@ -44,26 +47,46 @@ def sun_sign(d: datetime) -> str:
             return name
     return "Неопределён"
 
+# сколько после момента главной фазы держим её название (дальше — «Растущая/Убывающая»)
+_PRINCIPAL_SPAN = {
+    NEW: timedelta(days=1),
+    FIRST_QUARTER: timedelta(days=2),
+    FULL: timedelta(days=1),
+    LAST_QUARTER: timedelta(days=2),
+}
+_PRINCIPAL = {
+    NEW: ("Новолуние", "new"),
+    FIRST_QUARTER: ("Первая четверть", "first_q"),
+    FULL: ("Полнолуние", "full"),
+    LAST_QUARTER: ("Последняя четверть", "last_q"),
+}
+# между главными фазами
+_BETWEEN = {
+    NEW: ("Растущая Луна", "wax_cres"),
+    FIRST_QUARTER: ("Растущая Луна", "wax_gibb"),
+    FULL: ("Убывающая Луна", "wan_gibb"),
+    LAST_QUARTER: ("Убывающая Луна", "wan_cres"),
+}
+
 def moon_phase(now_utc: datetime) -> tuple[str, int, str]:
     """
     Возвращает (название фазы, день цикла [0..29], эмодзи).
+    Моменты фаз — из таблицы app.core.lunar (ряды Мееуса), поиск бинарный.
     """
-    days = (now_utc - _BASE_NEW_MOON).total_seconds() / 86400.0
-    day = int(days % _SYNODIC)
+    table = phase_table()
+    last_at, code = table.last_transition(now_utc)
+    day = min(29, int((now_utc - table.last_new_moon(now_utc)).total_seconds() // 86400))
+
+    label, emoji_key = _PRINCIPAL[code] if now_utc - last_at < _PRINCIPAL_SPAN[code] else _BETWEEN[code]
+    return label, day, _EMOJI[emoji_key]
+
 
-    if day == 0:
-        return "Новолуние", day, _EMOJI["new"]
-    elif 1 <= day <= 6:
-        return "Растущая Луна", day, _EMOJI["wax_cres"]
-    elif 7 <= day <= 8:
-        return "Первая четверть", day, _EMOJI["first_q"]
-    elif 9 <= day <= 13:
-        return "Растущая Луна", day, _EMOJI["wax_gibb"]
-    elif day == 14:
-        return "Полнолуние", day, _EMOJI["full"]
-    elif 15 <= day <= 20:
-        return "Убывающая Луна", day, _EMOJI["wan_gibb"]
-    elif 21 <= day <= 22:
-        return "Последняя четверть", day, _EMOJI["last_q"]
-    else:  # 23..29
-        return "Убывающая Луна", day, _EMOJI["wan_cres"]
+def next_phase_change(now_utc: datetime) -> datetime:
+    """Ближайший момент после now_utc, когда moon_phase() сменит название фазы."""
+    table = phase_table()
+    last_at, code = table.last_transition(now_utc)
+    label_ends = last_at + _PRINCIPAL_SPAN[code]
+    if label_ends > now_utc:
+        return label_ends
+    next_at, _ = table.next_transition(now_utc)
+    return next_at
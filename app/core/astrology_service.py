@@ -1,12 +1,16 @@
 # app/core/astrology_service.py
 from __future__ import annotations
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timedelta, timezone
 import html
 import os
 import re
+import time as _time
 
-from app.core.astrology_math import sun_sign, moon_phase
+from loguru import logger
+
+from app.core.astrology_math import SIGNS, sun_sign, moon_phase
+from app.core.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS, key_label
 
 # --------------------- HTML sanitize ---------------------
 
@@ -29,31 +33,57 @@ def _sanitize_html(s: str, allow_tags: set[str] | None = None) -> str:
 
 # ---------------------- LLM call -------------------------
 
-def _call_llm(*, system: str, user: str, model: str, temperature: float = 0.4) -> str:
+class AstrologyKeyMissing(RuntimeError):
+    """Нет ключа LLM для астрологии — прогноз не сгенерировать (и кэшировать нечего)."""
+
+
+# мягкий фоллбек без ключа, только чтобы бот не падал (в проде ключ обязателен);
+# заголовок по знаку/фазе добавит _normalize_to_agreed_format, имя — _with_subtitle
+_DEMO_FORECAST = (
+    "✨ Фокус 1\n"
+    "Демо-режим: нет ключа API. Содержательное наполнение недоступно.\n\n"
+    "✨ Фокус 2\n"
+    "Демо-режим: нет ключа API.\n\n"
+    "✨ Фокус 3\n"
+    "Демо-режим: нет ключа API.\n\n"
+    "⚠️ Предостережение:\n"
+    "Демо-режим: нет ключа API.\n\n"
+    "<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"
+)
+
+
+def _call_llm(*, system: str, user: str, model: str, temperature: float = 0.4, cache: str | None = None) -> str:
     from openai import OpenAI
+    from app.db.llm_usage import record_usage
     api_key = os.getenv("LLM_ASTROLOGY_KEYS") or os.getenv("OPENAI_API_KEY")
     if not api_key:
-        # мягкий фоллбек только чтобы бот не падал (в проде ключ обязателен)
-        return (
-            "<b>Астропрогноз на день для Рак (Убывающая Луна 🌖)</b>\n"
-            "Астропрогноз для Имя Фамилия на 25-й день Убывающей Луны 🌖\n\n"
-            "✨ Фокус 1\n"
-            "Демо-режим: нет ключа API. Содержательное наполнение недоступно.\n\n"
-            "✨ Фокус 2\n"
-            "Демо-режим: нет ключа API.\n\n"
-            "✨ Фокус 3\n"
-            "Демо-режим: нет ключа API.\n\n"
-            "⚠️ Предостережение:\n"
-            "Демо-режим: нет ключа API.\n\n"
-            "<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"
+        raise AstrologyKeyMissing("LLM_ASTROLOGY_KEYS / OPENAI_API_KEY is not set")
+    # LLM_BASE_URL — тот же OpenAI-совместимый endpoint, что и у app.core.llm_client
+    client = OpenAI(api_key=api_key, base_url=os.getenv("LLM_BASE_URL") or None)
+    started = _time.perf_counter()
+    try:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": system},
+                      {"role": "user", "content": user}],
+            temperature=temperature,
         )
-    client = OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "system", "content": system},
-                  {"role": "user", "content": user}],
-        temperature=temperature,
-    )
+    except Exception:
+        LLM_REQUESTS.labels("astrology", model, "error").inc()
+        record_usage("astrology", model=model, api_key=key_label(api_key), cache=cache, outcome="error",
+                     latency_ms=int((_time.perf_counter() - started) * 1000))
+        raise
+    finally:
+        LLM_LATENCY.labels("astrology", model, key_label(api_key)).observe(_time.perf_counter() - started)
+    LLM_REQUESTS.labels("astrology", model, "ok").inc()
+    prompt_tokens = completion_tokens = 0
+    if resp.usage is not None:
+        prompt_tokens, completion_tokens = resp.usage.prompt_tokens or 0, resp.usage.completion_tokens or 0
+        LLM_TOKENS.labels("astrology", model, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels("astrology", model, "completion").inc(completion_tokens)
+    record_usage("astrology", model=model, api_key=key_label(api_key), cache=cache,
+                 prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                 latency_ms=int((_time.perf_counter() - started) * 1000))
     return resp.choices[0].message.content or ""
 
 # ---------------------- Data model -----------------------
@@ -69,6 +99,7 @@ class AstroInput:
 
 def build_facts(ai: AstroInput) -> dict:
     sign = sun_sign(ai.birth_date)
+    now = datetime.now(timezone.utc)
 
     # Тестовый оверрайд фазы (не ставить в проде):
     # LUNAR_PHASE_FOR_TEST in {"new","wax","full","wan"}
@@ -82,20 +113,27 @@ def build_facts(ai: AstroInput) -> dict:
         }
         phase_label, emoji, day = mapping[override]
     else:
-        phase_label, day, emoji = moon_phase(datetime.now(timezone.utc))
+        phase_label, day, emoji = moon_phase(now)
+
+    return {"sign": sign, "phase": phase_label, "phase_day": day, "phase_emoji": emoji, "date": now.date()}
 
-    return {"sign": sign, "phase": phase_label, "phase_day": day, "phase_emoji": emoji}
+
+def _facts_at(sign: str, at: datetime) -> dict:
+    phase_label, day, emoji = moon_phase(at)
+    return {"sign": sign, "phase": phase_label, "phase_day": day, "phase_emoji": emoji, "date": at.date()}
 
 # ---------------------- Output normalize -----------------
 
 _H1_RE = re.compile(r"^\s*<b>Астропрогноз.+?</b>\s*$", re.IGNORECASE)
 _SUB_RE = re.compile(r"^\s*Астропрогноз для.+$", re.IGNORECASE)
 
-def _normalize_to_agreed_format(raw: str, *, facts: dict, ai: AstroInput) -> str:
+def _normalize_to_agreed_format(raw: str, *, facts: dict, ai: AstroInput | None) -> str:
     """
     Приводим ответ к согласованной форме:
     - если GPT уже вывел заголовок/подзаголовок — оставляем (убираем дубли),
       иначе аккуратно добавляем.
+    - ai=None — общий прогноз для кэша: подзаголовок с именем выбрасываем,
+      его подставляет _with_subtitle при выдаче.
     - не меняем смысл блоков, только форматируем абзацы.
     """
     text = raw.replace("\\n", "\n").strip()
@@ -121,7 +159,7 @@ def _normalize_to_agreed_format(raw: str, *, facts: dict, ai: AstroInput) -> str
                 seen_h1 = True
             continue
         if _SUB_RE.match(l):
-            if not seen_sub:
+            if ai is not None and not seen_sub:
                 filtered.append(l)
                 seen_sub = True
             continue
@@ -141,7 +179,7 @@ def _normalize_to_agreed_format(raw: str, *, facts: dict, ai: AstroInput) -> str
         # (оно уже в lines[0..])
         pass
 
-    if sub_needed:
+    if sub_needed and ai is not None:
         sub = f"Астропрогноз для {ai.full_name} на {facts['phase_day']}-й день {facts['phase']} {facts['phase_emoji']}"
         body_lines.append(sub)
 
@@ -156,47 +194,125 @@ def _normalize_to_agreed_format(raw: str, *, facts: dict, ai: AstroInput) -> str
 
 # ---------------------- Public API -----------------------
 
-def render_llm(facts: dict, ai: AstroInput) -> str:
-    """
-    GPT сам создаёт прогноз строго в согласованном формате.
-    Мы только санитизируем HTML и подправляем шапки, если GPT их пропустил.
-    """
+# меняйте при любой правке промпта — старые прогнозы в кэше перестанут совпадать
+PROMPT_VERSION = "daily-v1"
+
+_FOOTNOTE = "<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"
+
+_SYSTEM = (
+    "Ты выступаешь в роли астролога и создаёшь ежедневный астрологический прогноз для знака зодиака.\n\n"
+    "Дано: солнечный знак и текущая фаза Луны (с номером дня цикла). "
+    "Опирайся ТОЛЬКО на эти данные.\n\n"
+    "Формат ответа строго фиксированный (Telegram HTML):\n"
+    '1. Заголовок: "<b>Астропрогноз на день для {Знак} ({Фаза} {Эмодзи})</b>"\n'
+    '2. Три блока "✨ Фокус 1", "✨ Фокус 2", "✨ Фокус 3".\n'
+    '   - Каждый блок начинается с "✨ Фокус N" (без двоеточия).\n'
+    "   - Под каждым фокусом напиши 2–3 предложения живого описания, основанных на знаке и фазе Луны. "
+    "Избегай шаблонных клише — добавляй конкретику и астрологическую логику.\n"
+    '3. Один блок "⚠️ Предостережение:" — 1–2 предложения о рисках или том, чего сегодня стоит избегать.\n'
+    '4. В конце сноска: "' + _FOOTNOTE + '"\n\n'
+    'Дополнительные правила:\n'
+    '— Пиши только текст прогноза, без пояснений и без повторного слова "Астропрогноз" в других местах.\n'
+    "— Не обращайся к человеку по имени.\n"
+    "— Используй только разрешённые теги <b> и <i>.\n"
+    "— Не используй списки и нумерацию.\n"
+    "— Всегда выдай три фокуса и одно предостережение."
+)
+
+
+def _generate_forecast(facts: dict, cache: str = "miss") -> str:
+    """Общий прогноз для (знак, фаза) — без имени, чтобы его можно было раздавать всем."""
     model = os.getenv("LLM_ASTROLOGY_MODEL", os.getenv("GPT_MODEL", "gpt-4o-mini"))
-
-    system = (
-        "Ты выступаешь в роли астролога и создаёшь ежедневный астрологический прогноз.\n\n"
-        "Дано: солнечный знак, текущая фаза Луны (с номером дня цикла), а также имя и дата рождения человека. "
-        "Опирайся ТОЛЬКО на эти данные.\n\n"
-        "Формат ответа строго фиксированный (Telegram HTML):\n"
-        '1. Заголовок: "<b>Астропрогноз на день для {Знак} ({Фаза} {Эмодзи})</b>"\n'
-        '2. Подзаголовок: "Астропрогноз для {Имя Фамилия} на {День цикла}-й день {Фазы} {Эмодзи}"\n'
-        '3. Три блока "✨ Фокус 1", "✨ Фокус 2", "✨ Фокус 3".\n'
-        '   - Каждый блок начинается с "✨ Фокус N" (без двоеточия).\n'
-        "   - Под каждым фокусом напиши 2–3 предложения живого описания, основанных на знаке и фазе Луны. "
-        "Избегай шаблонных клише — добавляй конкретику и астрологическую логику.\n"
-        '4. Один блок "⚠️ Предостережение:" — 1–2 предложения о рисках или том, чего сегодня стоит избегать.\n'
-        '5. В конце сноска: "<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"\n\n'
-        'Дополнительные правила:\n'
-        '— Пиши только текст прогноза, без пояснений и без повторного слова "Астропрогноз" в других местах.\n'
-        "— Используй только разрешённые теги <b> и <i>.\n"
-        "— Не используй списки и нумерацию.\n"
-        "— Всегда выдай три фокуса и одно предостережение."
-    )
-
     user = (
-        f"Имя: {ai.full_name}\n"
-        f"Дата рождения: {ai.birth_date.strftime('%d.%m.%Y')}\n"
+        f"Дата: {facts['date'].strftime('%d.%m.%Y')}\n"
         f"Солнечный знак: {facts['sign']}\n"
         f"Фаза Луны: {facts['phase']} {facts['phase_emoji']}\n"
         f"Номер дня лунного цикла: {facts['phase_day']}\n"
     )
-
-    raw = _call_llm(system=system, user=user, model=model, temperature=0.4)
-    formatted = _normalize_to_agreed_format(raw, facts=facts, ai=ai)
+    raw = _call_llm(system=_SYSTEM, user=user, model=model, temperature=0.4, cache=cache)
+    formatted = _normalize_to_agreed_format(raw, facts=facts, ai=None)
     sanitized = _sanitize_html(formatted, allow_tags={"b", "i"})
 
     # гарантируем сноску, если GPT вдруг забыл
     if "Основано на солнечном знаке" not in sanitized:
-        sanitized += "\n\n<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"
-
+        sanitized += "\n\n" + _FOOTNOTE
     return sanitized
+
+
+def _demo_forecast(facts: dict) -> str:
+    return _normalize_to_agreed_format(_DEMO_FORECAST, facts=facts, ai=None)
+
+
+def forecast_body(facts: dict) -> str:
+    """
+    Прогноз из кэша по (дата, знак, день цикла, версия промпта); промах — генерируем и сохраняем.
+    Без ключа LLM отдаём демо-текст и не кэшируем его: после настройки ключа
+    эти дни сгенерируются по-настоящему.
+    """
+    from app.db.forecasts import get_forecast, put_forecast
+    from app.db.llm_usage import record_usage
+
+    key = (facts["date"], facts["sign"], facts["phase_day"], PROMPT_VERSION)
+    started = _time.perf_counter()
+    body = get_forecast(key)
+    if body is None:
+        try:
+            body = put_forecast(key, _generate_forecast(facts))
+        except AstrologyKeyMissing:
+            logger.warning("[astro-forecast] no LLM key, serving the demo forecast uncached")
+            body = _demo_forecast(facts)
+    else:
+        record_usage("astrology", cache="hit", latency_ms=int((_time.perf_counter() - started) * 1000))
+    return body
+
+
+def _with_subtitle(body: str, facts: dict, full_name: str) -> str:
+    """Персональный подзаголовок — сразу после заголовка общего прогноза."""
+    sub = (
+        f"Астропрогноз для {html.escape(full_name)} на {facts['phase_day']}-й день "
+        f"{facts['phase']} {facts['phase_emoji']}"
+    )
+    head, sep, rest = body.partition("\n\n")
+    return f"{head}\n\n{sub}{sep}{rest}" if sep else f"{head}\n\n{sub}"
+
+
+def render_llm(facts: dict, ai: AstroInput) -> str:
+    """
+    Прогноз на день: общий текст для знака и фазы Луны из кэша
+    (LLM вызывается только на промах), плюс подзаголовок с именем.
+    """
+    return _with_subtitle(forecast_body(facts), facts, ai.full_name)
+
+
+def pregenerate_forecasts(day: date) -> int:
+    """
+    Заранее сгенерировать прогнозы всех 12 знаков на сутки day (UTC).
+    День цикла может смениться в течение суток — берём оба значения.
+    Возвращает число новых вызовов LLM.
+    """
+    from app.db.forecasts import get_forecast, put_forecast
+
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    moments = [start, start + timedelta(hours=23, minutes=59)]
+    generated = 0
+    for sign in SIGNS:
+        seen = set()
+        for at in moments:
+            facts = _facts_at(sign, at)
+            facts["date"] = day
+            if facts["phase_day"] in seen:
+                continue
+            seen.add(facts["phase_day"])
+            key = (day, sign, facts["phase_day"], PROMPT_VERSION)
+            if get_forecast(key) is not None:
+                continue
+            try:
+                put_forecast(key, _generate_forecast(facts, cache="prefill"))
+                generated += 1
+            except AstrologyKeyMissing:
+                logger.warning("[astro-forecast] no LLM key, nothing to pregenerate for {}", day)
+                return generated
+            except Exception:
+                logger.exception("[astro-forecast] {} {} day={} failed", day, sign, facts["phase_day"])
+    logger.info("[astro-forecast] pregenerated {} forecasts for {}", generated, day)
+    return generated
@@ -7,42 +7,55 @@ from openai import (
     AuthenticationError, BadRequestError, OpenAIError,
 )
 from .llm_router import KeyRouter, Feature
+from .metrics import LLM_LATENCY, LLM_REQUESTS, LLM_RETRIES, LLM_TOKENS, key_label
 from loguru import logger
 
 router = KeyRouter()
 
 TIMEOUT = int(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
 RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# OpenAI-совместимый endpoint; пусто — api.openai.com (для офлайн-прогонов — app.devtools.fake_openai)
+BASE_URL = os.getenv("LLM_BASE_URL") or None
 
 def _client_for(api_key: str) -> OpenAI:
-    return OpenAI(api_key=api_key, timeout=TIMEOUT)
+    return OpenAI(api_key=api_key, base_url=BASE_URL, timeout=TIMEOUT)
 
-def _mask(key: str | None) -> str:
-    if not key:
-        return "<empty>"
-    return key[:7] + "…" + key[-4:]
-
-def chat(feature: Feature, messages: list[dict], temperature: float = 0.3, **kwargs) -> str:
+def chat(feature: Feature, messages: list[dict], temperature: float = 0.3, *,
+         cache: Optional[str] = None, **kwargs) -> str:
+    """
+    cache — как вызов соотносится с кэшем перед LLM (miss | prefill), для журнала
+    llm_usage; None — у фичи кэша нет.
+    """
     last_err: Optional[Exception] = None
+    call_started = time.perf_counter()
     for attempt in range(RETRIES + 1):
         api_key, model = router.next_creds(feature)
         try:
             client = _client_for(api_key)
             logger.info("[llm] call feature={} model={} attempt={} key={}",
-                        feature.value, model, attempt, _mask(api_key))
-
-            resp = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                **kwargs,
-            )
+                        feature.value, model, attempt, key_label(api_key))
+
+            started = time.perf_counter()
+            try:
+                resp = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    **kwargs,
+                )
+            finally:
+                LLM_LATENCY.labels(feature.value, model, key_label(api_key)).observe(time.perf_counter() - started)
+            prompt_tokens, completion_tokens = _count_tokens(feature, model, resp)
+            LLM_REQUESTS.labels(feature.value, model, "ok").inc()
+            _record(feature, model, api_key, call_started, attempt + 1, cache, "ok",
+                    prompt_tokens, completion_tokens)
             return resp.choices[0].message.content
 
         except (RateLimitError, APITimeoutError, APIConnectionError, APIError) as e:
             last_err = e
             logger.warning("[llm] retryable {} feature={} model={} attempt={}",
                            type(e).__name__, feature.value, model, attempt)
+            LLM_RETRIES.labels(feature.value, model, type(e).__name__).inc()
             time.sleep(0.8)
             continue
 
@@ -52,9 +65,25 @@ def chat(feature: Feature, messages: list[dict], temperature: float = 0.3, **kwa
                          type(e).__name__, feature.value, model, attempt)
             break
 
+    LLM_REQUESTS.labels(feature.value, model, "error").inc()
+    _record(feature, model, api_key, call_started, attempt + 1, cache, "error")
     raise RuntimeError(f"LLM request failed after retries: {last_err}")
 
-def _mask(key: str | None) -> str:
-    if not key:
-        return "<empty>"
-    return key[:7] + "…" + key[-4:]
\ No newline at end of file
+def _count_tokens(feature: Feature, model: str, resp) -> tuple[int, int]:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return 0, 0
+    prompt, completion = usage.prompt_tokens or 0, usage.completion_tokens or 0
+    LLM_TOKENS.labels(feature.value, model, "prompt").inc(prompt)
+    LLM_TOKENS.labels(feature.value, model, "completion").inc(completion)
+    return prompt, completion
+
+def _record(feature: Feature, model: str, api_key: str, started: float, attempts: int,
+            cache: Optional[str], outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    from app.db.llm_usage import record_usage
+    record_usage(
+        feature.value, model=model, api_key=key_label(api_key),
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        latency_ms=int((time.perf_counter() - started) * 1000),
+        attempts=attempts, cache=cache, outcome=outcome,
+    )
\ No newline at end of file
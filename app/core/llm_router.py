@@ -8,6 +8,7 @@ from loguru import logger
 class Feature(Enum):
     DREAM = "dream"
     NUMEROLOGY = "numerology"
+    STATS = "stats"
 
 @dataclass
 class LLMConfig:
@@ -34,6 +35,11 @@ class KeyRouter:
                 model=os.getenv("LLM_NUMEROLOGY_MODEL", "gpt-4o-mini"),
                 keys=_split_env("LLM_NUMEROLOGY_KEYS"),
             ),
+            # сводки статистики — по умолчанию на ключах и модели снов, но учитываются отдельно
+            Feature.STATS: LLMConfig(
+                model=os.getenv("LLM_STATS_MODEL") or os.getenv("LLM_DREAM_MODEL", "gpt-4o-mini"),
+                keys=_split_env("LLM_STATS_KEYS") or _split_env("LLM_DREAM_KEYS"),
+            ),
         }
         logger.info(
             "[llm] init: dream_keys={}, numerology_keys={}, dream_model={}, numerology_model={}",
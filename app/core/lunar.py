@@ -0,0 +1,176 @@
+# app/core/lunar.py
+from __future__ import annotations
+
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import numpy as np
+
+# Моменты главных фаз Луны по рядам Мееуса (Astronomical Algorithms, гл. 49):
+# средняя фаза + периодические поправки по аргументам элонгации
+# (аномалии Солнца/Луны, аргумент широты, узел) + планетные поправки A1..A14.
+# Точность — порядка минуты на десятилетиях вокруг 2000 г.
+
+NEW, FIRST_QUARTER, FULL, LAST_QUARTER = 0, 1, 2, 3
+
+_JD_UNIX_EPOCH = 2440587.5
+# ΔT = TT − UTC, секунды (≈69 с в 2020-х; для подписи фаз минутной точности хватает)
+_DELTA_T = 69.0
+
+_D2R = np.pi / 180.0
+
+
+def _sin(deg: np.ndarray) -> np.ndarray:
+    return np.sin(deg * _D2R)
+
+
+def _cos(deg: np.ndarray) -> np.ndarray:
+    return np.cos(deg * _D2R)
+
+
+def phase_instants(k: np.ndarray) -> np.ndarray:
+    """
+    Моменты фаз для массива k (целое — новолуние, +.25 первая четверть,
+    +.5 полнолуние, +.75 последняя четверть; k=0 — новолуние 6 янв. 2000).
+    Возвращает unix-время (секунды, UTC).
+    """
+    k = np.asarray(k, dtype=np.float64)
+    frac = np.round((k - np.floor(k)) * 4).astype(int) % 4
+    T = k / 1236.85
+    T2, T3, T4 = T * T, T ** 3, T ** 4
+
+    jde = 2451550.09766 + 29.530588861 * k + 0.00015437 * T2 - 0.000000150 * T3 + 0.00000000073 * T4
+    E = 1 - 0.002516 * T - 0.0000074 * T2
+    M = 2.5534 + 29.10535670 * k - 0.0000014 * T2 - 0.00000011 * T3
+    Mp = 201.5643 + 385.81693528 * k + 0.0107582 * T2 + 0.00001238 * T3 - 0.000000058 * T4
+    F = 160.7108 + 390.67050284 * k - 0.0016118 * T2 - 0.00000227 * T3 + 0.000000011 * T4
+    Om = 124.7746 - 1.56375588 * k + 0.0020672 * T2 + 0.00000215 * T3
+
+    # общие для новолуния/полнолуния члены (коэффициенты у них почти совпадают)
+    def syzygy(c: Tuple[float, ...]) -> np.ndarray:
+        return (
+            c[0] * _sin(Mp) + c[1] * E * _sin(M) + c[2] * _sin(2 * Mp) + c[3] * _sin(2 * F)
+            + c[4] * E * _sin(Mp - M) + c[5] * E * _sin(Mp + M) + c[6] * E * E * _sin(2 * M)
+            - 0.00111 * _sin(Mp - 2 * F) - 0.00057 * _sin(Mp + 2 * F) + 0.00056 * E * _sin(2 * Mp + M)
+            - 0.00042 * _sin(3 * Mp) + 0.00042 * E * _sin(M + 2 * F) + 0.00038 * E * _sin(M - 2 * F)
+            - 0.00024 * E * _sin(2 * Mp - M) - 0.00017 * _sin(Om) - 0.00007 * _sin(Mp + 2 * M)
+            + 0.00004 * _sin(2 * Mp - 2 * F) + 0.00004 * _sin(3 * M) + 0.00003 * _sin(Mp + M - 2 * F)
+            + 0.00003 * _sin(2 * Mp + 2 * F) - 0.00003 * _sin(Mp + M + 2 * F) + 0.00003 * _sin(Mp - M + 2 * F)
+            - 0.00002 * _sin(Mp - M - 2 * F) - 0.00002 * _sin(3 * Mp + M) + 0.00002 * _sin(4 * Mp)
+        )
+
+    new_corr = syzygy((-0.40720, 0.17241, 0.01608, 0.01039, 0.00739, -0.00514, 0.00208))
+    full_corr = syzygy((-0.40614, 0.17302, 0.01614, 0.01043, 0.00734, -0.00515, 0.00209))
+    quarter_corr = (
+        -0.62801 * _sin(Mp) + 0.17172 * E * _sin(M) - 0.01183 * E * _sin(Mp + M) + 0.00862 * _sin(2 * Mp)
+        + 0.00804 * _sin(2 * F) + 0.00454 * E * _sin(Mp - M) + 0.00204 * E * E * _sin(2 * M)
+        - 0.00180 * _sin(Mp - 2 * F) - 0.00070 * _sin(Mp + 2 * F) - 0.00040 * _sin(3 * Mp)
+        - 0.00034 * E * _sin(2 * Mp - M) + 0.00032 * E * _sin(M + 2 * F) + 0.00032 * E * _sin(M - 2 * F)
+        - 0.00028 * E * E * _sin(Mp + 2 * M) + 0.00027 * E * _sin(2 * Mp + M) - 0.00017 * _sin(Om)
+        - 0.00005 * _sin(Mp - M - 2 * F) + 0.00004 * _sin(2 * Mp + 2 * F) - 0.00004 * _sin(Mp + M + 2 * F)
+        + 0.00004 * _sin(Mp - 2 * M) + 0.00003 * _sin(Mp + M - 2 * F) + 0.00003 * _sin(3 * M)
+        + 0.00002 * _sin(2 * Mp - 2 * F) + 0.00002 * _sin(Mp - M + 2 * F) - 0.00002 * _sin(3 * Mp + M)
+    )
+    W = (
+        0.00306 - 0.00038 * E * _cos(M) + 0.00026 * _cos(Mp)
+        - 0.00002 * _cos(Mp - M) + 0.00002 * _cos(Mp + M) + 0.00002 * _cos(2 * F)
+    )
+
+    corr = np.select(
+        [frac == NEW, frac == FULL, frac == FIRST_QUARTER],
+        [new_corr, full_corr, quarter_corr + W],
+        default=quarter_corr - W,
+    )
+
+    planetary = (
+        0.000325 * _sin(299.77 + 0.107408 * k - 0.009173 * T2)
+        + 0.000165 * _sin(251.88 + 0.016321 * k)
+        + 0.000164 * _sin(251.83 + 26.651886 * k)
+        + 0.000126 * _sin(349.42 + 36.412478 * k)
+        + 0.000110 * _sin(84.66 + 18.206239 * k)
+        + 0.000062 * _sin(141.74 + 53.303771 * k)
+        + 0.000060 * _sin(207.14 + 2.453732 * k)
+        + 0.000056 * _sin(154.84 + 7.306860 * k)
+        + 0.000047 * _sin(34.52 + 27.261239 * k)
+        + 0.000042 * _sin(207.19 + 0.121824 * k)
+        + 0.000040 * _sin(291.34 + 1.844379 * k)
+        + 0.000037 * _sin(161.72 + 24.198154 * k)
+        + 0.000035 * _sin(239.56 + 25.513099 * k)
+        + 0.000023 * _sin(331.55 + 3.592518 * k)
+    )
+
+    jde = jde + corr + planetary
+    return (jde - _JD_UNIX_EPOCH) * 86400.0 - _DELTA_T
+
+
+def _k_near(year: float) -> float:
+    return np.floor((year - 2000.0) * 12.3685)
+
+
+class PhaseTable:
+    """
+    Таблица главных фаз на диапазон лет: отсортированные моменты (unix, float64)
+    и код фазы (NEW/FIRST_QUARTER/FULL/LAST_QUARTER).
+    «Фаза в момент t» и «следующий переход после t» — бинарный поиск.
+    """
+
+    def __init__(self, start_year: int, end_year: int) -> None:
+        k0, k1 = _k_near(start_year) - 1, _k_near(end_year + 1) + 1
+        k = np.arange(k0, k1 + 0.01, 0.25)
+        self.times: np.ndarray = phase_instants(k)
+        self.codes: np.ndarray = (np.round((k - np.floor(k)) * 4).astype(np.int8)) % 4
+        # для bisect по обычному списку — без накладных расходов numpy на скаляры
+        self._times_list: List[float] = self.times.tolist()
+
+    def _index_at(self, ts: float) -> int:
+        i = bisect.bisect_right(self._times_list, ts) - 1
+        if i < 0 or i + 1 >= len(self._times_list):
+            raise ValueError("moment is outside of the phase table")
+        return i
+
+    def last_transition(self, t: datetime) -> Tuple[datetime, int]:
+        """Последняя главная фаза не позже t: (момент, код)."""
+        i = self._index_at(t.timestamp())
+        return _dt(self._times_list[i]), int(self.codes[i])
+
+    def next_transition(self, t: datetime) -> Tuple[datetime, int]:
+        """Первая главная фаза строго после t: (момент, код)."""
+        i = self._index_at(t.timestamp()) + 1
+        return _dt(self._times_list[i]), int(self.codes[i])
+
+    def last_new_moon(self, t: datetime) -> datetime:
+        i = self._index_at(t.timestamp())
+        while self.codes[i] != NEW:
+            i -= 1
+        return _dt(self._times_list[i])
+
+    def transitions_between(self, start: datetime, end: datetime) -> List[Tuple[datetime, int]]:
+        """Все главные фазы в [start, end) — векторно по массиву."""
+        lo, hi = np.searchsorted(self.times, [start.timestamp(), end.timestamp()])
+        return [(_dt(ts), int(c)) for ts, c in zip(self.times[lo:hi].tolist(), self.codes[lo:hi].tolist())]
+
+
+def _dt(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+_table: PhaseTable | None = None
+
+# сколько лет покрывает таблица вокруг текущего (считается за миллисекунды)
+TABLE_YEARS_BACK = 2
+TABLE_YEARS_AHEAD = 10
+
+
+def phase_table() -> PhaseTable:
+    """Общая таблица процесса; строится при первом обращении."""
+    global _table
+    if _table is None:
+        year = datetime.now(timezone.utc).year
+        _table = PhaseTable(year - TABLE_YEARS_BACK, year + TABLE_YEARS_AHEAD)
+    return _table
+
+
+def lunar_age(t: datetime) -> timedelta:
+    """Сколько прошло с последнего новолуния."""
+    return t - phase_table().last_new_moon(t)
@@ -0,0 +1,128 @@
+# app/core/metrics.py
+from __future__ import annotations
+
+import hashlib
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Все метрики процесса. Отдаются на /metrics FastAPI-сервиса (app.api.main),
+# бот в режиме polling — отдельным HTTP-сервером на METRICS_PORT (app.bot.main).
+# uvicorn --workers N: задайте PROMETHEUS_MULTIPROC_DIR — тогда /metrics
+# суммирует метрики всех воркеров.
+
+# попадания/промахи кэшей, которые экономят вызовы LLM
+# cache: numerology | astro_forecast; result: hit | miss
+LLM_CACHE_REQUESTS = Counter(
+    "dreambot_llm_cache_requests_total",
+    "Lookups in caches that stand in front of LLM calls",
+    ["cache", "result"],
+)
+
+# ---- хэндлеры aiogram (app.bot.middlewares.metrics) ----
+# event: message | callback_query | inline_query; handler: модуль.функция
+HANDLER_LATENCY = Histogram(
+    "dreambot_handler_duration_seconds",
+    "Time spent in a matched aiogram handler",
+    ["event", "handler"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HANDLERS_IN_FLIGHT = Gauge(
+    "dreambot_handlers_in_flight",
+    "Handlers currently running",
+    ["event"],
+    multiprocess_mode="livesum",
+)
+HANDLER_ERRORS = Counter(
+    "dreambot_handler_errors_total",
+    "Exceptions raised from aiogram handlers",
+    ["event", "handler", "error"],
+)
+
+# ---- LLM (app.core.llm_client, astrology_service) ----
+# key — короткий хэш ключа (key_label): ключи различимы, но ни одного символа ключа
+# наружу (ключей единицы — кардинальность мала)
+LLM_LATENCY = Histogram(
+    "dreambot_llm_request_duration_seconds",
+    "Duration of a single chat completion attempt",
+    ["feature", "model", "key"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90),
+)
+# outcome: ok | error (после всех повторов)
+LLM_REQUESTS = Counter(
+    "dreambot_llm_requests_total",
+    "Chat completion calls by final outcome",
+    ["feature", "model", "outcome"],
+)
+LLM_RETRIES = Counter(
+    "dreambot_llm_retries_total",
+    "Retryable LLM failures (each one costs another attempt)",
+    ["feature", "model", "error"],
+)
+# kind: prompt | completion
+LLM_TOKENS = Counter(
+    "dreambot_llm_tokens_total",
+    "Tokens reported in LLM usage",
+    ["feature", "model", "kind"],
+)
+
+# ---- БД (app.db.instrumentation) ----
+# statement: SELECT | INSERT | UPDATE | DELETE | … (первое слово запроса)
+DB_QUERY_LATENCY = Histogram(
+    "dreambot_db_query_duration_seconds",
+    "Duration of a single SQL statement",
+    ["statement"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+# от выдачи соединения из пула до возврата — сколько держит его сессия/транзакция
+DB_CONNECTION_HOLD = Histogram(
+    "dreambot_db_connection_hold_seconds",
+    "Time a pooled connection stays checked out",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 15, 60),
+)
+
+# ---- планировщик (app.bot.reminders) ----
+# job — id задачи без хвостового номера пользователя (remind_user_42 -> remind_user)
+# outcome: ok | error
+SCHEDULER_JOB_DURATION = Histogram(
+    "dreambot_scheduler_job_duration_seconds",
+    "APScheduler job run time",
+    ["job", "outcome"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+SCHEDULER_JOB_LAG = Histogram(
+    "dreambot_scheduler_job_lag_seconds",
+    "Delay between the scheduled run time and the actual start",
+    ["job"],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300),
+)
+SCHEDULER_JOBS_MISSED = Counter(
+    "dreambot_scheduler_jobs_missed_total",
+    "Job runs skipped past misfire_grace_time",
+    ["job"],
+)
+
+
+def key_label(key: str | None) -> str:
+    """Метка ключа API для метрик: sha256[:8]; сверить — `printf %s "$KEY" | sha256sum`."""
+    if not key:
+        return "<empty>"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Текст для /metrics: (тело, content-type)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -132,13 +132,19 @@ class SymbolsCache:
                     return json.loads(cached)
                 except Exception:
                     pass
-            data = load_symbols_from_json()
+            data = _symbols_registry()
             try:
                 r.setex(self.key, self.ttl_sec, json.dumps(data, ensure_ascii=False))
             except Exception:
                 pass
             return data
-        return load_symbols_from_json()
+        return _symbols_registry()
+
+
+def _symbols_registry() -> Dict[str, dict]:
+    """Словарь символов из общего индекса процесса (app.core.symbol_index) — JSON читается один раз."""
+    from app.core.symbol_index import get_symbol_index
+    return get_symbol_index().symbols
 
 
 class EmotionsCache:
@@ -1,6 +1,8 @@
 # app/core/numerology_service.py
 from __future__ import annotations
 
+import html
+import time
 from datetime import datetime
 from textwrap import dedent
 from typing import Optional
@@ -26,12 +28,18 @@ FOOTNOTE = (
     "(вариант с отдельной буквой Ё, Й=2, Ь/Ъ игнорируются).</i>"
 )
 
-def _user_prompt(full_name: str, birth_date: str, nums: dict, gender: Optional[str]) -> str:
+# меняйте при любой правке промпта — кэш интерпретаций начнётся заново
+PROMPT_VERSION = "numerology-v1"
+
+# шапка с именем и датой — не от модели, а наша: так интерпретацию можно
+# переиспользовать для всех, у кого совпали числа
+_HEADER = "<b>Нумерологический профиль</b>\n{name} • {birth}\n\n"
+
+
+def _user_prompt(nums: dict, gender: Optional[str]) -> str:
     y = nums["year"]
     return dedent(f"""
     Входные данные для интерпретации (НЕ пересчитывай):
-    • ФИО: {full_name}
-    • Дата рождения: {birth_date}
     • Пол (если указан): {gender or "-"}
     • Число судьбы: {nums["destiny_number"]}
     • День рождения: {nums["birth_day_number"]}
@@ -40,10 +48,9 @@ def _user_prompt(full_name: str, birth_date: str, nums: dict, gender: Optional[s
     • Число имени: {nums["name_number"]}
     • Личный год ({y}): {nums["personal_year"]}
 
-    Сформируй ответ РОВНО по шаблону (используй только <b> и <i>):
-
-    <b>Нумерологический профиль</b>
-    {full_name} • {birth_date}
+    Сформируй ответ РОВНО по шаблону (используй только <b> и <i>).
+    Не пиши заголовок, имя и дату рождения — начни сразу с первой строки шаблона.
+    Не обращайся к человеку по имени.
 
     🔢 Число судьбы: {nums["destiny_number"]}
     1–2 короткие фразы (характер, задачи, типичные вызовы).
@@ -71,13 +78,46 @@ def _user_prompt(full_name: str, birth_date: str, nums: dict, gender: Optional[s
     Итог: одно короткое предложение-вывод про сочетание ключевых чисел.
     """).strip()
 
+
+def _cache_key(nums: dict, gender: Optional[str]) -> str:
+    """Всё, от чего зависит текст модели: версия промпта, числа calc_all и пол."""
+    return "|".join([
+        PROMPT_VERSION,
+        str(nums["destiny_number"]),
+        str(nums["birth_day_number"]),
+        str(nums["soul_number"]),
+        str(nums["personality_number"]),
+        str(nums["name_number"]),
+        f'{nums["year"]}:{nums["personal_year"]}',
+        (gender or "-").lower(),
+    ])
+
+
+def _strip_header(text: str) -> str:
+    """Если модель всё же вывела шапку с именем — срезаем всё до первого блока с числами."""
+    pos = text.find("🔢")
+    return text[pos:] if pos > 0 else text
+
+
 def analyze_numerology(full_name: str, birth_date: str, gender: Optional[str] = None) -> str:
+    from app.db.interpretations import get_interpretation, put_interpretation
+    from app.db.llm_usage import record_usage
+
     nums = calc_all(full_name, birth_date)
+    key = _cache_key(nums, gender)
     logger.info("[numerology] start name='{}' birth='{}' -> nums={}", full_name, birth_date, nums)
 
-    messages = [
-        {"role": "system", "content": SYSTEM},
-        {"role": "user", "content": _user_prompt(full_name, birth_date, nums, gender)},
-    ]
-    text = chat(Feature.NUMEROLOGY, messages, temperature=0.2)
-    return text.rstrip() + FOOTNOTE
\ No newline at end of file
+    started = time.perf_counter()
+    body = get_interpretation(key)
+    if body is None:
+        messages = [
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": _user_prompt(nums, gender)},
+        ]
+        reply = chat(Feature.NUMEROLOGY, messages, temperature=0.2, cache="miss")
+        body = put_interpretation(key, _strip_header(reply.strip()))
+    else:
+        record_usage(Feature.NUMEROLOGY.value, cache="hit", latency_ms=int((time.perf_counter() - started) * 1000))
+
+    header = _HEADER.format(name=html.escape(full_name), birth=birth_date)
+    return header + body.rstrip() + FOOTNOTE
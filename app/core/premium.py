@@ -80,10 +80,11 @@ def _ensure_tg_html(s: str) -> str:
     return s
 
 
-def premium_analysis(dream_text: str) -> str:
+def premium_analysis(dream_text: str, feature: Feature = Feature.DREAM) -> str:
     """
     Премиум-анализ сна через наш LLM-роутер.
     Управляется переменной окружения PREMIUM_MODE=api|stub (stub — демо-ответ без LLM).
+    feature — под какой фичей считать вызов (ключи, метрики, журнал llm_usage).
     """
     mode = os.getenv("PREMIUM_MODE", "api").lower()
     logger.debug(f"[premium] mode={mode}")
@@ -121,7 +122,7 @@ def premium_analysis(dream_text: str) -> str:
     ]
 
     try:
-        html_out = chat(Feature.DREAM, messages, temperature=0.7)
+        html_out = chat(feature, messages, temperature=0.7)
         html_out = sanitize_tg_html(html_out)
         html_out = _ensure_tg_html(html_out)  # строгая чистка под Telegram HTML
         # на всякий случай подрежем опасные теги
@@ -0,0 +1,279 @@
+# app/core/profiling.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional
+
+from loguru import logger
+
+# Профилирование «на проде» без внешних зависимостей:
+#  • profile(seconds) — сэмплирующий профайлер: раз в PROFILE_INTERVAL_MS снимает стеки
+#    всех потоков (sys._current_frames) и отдаёт их в folded-формате
+#    («поток;f1;f2 N» — flamegraph.pl, speedscope, inferno). Вызывается из
+#    POST /debug/profile (app.api.profiling) и /profile в боте (только админы).
+#  • SlowUpdateWatch — если хэндлер идёт дольше SLOW_UPDATE_MS, пока он не
+#    закончится, снимает стеки и сохраняет их вместе с апдейтом в SLOW_UPDATE_DIR.
+#    При SLOW_UPDATE_MS=0 middleware не регистрируется вовсе (app.bot.main).
+
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+SLOW_UPDATE_MS = int(os.getenv("SLOW_UPDATE_MS", "0"))
+SLOW_UPDATE_SAMPLE_MS = float(os.getenv("SLOW_UPDATE_SAMPLE_MS", "10"))
+SLOW_UPDATE_DIR = os.getenv("SLOW_UPDATE_DIR", "data/slow_updates")
+SLOW_UPDATE_KEEP = int(os.getenv("SLOW_UPDATE_KEEP", "200"))
+
+# листовые фреймы «ничего не делаем»: цикл ждёт в select, воркеры to_thread — задач из очереди
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+CAPTURE_NAME = re.compile(r"^[\w.\-]+\.json$")
+
+
+class ProfilerBusy(RuntimeError):
+    """Профайлер уже запущен — сессии не пересекаются."""
+
+
+_session = threading.Lock()
+
+
+_CWD = os.getcwd() + os.sep
+
+
+def _short_path(path: str) -> str:
+    i = path.rfind("site-packages" + os.sep)
+    if i >= 0:
+        return path[i + len("site-packages") + 1:]
+    if path.startswith(_CWD):
+        return path[len(_CWD):]
+    return os.path.basename(path)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+
+def _stack(frame) -> List[str]:
+    out = []
+    while frame is not None:
+        out.append(_frame_label(frame))
+        frame = frame.f_back
+    out.reverse()
+    return out
+
+
+class StackSampler:
+    """Копилка стеков: add() — один снимок всех (или выбранных) потоков."""
+
+    def __init__(self, *, idle: bool = False) -> None:
+        self.idle = idle
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+
+    def add(self, frames: Dict[int, Any], *, skip: Collection[int] = (), only: Optional[Collection[int]] = None) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        self.samples += 1
+        for ident, frame in frames.items():
+            if ident in skip or (only is not None and ident not in only):
+                continue
+            if not self.idle and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES:
+                continue
+            self.counts[";".join([names.get(ident, f"thread-{ident}"), *_stack(frame)])] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.counts.items()))
+
+
+def profile(seconds: float, *, interval_ms: float = PROFILE_INTERVAL_MS, idle: bool = False) -> str:
+    """
+    Блокирующий: сэмплирует процесс `seconds` секунд и возвращает folded-стеки.
+    Запускать в отдельном потоке (asyncio.to_thread); одна сессия за раз — иначе ProfilerBusy.
+    """
+    if not _session.acquire(blocking=False):
+        raise ProfilerBusy("profiling is already running")
+    try:
+        sampler = StackSampler(idle=idle)
+        me = threading.get_ident()
+        interval = interval_ms / 1000
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            sampler.add(sys._current_frames(), skip={me})
+            time.sleep(interval)
+        logger.info("[profile] {} samples, {} distinct stacks", sampler.samples, len(sampler.counts))
+        return sampler.folded()
+    finally:
+        _session.release()
+
+
+def await_chain(task: Optional[asyncio.Task]) -> List[str]:
+    """Где сейчас «висит» корутина задачи: цепочка cr_await до future (вызывать из цикла задачи)."""
+    out: List[str] = []
+    coro = task.get_coro() if task is not None else None
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            out.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return out
+
+
+@dataclass
+class _Watched:
+    started: float
+    deadline: float
+    sampler: StackSampler = field(default_factory=StackSampler)
+    awaiting: List[str] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class SlowUpdateWatch:
+    """
+    Снимки медленных апдейтов. begin()/end() вызывает SlowUpdateMiddleware на цикле;
+    сэмплирует и пишет файлы фоновый поток (стартует при первом апдейте).
+
+    Что попадает в снимок:
+      • awaiting — на чём ждала корутина хэндлера в момент превышения порога
+        (снимается на цикле; если цикл был занят — позже, зато это видно по samples);
+      • samples — стеки всех потоков, пока хэндлер не закончился: заблокированный
+        цикл и синхронная работа в to_thread (LLM, БД) видны здесь.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: int = SLOW_UPDATE_MS,
+        *,
+        sample_ms: float = SLOW_UPDATE_SAMPLE_MS,
+        directory: str = SLOW_UPDATE_DIR,
+        keep: int = SLOW_UPDATE_KEEP,
+    ) -> None:
+        self.threshold = threshold_ms / 1000
+        self.interval = sample_ms / 1000
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._inflight: Dict[int, _Watched] = {}
+        self._pending: List[dict] = []
+        self._next_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- на цикле ----
+    def begin(self) -> int:
+        now = time.monotonic()
+        entry = _Watched(started=now, deadline=now + self.threshold)
+        task = asyncio.current_task()
+        if task is not None:
+            entry.timer = asyncio.get_running_loop().call_later(
+                self.threshold, lambda: entry.awaiting.extend(await_chain(task))
+            )
+        with self._lock:
+            self._next_id += 1
+            token = self._next_id
+            self._inflight[token] = entry
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-update-watch", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return token
+
+    def end(self, token: int, *, event: str, handler: str, update: Any, error: Optional[BaseException] = None) -> bool:
+        """True — апдейт был медленным и снимок поставлен в очередь на запись."""
+        with self._lock:
+            entry = self._inflight.pop(token, None)
+        if entry is None:
+            return False
+        if entry.timer is not None:
+            entry.timer.cancel()
+        elapsed = time.monotonic() - entry.started
+        if elapsed < self.threshold:
+            return False
+        capture = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "event": event,
+            "handler": handler,
+            "elapsed_ms": round(elapsed * 1000),
+            "error": repr(error) if error is not None else None,
+            "awaiting": entry.awaiting,
+            "samples": entry.sampler.samples,
+            "stacks": entry.sampler.folded().splitlines(),
+            "update": _payload(update),
+        }
+        with self._lock:
+            self._pending.append(capture)
+        self._wakeup.set()
+        logger.warning("[slow-update] {} {} took {} ms", event, handler, capture["elapsed_ms"])
+        return True
+
+    # ---- фоновый поток ----
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._inflight and not self._pending
+            if idle:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                due = [e for e in self._inflight.values() if now >= e.deadline]
+                pending, self._pending = self._pending, []
+            if due:
+                frames = sys._current_frames()
+                for e in due:
+                    e.sampler.add(frames, skip={me})
+            for capture in pending:
+                self._save(capture)
+
+    def _save(self, capture: dict) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+            handler = re.sub(r"[^\w.]+", "_", capture["handler"])
+            path = os.path.join(self.directory, f"{stamp}-{handler}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(capture, f, ensure_ascii=False, indent=1)
+            for old in list_captures(self.directory)[self.keep:]:
+                os.remove(os.path.join(self.directory, old))
+        except Exception:
+            logger.exception("[slow-update] failed to save capture")
+
+
+def _payload(update: Any) -> Any:
+    if hasattr(update, "model_dump"):
+        try:
+            return update.model_dump(mode="json", exclude_none=True)
+        except Exception:
+            pass
+    return repr(update)
+
+
+def list_captures(directory: str = SLOW_UPDATE_DIR) -> List[str]:
+    """Имена файлов снимков, новые первыми."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted((n for n in os.listdir(directory) if CAPTURE_NAME.match(n)), reverse=True)
+
+
+def read_capture(name: str, directory: str = SLOW_UPDATE_DIR) -> Optional[dict]:
+    if not CAPTURE_NAME.match(name):
+        return None
+    path = os.path.join(directory, name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,101 @@
+# app/core/symbol_index.py
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.core.nlp import _norm, load_symbols_from_json
+
+# сколько подсказок храним в каждом узле trie (больше Telegram всё равно не покажет)
+SUGGEST_LIMIT = 50
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.top: List[Tuple[str, str]] = []  # (термин, ключ символа)
+
+
+class SymbolIndex:
+    """
+    Словарь символов в памяти процесса:
+      • terms — инвертированный индекс «ключ/синоним (норм.) -> ключ символа», O(1);
+      • trie по терминам — автодополнение по префиксу за O(len(префикса)):
+        в каждом узле заранее лежат первые SUGGEST_LIMIT терминов поддерева.
+    Строится один раз из symbols.ru.json; неизменяем после сборки.
+    """
+
+    def __init__(self, symbols: Dict[str, dict]) -> None:
+        self.symbols = symbols
+        self.terms: Dict[str, str] = {}
+        # сначала ключи — при совпадении синонима с чужим ключом побеждает ключ
+        for key in symbols:
+            self.terms[_norm(key)] = key
+        for key, data in symbols.items():
+            for syn in data.get("synonyms", []) or []:
+                if isinstance(syn, str) and _norm(syn):
+                    self.terms.setdefault(_norm(syn), key)
+
+        self._root = _Node()
+        for term in sorted(self.terms):
+            key = self.terms[term]
+            node = self._root
+            self._offer(node, term, key)
+            for ch in term:
+                node = node.children.setdefault(ch, _Node())
+                self._offer(node, term, key)
+
+    @staticmethod
+    def _offer(node: _Node, term: str, key: str) -> None:
+        # термины добавляются по алфавиту, поэтому в top попадают первые по порядку
+        if len(node.top) < SUGGEST_LIMIT:
+            node.top.append((term, key))
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Точное совпадение ключа или синонима -> ключ символа."""
+        return self.terms.get(_norm(query))
+
+    def get(self, query: str) -> Optional[Tuple[str, dict]]:
+        key = self.lookup(query)
+        return (key, self.symbols[key]) if key is not None else None
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Ключи символов, у которых ключ или синоним начинается с prefix (без повторов)."""
+        node = self._root
+        for ch in _norm(prefix):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        out: List[str] = []
+        seen = set()
+        for _, key in node.top:
+            if key not in seen:
+                seen.add(key)
+                out.append(key)
+                if len(out) >= limit:
+                    break
+        return out
+
+
+_index: Optional[SymbolIndex] = None
+_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Общий на процесс индекс (ленивая сборка при первом обращении)."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = SymbolIndex(load_symbols_from_json())
+    return _index
+
+
+def reload_symbol_index() -> SymbolIndex:
+    """Пересобрать после правки symbols.ru.json."""
+    global _index
+    with _lock:
+        _index = SymbolIndex(load_symbols_from_json())
+    return _index
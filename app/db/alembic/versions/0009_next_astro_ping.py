@@ -0,0 +1,58 @@
+"""add users.next_astro_ping_utc + partial index for the daily astro ping
+
+Revision ID: 0009_next_astro_ping
+Revises: 0008_moon_notifications
+Create Date: 2025-10-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_next_astro_ping"
+down_revision = "0008_moon_notifications"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # момент следующего ежедневного астро-пинга в UTC (NULL — пинг выключен)
+    op.add_column(
+        "users",
+        sa.Column("next_astro_ping_utc", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+    # частичный индекс: джоба выбирает только «созревших» по диапазону
+    op.create_index(
+        "ix_users_next_astro_ping_utc",
+        "users",
+        ["next_astro_ping_utc"],
+        postgresql_where=sa.text("next_astro_ping_utc IS NOT NULL"),
+    )
+
+    # бэкфилл: ближайшее локальное HH:MM пользователя после now().
+    # Одно битое значение не должно ронять миграцию: время берём только строгое HH:MM
+    # (остальные остаются NULL, 0016 их вычищает), неизвестная зона — как UTC,
+    # так же как в next_daily_fire_utc.
+    op.execute(
+        r"""
+        UPDATE users AS u
+        SET next_astro_ping_utc = (
+            ((now() AT TIME ZONE v.zone)::date
+              + CASE WHEN (now() AT TIME ZONE v.zone)::time < u.notify_daily_time::time THEN 0 ELSE 1 END
+            ) + u.notify_daily_time::time
+        ) AT TIME ZONE v.zone
+        FROM (
+            SELECT id,
+                   CASE WHEN tz IN (SELECT name FROM pg_timezone_names) THEN tz ELSE 'UTC' END AS zone
+            FROM users
+            WHERE notify_daily_time ~ '^([01][0-9]|2[0-3]):[0-5][0-9]$'
+        ) AS v
+        WHERE u.id = v.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_next_astro_ping_utc", table_name="users")
+    op.drop_column("users", "next_astro_ping_utc")
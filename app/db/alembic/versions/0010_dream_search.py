@@ -0,0 +1,36 @@
+"""dreams full-text search: generated tsvector + GIN, pg_trgm index for fuzzy matches
+
+Revision ID: 0010_dream_search
+Revises: 0009_next_astro_ping
+Create Date: 2025-10-06
+
+"""
+from alembic import op
+
+
+revision = "0010_dream_search"
+down_revision = "0009_next_astro_ping"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # tsvector считает сам Postgres при INSERT/UPDATE — приложение его не пишет
+    op.execute(
+        """
+        ALTER TABLE dreams
+        ADD COLUMN text_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('russian', coalesce(text, ''))) STORED
+        """
+    )
+    op.execute("CREATE INDEX ix_dreams_text_tsv ON dreams USING gin (text_tsv)")
+    # нечёткий поиск (опечатки, части слов): word_similarity по триграммам
+    op.execute("CREATE INDEX ix_dreams_text_trgm ON dreams USING gin (text gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_dreams_text_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_dreams_text_tsv")
+    op.execute("ALTER TABLE dreams DROP COLUMN IF EXISTS text_tsv")
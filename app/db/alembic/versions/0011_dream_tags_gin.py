@@ -0,0 +1,37 @@
+"""GIN (jsonb_path_ops) indexes on dreams.symbols / dreams.emotions
+
+Revision ID: 0011_dream_tags_gin
+Revises: 0010_dream_search
+Create Date: 2025-10-07
+
+"""
+from alembic import op
+
+
+revision = "0011_dream_tags_gin"
+down_revision = "0010_dream_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # jsonb_path_ops: компактнее jsonb_ops и поддерживает ровно то, что нужно, — @>
+    op.create_index(
+        "ix_dreams_symbols_gin",
+        "dreams",
+        ["symbols"],
+        postgresql_using="gin",
+        postgresql_ops={"symbols": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_dreams_emotions_gin",
+        "dreams",
+        ["emotions"],
+        postgresql_using="gin",
+        postgresql_ops={"emotions": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dreams_emotions_gin", table_name="dreams")
+    op.drop_index("ix_dreams_symbols_gin", table_name="dreams")
@@ -0,0 +1,28 @@
+"""composite index dreams (user_id, created_at, id) for keyset journal pages
+
+Revision ID: 0012_dreams_user_created
+Revises: 0011_dream_tags_gin
+Create Date: 2025-10-08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_dreams_user_created"
+down_revision = "0011_dream_tags_gin"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # страница дневника = один индексный range-scan по (user_id, created_at, id)
+    op.create_index(
+        "ix_dreams_user_created",
+        "dreams",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dreams_user_created", table_name="dreams")
@@ -0,0 +1,33 @@
+"""astro_forecasts: cached daily forecast per (date, sign, phase_day, prompt version)
+
+Revision ID: 0013_astro_forecasts
+Revises: 0012_dreams_user_created
+Create Date: 2025-10-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_astro_forecasts"
+down_revision = "0012_dreams_user_created"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "astro_forecasts",
+        sa.Column("forecast_date", sa.Date(), nullable=False),
+        sa.Column("sign", sa.Text(), nullable=False),
+        sa.Column("phase_day", sa.Integer(), nullable=False),
+        sa.Column("prompt_version", sa.Text(), nullable=False),
+        # прогноз без персонального подзаголовка — его подставляем при выдаче
+        sa.Column("body_html", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("forecast_date", "sign", "phase_day", "prompt_version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("astro_forecasts")
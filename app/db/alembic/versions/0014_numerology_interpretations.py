@@ -0,0 +1,29 @@
+"""numerology_interpretations: LLM text cached by the calc_all numbers
+
+Revision ID: 0014_numerology_interpretations
+Revises: 0013_astro_forecasts
+Create Date: 2025-10-11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014_numerology_interpretations"
+down_revision = "0013_astro_forecasts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "numerology_interpretations",
+        # версия промпта + числа из calc_all (+ пол), см. numerology_service._cache_key
+        sa.Column("cache_key", sa.Text(), primary_key=True),
+        sa.Column("body_html", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("numerology_interpretations")
@@ -0,0 +1,62 @@
+"""llm_usage: per-call LLM ledger and its daily rollup
+
+Revision ID: 0015_llm_usage
+Revises: 0014_numerology_interpretations
+Create Date: 2025-10-14
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_llm_usage"
+down_revision = "0014_numerology_interpretations"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_usage",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        # dream | numerology | astrology | stats
+        sa.Column("feature", sa.Text(), nullable=False),
+        sa.Column("model", sa.Text(), nullable=True),
+        # метка ключа (key_label: короткий хэш, как в логах и метриках), NULL — попадание в кэш без вызова
+        sa.Column("api_key", sa.Text(), nullable=True),
+        sa.Column("prompt_tokens", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("completion_tokens", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("latency_ms", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("attempts", sa.SmallInteger(), server_default="1", nullable=False),
+        # hit | miss | prefill | NULL (фича без кэша)
+        sa.Column("cache", sa.Text(), nullable=True),
+        # ok | error
+        sa.Column("outcome", sa.Text(), server_default="ok", nullable=False),
+    )
+    # только дописывается по времени — BRIN на created_at крошечный и хватает для диапазонов
+    op.create_index("ix_llm_usage_created_brin", "llm_usage", ["created_at"], postgresql_using="brin")
+
+    op.create_table(
+        "llm_usage_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("feature", sa.Text(), nullable=False),
+        # '' вместо NULL — чтобы входить в первичный ключ
+        sa.Column("model", sa.Text(), server_default="", nullable=False),
+        sa.Column("cache", sa.Text(), server_default="", nullable=False),
+        sa.Column("calls", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.Integer(), nullable=False),
+        sa.Column("prompt_tokens", sa.BigInteger(), nullable=False),
+        sa.Column("completion_tokens", sa.BigInteger(), nullable=False),
+        sa.Column("latency_ms_sum", sa.BigInteger(), nullable=False),
+        sa.Column("latency_ms_p50", sa.Integer(), nullable=False),
+        sa.Column("latency_ms_p95", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("day", "feature", "model", "cache"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("llm_usage_daily")
+    op.drop_index("ix_llm_usage_created_brin", table_name="llm_usage")
+    op.drop_table("llm_usage")
@@ -0,0 +1,54 @@
+"""users: CHECK on notify_daily_time, daily-ping index only over enabled users
+
+Revision ID: 0016_astro_ping_guards
+Revises: 0015_llm_usage
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016_astro_ping_guards"
+down_revision = "0015_llm_usage"
+branch_labels = None
+depends_on = None
+
+HHMM = r"^([01][0-9]|2[0-3]):[0-5][0-9]$"
+
+
+def upgrade() -> None:
+    # битое время пинг всё равно не даст — выключаем его, чтобы CHECK встал
+    op.execute(
+        f"""
+        UPDATE users
+        SET notify_daily_time = NULL, next_astro_ping_utc = NULL
+        WHERE notify_daily_time IS NOT NULL AND notify_daily_time !~ '{HHMM}'
+        """
+    )
+    op.create_check_constraint(
+        "ck_users_notify_daily_time_hhmm",
+        "users",
+        f"notify_daily_time IS NULL OR notify_daily_time ~ '{HHMM}'",
+    )
+
+    # джоба берёт только remind_enabled: выключившие напоминания не висят
+    # в начале диапазона «созревших» при каждом запуске
+    op.drop_index("ix_users_next_astro_ping_utc", table_name="users")
+    op.create_index(
+        "ix_users_next_astro_ping_utc",
+        "users",
+        ["next_astro_ping_utc"],
+        postgresql_where=sa.text("next_astro_ping_utc IS NOT NULL AND remind_enabled"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_next_astro_ping_utc", table_name="users")
+    op.create_index(
+        "ix_users_next_astro_ping_utc",
+        "users",
+        ["next_astro_ping_utc"],
+        postgresql_where=sa.text("next_astro_ping_utc IS NOT NULL"),
+    )
+    op.drop_constraint("ck_users_notify_daily_time_hhmm", "users", type_="check")
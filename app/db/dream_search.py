@@ -0,0 +1,100 @@
+# app/db/dream_search.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import text
+
+from app.db.base import SessionLocal
+
+SEARCH_PAGE_SIZE = int(os.getenv("DREAM_SEARCH_PAGE_SIZE", "5"))
+# порог word_similarity для нечёткого поиска (pg_trgm), 0..1
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("DREAM_SEARCH_FUZZY_THRESHOLD", "0.4"))
+
+# маркеры подсветки — сразу Telegram-HTML; текст сна экранируется до ts_headline
+_HEADLINE_OPTS = "StartSel=<b>, StopSel=</b>, MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=' … '"
+
+
+@dataclass(frozen=True)
+class DreamHit:
+    id: int
+    created_at: datetime
+    snippet: str  # Telegram-HTML: подсветка <b>…</b>, остальной текст экранирован
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    hits: List[DreamHit]
+    offset: int
+    has_more: bool
+    fuzzy: bool  # True — полнотекст ничего не нашёл, это триграммы
+
+
+def _html_escape_sql(col: str) -> str:
+    # экранируем в SQL, чтобы подсветка ts_headline оставалась единственной разметкой
+    return f"replace(replace(replace({col}, '&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+
+
+# ts_headline дорогой — считаем его только для строк текущей страницы
+_FTS_SQL = text(f"""
+    WITH q AS (SELECT websearch_to_tsquery('russian', :q) AS tsq),
+    page AS (
+        SELECT d.id, d.created_at, d.text, ts_rank_cd(d.text_tsv, q.tsq) AS rank
+        FROM dreams d, q
+        WHERE d.user_id = :uid AND d.text_tsv @@ q.tsq
+        ORDER BY rank DESC, d.created_at DESC, d.id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT page.id, page.created_at,
+           ts_headline('russian', {_html_escape_sql('page.text')}, q.tsq, :opts) AS snippet
+    FROM page, q
+    ORDER BY page.rank DESC, page.created_at DESC, page.id DESC
+""")
+
+_FUZZY_SQL = text(f"""
+    WITH page AS (
+        SELECT d.id, d.created_at, d.text, word_similarity(:q, d.text) AS sim
+        FROM dreams d
+        WHERE d.user_id = :uid AND :q <% d.text
+        ORDER BY sim DESC, d.created_at DESC, d.id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT id, created_at, {_html_escape_sql('left(text, 300)')} AS snippet
+    FROM page
+    ORDER BY sim DESC, created_at DESC, id DESC
+""")
+
+
+def search_dreams(
+    user_id: int,
+    query: str,
+    *,
+    offset: int = 0,
+    limit: int = SEARCH_PAGE_SIZE,
+    fuzzy: bool = False,
+) -> SearchPage:
+    """
+    Поиск по снам пользователя: полнотекстовый (russian, GIN по text_tsv) с рангом
+    и подсвеченными фрагментами; если на первой странице пусто — нечёткий по pg_trgm.
+    Следующие страницы запрашиваются в том же режиме (fuzzy из предыдущей страницы).
+    Берём limit + 1 строк, чтобы знать, есть ли следующая страница.
+    """
+    query = (query or "").strip()
+    if not query:
+        return SearchPage(hits=[], offset=offset, has_more=False, fuzzy=fuzzy)
+
+    params = {"uid": user_id, "q": query, "limit": limit + 1, "offset": offset, "opts": _HEADLINE_OPTS}
+    with SessionLocal() as s:
+        rows = [] if fuzzy else s.execute(_FTS_SQL, params).all()
+        if fuzzy or (not rows and offset == 0):
+            fuzzy = True
+            # порог оператора <% — только для этой транзакции
+            s.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+                      {"t": str(SEARCH_FUZZY_THRESHOLD)})
+            rows = s.execute(_FUZZY_SQL, params).all()
+
+    hits = [DreamHit(id=r.id, created_at=r.created_at, snippet=r.snippet or "") for r in rows[:limit]]
+    return SearchPage(hits=hits, offset=offset, has_more=len(rows) > limit, fuzzy=fuzzy)
@@ -0,0 +1,121 @@
+# app/db/dream_tags.py
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Literal, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.base import SessionLocal
+
+# dreams.symbols / dreams.emotions — JSON-массивы строк (extract_symbols_emotions);
+# в старых записях элементы символов бывают объектами {"key": ...}
+Kind = Literal["symbols", "emotions"]
+_KINDS = ("symbols", "emotions")
+
+
+@dataclass(frozen=True)
+class TagHit:
+    id: int
+    created_at: datetime
+
+
+def _column(kind: Kind) -> str:
+    if kind not in _KINDS:
+        raise ValueError(f"unknown tag kind: {kind}")
+    return kind
+
+
+def _contains(col: str) -> str:
+    # оба варианта — через @>, поэтому работает GIN (jsonb_path_ops) из миграции 0011
+    return f"({col} @> CAST(:as_str AS jsonb) OR {col} @> CAST(:as_obj AS jsonb))"
+
+
+def _needle(term: str) -> dict:
+    term = (term or "").strip().lower()
+    return {"as_str": json.dumps([term], ensure_ascii=False), "as_obj": json.dumps([{"key": term}], ensure_ascii=False)}
+
+
+def _period(since: Optional[datetime], until: Optional[datetime]) -> Tuple[str, dict]:
+    sql, params = "", {}
+    if since is not None:
+        sql += " AND created_at >= :since"
+        params["since"] = since
+    if until is not None:
+        sql += " AND created_at < :until"
+        params["until"] = until
+    return sql, params
+
+
+def dreams_with_tag(
+    user_id: int,
+    kind: Kind,
+    term: str,
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 10,
+) -> List[TagHit]:
+    """Последние сны пользователя, где встретился символ/эмоция term."""
+    col = _column(kind)
+    period_sql, params = _period(since, until)
+    sql = text(f"""
+        SELECT id, created_at FROM dreams
+        WHERE user_id = :uid AND {_contains(col)}{period_sql}
+        ORDER BY created_at DESC, id DESC
+        LIMIT :limit
+    """)
+    with SessionLocal() as s:
+        rows = s.execute(sql, {"uid": user_id, "limit": limit, **_needle(term), **params}).all()
+    return [TagHit(id=r.id, created_at=r.created_at) for r in rows]
+
+
+def count_with_tag(
+    user_id: int,
+    kind: Kind,
+    term: str,
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> int:
+    """В скольких снах пользователя встретился символ/эмоция term."""
+    col = _column(kind)
+    period_sql, params = _period(since, until)
+    sql = text(f"SELECT count(*) FROM dreams WHERE user_id = :uid AND {_contains(col)}{period_sql}")
+    with SessionLocal() as s:
+        return int(s.execute(sql, {"uid": user_id, **_needle(term), **params}).scalar_one())
+
+
+def top_tags(
+    user_id: int,
+    kind: Kind,
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    n: int = 3,
+) -> List[Tuple[str, int]]:
+    """Самые частые символы/эмоции за период — агрегация в Postgres, без разбора JSON в Python."""
+    col = _column(kind)
+    period_sql, params = _period(since, until)
+    sql = text(f"""
+        SELECT tag, count(*) AS cnt
+        FROM (
+            SELECT lower(btrim(CASE jsonb_typeof(e)
+                                   WHEN 'string' THEN e #>> '{{}}'
+                                   WHEN 'object' THEN e ->> 'key'
+                               END)) AS tag
+            FROM dreams, jsonb_array_elements(
+                CASE jsonb_typeof({col}) WHEN 'array' THEN {col} ELSE '[]'::jsonb END
+            ) AS e
+            WHERE user_id = :uid{period_sql}
+        ) t
+        WHERE tag IS NOT NULL AND tag <> ''
+        GROUP BY tag
+        ORDER BY cnt DESC, tag
+        LIMIT :n
+    """)
+    with SessionLocal() as s:
+        rows = s.execute(sql, {"uid": user_id, "n": n, **params}).all()
+    return [(r.tag, int(r.cnt)) for r in rows]
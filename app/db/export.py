@@ -0,0 +1,135 @@
+# app/db/export.py
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime, tzinfo
+from html import escape
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+
+from app.db.base import SessionLocal
+from app.db.keyset import iter_keyset
+from app.db.models import Dream
+
+EXPORT_BATCH_SIZE = 1000
+
+FIELDS = ("id", "user_id", "created_at", "text", "symbols", "emotions", "note")
+
+MEDIA_TYPES: Dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def iter_dream_batches(
+    user_id: Optional[int] = None,
+    *,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[Sequence[Row]]:
+    """
+    Сны пачками через серверный курсор (stream_results/yield_per): в памяти
+    одновременно не больше batch_size строк, сколько бы записей ни было.
+    user_id=None — выгрузка по всем пользователям (аналитика).
+    """
+    stmt = select(
+        Dream.id, Dream.user_id, Dream.created_at, Dream.text, Dream.symbols, Dream.emotions, Dream.note
+    )
+    if user_id is not None:
+        stmt = stmt.where(Dream.user_id == user_id)
+    yield from iter_keyset(SessionLocal, stmt, Dream.id, batch_size=batch_size, server_side=True)
+
+
+def _as_dict(row: Row, tz: Optional[tzinfo]) -> dict:
+    d = dict(row._mapping)
+    created: Optional[datetime] = d.get("created_at")
+    if created is not None:
+        d["created_at"] = (created.astimezone(tz) if tz else created).isoformat()
+    return d
+
+
+def _tags(value) -> str:
+    if not value:
+        return ""
+    items = value if isinstance(value, list) else [value]
+    return ", ".join(str(i.get("key", "") if isinstance(i, dict) else i) for i in items)
+
+
+# ---- форматтеры: (заголовок, пачка строк -> текст, концовка) ----
+
+def _csv_batch(rows: Iterable[dict]) -> str:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for d in rows:
+        w.writerow([d["id"], d["user_id"], d["created_at"], d["text"] or "",
+                    _tags(d["symbols"]), _tags(d["emotions"]), d["note"] or ""])
+    return buf.getvalue()
+
+
+def _csv_header() -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(FIELDS)
+    return "\ufeff" + buf.getvalue()  # BOM — чтобы Excel понял UTF-8
+
+
+def _jsonl_batch(rows: Iterable[dict]) -> str:
+    return "".join(json.dumps(d, ensure_ascii=False, default=str) + "\n" for d in rows)
+
+
+def _html_batch(rows: Iterable[dict]) -> str:
+    out = []
+    for d in rows:
+        out.append(
+            "<article>"
+            f"<h3>{escape(d['created_at'] or '')}</h3>"
+            f"<p>{escape(d['text'] or '').replace(chr(10), '<br>')}</p>"
+            + (f"<p><b>Символы:</b> {escape(_tags(d['symbols']))}</p>" if d["symbols"] else "")
+            + (f"<p><b>Эмоции:</b> {escape(_tags(d['emotions']))}</p>" if d["emotions"] else "")
+            + (f"<p><i>{escape(d['note'])}</i></p>" if d["note"] else "")
+            + "</article>\n"
+        )
+    return "".join(out)
+
+
+_HTML_HEAD = (
+    "<!doctype html><html lang=\"ru\"><head><meta charset=\"utf-8\">"
+    "<title>Дневник снов</title>"
+    "<style>body{font-family:sans-serif;max-width:760px;margin:auto}article{border-bottom:1px solid #ddd}</style>"
+    "</head><body><h1>Дневник снов</h1>\n"
+)
+
+_FORMATS: Dict[str, tuple[str, Callable[[Iterable[dict]], str], str]] = {
+    "csv": (_csv_header(), _csv_batch, ""),
+    "jsonl": ("", _jsonl_batch, ""),
+    "html": (_HTML_HEAD, _html_batch, "</body></html>\n"),
+}
+
+
+def iter_export(fmt: str, user_id: Optional[int] = None, *, tz: Optional[tzinfo] = None) -> Iterator[bytes]:
+    """
+    Выгрузка снов кусками байтов — по одному куску на пачку строк.
+    Подходит и для StreamingResponse, и для записи в файл.
+    """
+    if fmt not in _FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    head, batch_fn, tail = _FORMATS[fmt]
+    if head:
+        yield head.encode("utf-8")
+    for batch in iter_dream_batches(user_id):
+        yield batch_fn(_as_dict(r, tz) for r in batch).encode("utf-8")
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def export_to_file(fmt: str, path: str, user_id: Optional[int] = None, *, tz: Optional[tzinfo] = None) -> int:
+    """Выгрузить в файл потоково; возвращает размер в байтах."""
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_export(fmt, user_id, tz=tz):
+            f.write(chunk)
+            size += len(chunk)
+    return size
@@ -0,0 +1,63 @@
+# app/db/forecasts.py
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.cache import TTLCache
+from app.core.metrics import LLM_CACHE_REQUESTS
+from app.db.base import SessionLocal
+
+# ключ прогноза: (дата, знак, день лунного цикла, версия промпта)
+ForecastKey = Tuple[date, str, int, str]
+
+# 12 знаков × пара дней цикла × пара дат — хватает с запасом
+_local: TTLCache[ForecastKey, str] = TTLCache(512, float(os.getenv("ASTRO_FORECAST_CACHE_TTL_SECONDS", "3600")))
+
+
+def get_forecast(key: ForecastKey) -> Optional[str]:
+    """Кэш процесса, затем таблица astro_forecasts (общая для всех реплик)."""
+    body = _local.get(key)
+    if body is not None:
+        LLM_CACHE_REQUESTS.labels("astro_forecast", "hit").inc()
+        return body
+    d, sign, phase_day, version = key
+    with SessionLocal() as s:
+        body = s.execute(
+            text("""
+                SELECT body_html FROM astro_forecasts
+                WHERE forecast_date = :d AND sign = :sign AND phase_day = :day AND prompt_version = :v
+            """),
+            {"d": d, "sign": sign, "day": phase_day, "v": version},
+        ).scalar()
+    if body is not None:
+        _local.set(key, body)
+    LLM_CACHE_REQUESTS.labels("astro_forecast", "hit" if body is not None else "miss").inc()
+    return body
+
+
+def put_forecast(key: ForecastKey, body: str) -> str:
+    """Сохранить прогноз; если другая реплика успела раньше — вернуть её вариант."""
+    d, sign, phase_day, version = key
+    with SessionLocal() as s:
+        stored = s.execute(
+            text("""
+                INSERT INTO astro_forecasts (forecast_date, sign, phase_day, prompt_version, body_html)
+                VALUES (:d, :sign, :day, :v, :body)
+                ON CONFLICT (forecast_date, sign, phase_day, prompt_version)
+                DO UPDATE SET body_html = astro_forecasts.body_html
+                RETURNING body_html
+            """),
+            {"d": d, "sign": sign, "day": phase_day, "v": version, "body": body},
+        ).scalar_one()
+        s.commit()
+    _local.set(key, stored)
+    return stored
+
+
+def forecast_cache_stats() -> Tuple[int, int]:
+    """(hits, misses) кэша процесса."""
+    return _local.hits, _local.misses
@@ -0,0 +1,41 @@
+# app/db/instrumentation.py
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import DB_CONNECTION_HOLD, DB_QUERY_LATENCY
+
+_STARTED = "_dreambot_started"
+
+
+def _verb(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "?"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Время каждого SQL-запроса (по первому слову) и удержания соединений пула."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            setattr(context, _STARTED, time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, _STARTED, None)
+        if started is not None:
+            DB_QUERY_LATENCY.labels(_verb(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        record.info[_STARTED] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        started = record.info.pop(_STARTED, None)
+        if started is not None:
+            DB_CONNECTION_HOLD.observe(time.perf_counter() - started)
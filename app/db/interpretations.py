@@ -0,0 +1,48 @@
+# app/db/interpretations.py
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.cache import TTLCache
+from app.core.metrics import LLM_CACHE_REQUESTS
+from app.db.base import SessionLocal
+
+_local: TTLCache[str, str] = TTLCache(
+    int(os.getenv("NUMEROLOGY_CACHE_SIZE", "10000")),
+    float(os.getenv("NUMEROLOGY_CACHE_TTL_SECONDS", "86400")),
+)
+
+
+def get_interpretation(cache_key: str) -> Optional[str]:
+    """Кэш процесса, затем таблица numerology_interpretations (общая для реплик)."""
+    body = _local.get(cache_key)
+    if body is None:
+        with SessionLocal() as s:
+            body = s.execute(
+                text("SELECT body_html FROM numerology_interpretations WHERE cache_key = :k"),
+                {"k": cache_key},
+            ).scalar()
+        if body is not None:
+            _local.set(cache_key, body)
+    LLM_CACHE_REQUESTS.labels("numerology", "hit" if body is not None else "miss").inc()
+    return body
+
+
+def put_interpretation(cache_key: str, body: str) -> str:
+    """Сохранить; при гонке реплик остаётся первый вариант."""
+    with SessionLocal() as s:
+        stored = s.execute(
+            text("""
+                INSERT INTO numerology_interpretations (cache_key, body_html)
+                VALUES (:k, :body)
+                ON CONFLICT (cache_key) DO UPDATE SET body_html = numerology_interpretations.body_html
+                RETURNING body_html
+            """),
+            {"k": cache_key, "body": body},
+        ).scalar_one()
+        s.commit()
+    _local.set(cache_key, stored)
+    return stored
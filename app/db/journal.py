@@ -0,0 +1,78 @@
+# app/db/journal.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.base import SessionLocal
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# курсор страницы — (created_at, id) последней показанной записи
+Cursor = Tuple[datetime, int]
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    id: int
+    created_at: datetime
+    text: str
+
+
+def encode_cursor(cur: Cursor) -> str:
+    """(created_at, id) -> "<микросекунды>:<id>" — коротко и без потери точности для callback_data."""
+    created_at, dream_id = cur
+    return f"{(created_at - _EPOCH) // timedelta(microseconds=1)}:{dream_id}"
+
+
+def decode_cursor(raw: str) -> Cursor:
+    us, dream_id = raw.split(":", 1)
+    return _EPOCH + timedelta(microseconds=int(us)), int(dream_id)
+
+
+_OLDER_SQL = text("""
+    SELECT id, created_at, text FROM dreams
+    WHERE user_id = :uid AND (created_at, id) < (:ts, :id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+""")
+
+_NEWER_SQL = text("""
+    SELECT id, created_at, text FROM dreams
+    WHERE user_id = :uid AND (created_at, id) > (:ts, :id)
+    ORDER BY created_at ASC, id ASC
+    LIMIT :limit
+""")
+
+_LATEST_SQL = text("""
+    SELECT id, created_at, text FROM dreams
+    WHERE user_id = :uid
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+""")
+
+
+def journal_rows(
+    user_id: int,
+    *,
+    older_than: Optional[Cursor] = None,
+    newer_than: Optional[Cursor] = None,
+    limit: int,
+) -> List[JournalEntry]:
+    """
+    Keyset-страница дневника по индексу (user_id, created_at, id) — миграция 0012.
+    Записи идут в порядке движения: от курсора к более старым (older_than)
+    или к более новым (newer_than); без курсора — самые свежие.
+    """
+    if newer_than is not None:
+        sql, params = _NEWER_SQL, {"ts": newer_than[0], "id": newer_than[1]}
+    elif older_than is not None:
+        sql, params = _OLDER_SQL, {"ts": older_than[0], "id": older_than[1]}
+    else:
+        sql, params = _LATEST_SQL, {}
+    with SessionLocal() as s:
+        rows = s.execute(sql, {"uid": user_id, "limit": limit, **params}).all()
+    return [JournalEntry(id=r.id, created_at=r.created_at, text=r.text or "") for r in rows]
@@ -0,0 +1,67 @@
+# app/db/keyset.py
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+
+def _after(keys: Sequence[Any], last: Any):
+    if len(keys) == 1:
+        return keys[0] > last
+    # row-value сравнение (a, b) > (:a, :b) — Postgres умеет вести его по составному индексу
+    return tuple_(*keys) > tuple_(*last)
+
+
+def iter_keyset(
+    session_maker: Callable[[], Session],
+    stmt: Select,
+    key: Any,
+    *,
+    batch_size: int = 1000,
+    start_after: Optional[Any] = None,
+    server_side: bool = False,
+) -> Iterator[Sequence[Row]]:
+    """
+    Обход большой выборки пачками по ключу: WHERE key > :last ORDER BY key LIMIT n.
+    В отличие от OFFSET стоимость страницы постоянна, а строки не теряются и не
+    дублируются, даже если вызывающий обновляет их между страницами.
+
+    stmt — select(...) без ORDER BY/LIMIT; key (обычно User.id) должен быть среди
+    выбираемых колонок. Неуникальный ключ — кортеж колонок с уникальным хвостом,
+    например (Dream.created_at, Dream.id); тогда и start_after — кортеж значений.
+    Каждая страница читается в своей короткой сессии.
+
+    server_side=True — один упорядоченный запрос через серверный курсор
+    (stream_results/yield_per) в одной сессии: для read-only выгрузок, где
+    допустима одна длинная транзакция.
+    """
+    keys = list(key) if isinstance(key, (tuple, list)) else [key]
+
+    if server_side:
+        if start_after is not None:
+            stmt = stmt.where(_after(keys, start_after))
+        with session_maker() as s:
+            result = s.execute(
+                stmt.order_by(*keys).execution_options(stream_results=True, yield_per=batch_size)
+            )
+            for part in result.partitions(batch_size):
+                yield part
+        return
+
+    last = start_after
+    while True:
+        page = stmt.order_by(*keys).limit(batch_size)
+        if last is not None:
+            page = page.where(_after(keys, last))
+        with session_maker() as s:
+            rows = s.execute(page).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        tail = rows[-1]._mapping
+        last = tail[keys[0]] if len(keys) == 1 else tuple(tail[k] for k in keys)
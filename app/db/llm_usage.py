@@ -0,0 +1,123 @@
+# app/db/llm_usage.py
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+
+from app.db.base import SessionLocal
+
+# Журнал вызовов LLM: строка на вызов (или на попадание в кэш вместо вызова).
+# Пишется пачками через write-behind, раз в час сворачивается в llm_usage_daily;
+# сырые строки старше RETENTION_DAYS удаляются — отчёты живут в дневной таблице.
+LLM_USAGE_RETENTION_DAYS = int(os.getenv("LLM_USAGE_RETENTION_DAYS", "30"))
+
+
+def record_usage(
+    feature: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    latency_ms: int = 0,
+    attempts: int = 1,
+    cache: Optional[str] = None,
+    outcome: str = "ok",
+) -> None:
+    """В очередь write-behind; журнал никогда не должен ронять сам вызов LLM."""
+    from app.db.write_behind import writer
+
+    try:
+        writer.enqueue("llm_usage", {
+            "created_at": datetime.now(timezone.utc),
+            "feature": feature,
+            "model": model,
+            "api_key": api_key,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "attempts": attempts,
+            "cache": cache,
+            "outcome": outcome,
+        })
+    except Exception:
+        logger.exception("[llm-usage] failed to record {} call", feature)
+
+
+_ROLLUP_SQL = text("""
+    INSERT INTO llm_usage_daily (
+        day, feature, model, cache, calls, errors, prompt_tokens, completion_tokens,
+        latency_ms_sum, latency_ms_p50, latency_ms_p95, updated_at
+    )
+    SELECT
+        (created_at AT TIME ZONE 'UTC')::date,
+        feature,
+        coalesce(model, ''),
+        coalesce(cache, ''),
+        count(*),
+        count(*) FILTER (WHERE outcome <> 'ok'),
+        sum(prompt_tokens),
+        sum(completion_tokens),
+        sum(latency_ms),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms)::int,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms)::int,
+        now()
+    FROM llm_usage
+    WHERE created_at >= :start AND created_at < :end
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (day, feature, model, cache) DO UPDATE SET
+        calls = EXCLUDED.calls,
+        errors = EXCLUDED.errors,
+        prompt_tokens = EXCLUDED.prompt_tokens,
+        completion_tokens = EXCLUDED.completion_tokens,
+        latency_ms_sum = EXCLUDED.latency_ms_sum,
+        latency_ms_p50 = EXCLUDED.latency_ms_p50,
+        latency_ms_p95 = EXCLUDED.latency_ms_p95,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+def rollup_usage(first_day: date, last_day: date) -> int:
+    """Пересчитать дневные итоги за [first_day, last_day] (UTC). Идемпотентно; возвращает число групп."""
+    start = datetime.combine(first_day, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    with SessionLocal() as s:
+        n = s.execute(_ROLLUP_SQL, {"start": start, "end": end}).rowcount
+        s.commit()
+    return n
+
+
+def prune_usage(before: datetime) -> int:
+    with SessionLocal() as s:
+        n = s.execute(text("DELETE FROM llm_usage WHERE created_at < :before"), {"before": before}).rowcount
+        s.commit()
+    return n
+
+
+def daily_usage(since: date, until: date, feature: Optional[str] = None) -> List[dict]:
+    """Дневные итоги для отчёта/API, новые дни первыми."""
+    sql = """
+        SELECT day, feature, model, cache, calls, errors, prompt_tokens, completion_tokens,
+               latency_ms_sum, latency_ms_p50, latency_ms_p95
+        FROM llm_usage_daily
+        WHERE day BETWEEN :since AND :until
+    """
+    params: dict = {"since": since, "until": until}
+    if feature:
+        sql += " AND feature = :feature"
+        params["feature"] = feature
+    sql += " ORDER BY day DESC, feature, model, cache"
+    with SessionLocal() as s:
+        rows = s.execute(text(sql), params).mappings().all()
+    out = []
+    for r in rows:
+        row = dict(r)
+        row["model"] = row["model"] or None
+        row["cache"] = row["cache"] or None
+        row["latency_ms_avg"] = round(row["latency_ms_sum"] / row["calls"]) if row["calls"] else 0
+        out.append(row)
+    return out
@@ -9,7 +9,7 @@ from datetime import time
 import sqlalchemy as sa 
 from sqlalchemy import BigInteger, Boolean, ForeignKey, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP, TSVECTOR
 from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, func
 from sqlalchemy.dialects.postgresql import JSONB   # если используешь JSONB в модели
 from sqlalchemy.orm import relationship
@@ -37,6 +37,7 @@ class User(Base):
     notify_daily_time = sa.Column(sa.Text, nullable=True)
     last_moon_phase   = sa.Column(sa.Text, nullable=True)
     last_moon_day     = sa.Column(sa.Integer, nullable=True)
+    next_astro_ping_utc = sa.Column(sa.DateTime(timezone=True), nullable=True)  # см. миграцию 0009
 
     # >>> ДОБАВЬ ЭТУ СТРОКУ (встречная связь для платежей)
     payments = relationship(
@@ -67,6 +68,33 @@ class NumerologyProfile(Base):
     # ОСТАВИТЬ только это:
     user = relationship("User", back_populates="numerology_profiles")
    
+class AstrologyProfile(Base):
+    __tablename__ = "astrology_profiles"  # миграция 0007
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    full_name = Column(Text, nullable=False)
+    birth_date = Column(Date, nullable=False)
+    birth_time = Column(Time, nullable=True)
+    birthplace = Column(Text, nullable=True)
+    report_html = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"  # миграция 0015; пишется пачками через app.db.write_behind
+
+    id = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    feature = Column(Text, nullable=False)
+    model = Column(Text, nullable=True)
+    api_key = Column(Text, nullable=True)
+    prompt_tokens = Column(Integer, nullable=False, server_default="0")
+    completion_tokens = Column(Integer, nullable=False, server_default="0")
+    latency_ms = Column(Integer, nullable=False, server_default="0")
+    attempts = Column(sa.SmallInteger, nullable=False, server_default="1")
+    cache = Column(Text, nullable=True)
+    outcome = Column(Text, nullable=False, server_default="ok")
+
 class Dream(Base):
     __tablename__ = "dreams"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -77,6 +105,8 @@ class Dream(Base):
     actions: Mapped[list] = mapped_column(JSONB, default=list)
     note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    # генерируется Postgres (миграция 0010), в INSERT не участвует
+    text_tsv = Column(TSVECTOR, sa.Computed("to_tsvector('russian', coalesce(text, ''))", persisted=True))
 
     user: Mapped["User"] = relationship(back_populates="dreams")
 
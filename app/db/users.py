@@ -0,0 +1,55 @@
+# app/db/users.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.cache import TTLCache
+from app.db.base import SessionLocal
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    """Лёгкая копия строки users для хэндлеров (без ORM-сессии)."""
+    id: int
+    tg_id: int
+    username: Optional[str]
+    tz: str
+    is_premium: bool
+
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "50000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+_cache: TTLCache[int, UserRecord] = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# один запрос вместо SELECT + INSERT + COMMIT + refresh; новые пользователи — сразу премиум
+_UPSERT_SQL = text("""
+    INSERT INTO users (tg_id, username, is_premium)
+    VALUES (:tg, :username, true)
+    ON CONFLICT (tg_id) DO UPDATE SET username = EXCLUDED.username
+    RETURNING id, tg_id, username, tz, is_premium
+""")
+
+
+def get_or_create_user(tg_id: int, username: Optional[str] = None) -> UserRecord:
+    """Пользователь по tg_id: из кэша, иначе upsert одним INSERT … ON CONFLICT … RETURNING."""
+    rec = _cache.get(tg_id)
+    if rec is not None and rec.username == (username or None):
+        return rec
+
+    with SessionLocal() as s:
+        row = s.execute(_UPSERT_SQL, {"tg": tg_id, "username": username or None}).one()
+        s.commit()
+
+    rec = UserRecord(id=row.id, tg_id=row.tg_id, username=row.username, tz=row.tz, is_premium=bool(row.is_premium))
+    _cache.set(tg_id, rec)
+    return rec
+
+
+def invalidate_user(tg_id: int) -> None:
+    """Сбросить кэш после изменения полей пользователя (премиум, часовой пояс, …)."""
+    _cache.pop(tg_id)
@@ -0,0 +1,286 @@
+# app/db/write_behind.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import Table, insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.db.base import SessionLocal
+from app.db.models import AstrologyProfile, Dream, LLMUsage, NumerologyProfile
+
+# копим строки не дольше FLUSH_MS или до MAX_ROWS, затем пишем пачкой
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "500"))
+# после стольких неудачных попыток подряд (БД недоступна) строки уходят в spool-файл и ждут рестарта
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+WRITE_BEHIND_SPOOL = os.getenv("WRITE_BEHIND_SPOOL", "data/write_behind.spool.jsonl")
+# строки, которые БД отвергает сами по себе (IntegrityError, DataError …): не повторяются, только для разбора
+WRITE_BEHIND_DEAD_LETTER = os.getenv("WRITE_BEHIND_DEAD_LETTER", "data/write_behind.dead.jsonl")
+
+# таблицы, которые можно писать отложенно
+TABLES: Dict[str, Table] = {
+    t.name: t for t in (Dream.__table__, NumerologyProfile.__table__, AstrologyProfile.__table__, LLMUsage.__table__)
+}
+
+Item = Tuple[str, dict]
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"not serializable: {type(value).__name__}")
+
+
+def _decode_row(table: Table, row: dict) -> dict:
+    """Обратно из spool: строки ISO -> date/datetime/time по типам колонок."""
+    out = dict(row)
+    for col in table.columns:
+        v = out.get(col.name)
+        if not isinstance(v, str):
+            continue
+        try:
+            py = col.type.python_type
+        except NotImplementedError:
+            continue
+        if py is datetime:
+            out[col.name] = datetime.fromisoformat(v)
+        elif py is date:
+            out[col.name] = date.fromisoformat(v)
+        elif py is time:
+            out[col.name] = time.fromisoformat(v)
+    return out
+
+
+def _by_table(items: List[Item]) -> Dict[str, List[Item]]:
+    out: Dict[str, List[Item]] = defaultdict(list)
+    for item in items:
+        out[item[0]].append(item)
+    return out
+
+
+def _insert_batch(items: List[Item]) -> None:
+    """Одна транзакция, по multi-row INSERT на таблицу (insertmanyvalues)."""
+    with SessionLocal() as s:
+        for table_name, rows in _by_table(items).items():
+            s.execute(insert(TABLES[table_name]), [row for _, row in rows])
+        s.commit()
+
+
+def _is_transient(e: BaseException) -> bool:
+    """Проблема соединения/сервера — имеет смысл повторить; иначе виноваты сами строки."""
+    if isinstance(e, DBAPIError) and e.connection_invalidated:
+        return True
+    return isinstance(e, (OperationalError, InterfaceError, PoolTimeoutError, OSError))
+
+
+def _salvage(items: List[Item]) -> Tuple[List[Item], List[Tuple[Item, str]]]:
+    """
+    Пачку целиком вставить не удалось: по таблицам, затем делением пополам
+    вставляем всё, что вставляется. Возвращает (строки на повтор — БД пропала
+    по ходу, отвергнутые строки с текстом ошибки).
+    """
+    retry: List[Item] = []
+    dead: List[Tuple[Item, str]] = []
+
+    def split(part: List[Item]) -> None:
+        if retry:
+            # соединение уже отвалилось — остальное не мучаем, тоже на повтор
+            retry.extend(part)
+            return
+        try:
+            _insert_batch(part)
+        except Exception as e:
+            if _is_transient(e):
+                retry.extend(part)
+            elif len(part) == 1:
+                dead.append((part[0], str(e).splitlines()[0] if str(e) else type(e).__name__))
+            else:
+                mid = len(part) // 2
+                split(part[:mid])
+                split(part[mid:])
+
+    for part in _by_table(items).values():
+        split(part)
+    return retry, dead
+
+
+class WriteBehind:
+    """
+    Отложенная пакетная запись: хэндлер сразу отвечает пользователю,
+    а строки уходят в БД пачками в фоне.
+    Недоступна БД — повтор с экспоненциальной паузой; исчерпали попытки или
+    остановились с недоступной БД — строки дописываются в spool-файл и
+    переигрываются при следующем старте. Пачку отвергли из-за данных
+    (IntegrityError, DataError …) — она делится, целые строки вставляются,
+    а отвергнутые уходят в dead-letter файл и не повторяются.
+    """
+
+    def __init__(self) -> None:
+        self._buf: List[Item] = []
+        # enqueue зовут и из потоков — срез/возврат пачки и append под одним замком
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop_ref: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enqueue(self, table_name: str, row: dict) -> None:
+        if table_name not in TABLES:
+            raise ValueError(f"write-behind: unknown table {table_name}")
+        if not self.running:
+            # фоновая запись не запущена (скрипты/тесты) — пишем сразу
+            _insert_batch([(table_name, row)])
+            return
+        with self._lock:
+            self._buf.append((table_name, row))
+            full = len(self._buf) >= WRITE_BEHIND_MAX_ROWS
+        if full:
+            self._wake()
+
+    def _wake(self) -> None:
+        # enqueue зовут и из потоков (asyncio.to_thread, джобы планировщика)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop_ref
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wakeup.set()
+        else:
+            self._loop_ref.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop_ref = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._replay_spool()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Остановить фон и дописать всё накопленное (или сбросить в spool)."""
+        if self._task is None:
+            return
+        # не cancel(): пачка, уже отданная в поток, должна дописаться, а не потеряться
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stopping = False
+        with self._lock:
+            batch, self._buf = self._buf, []
+        if batch:
+            try:
+                await asyncio.to_thread(_insert_batch, batch)
+            except Exception as e:
+                logger.error("[write-behind] final flush of {} rows failed: {}", len(batch), e)
+                await self._give_up(batch, e)
+
+    async def _pause(self, seconds: float) -> None:
+        """До следующего флаша: будят заполнившийся буфер и stop()."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _backoff(self, seconds: float) -> None:
+        """Пауза перед повтором: заполнившийся буфер её не сокращает, stop() — прерывает."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while not self._stopping and deadline > loop.time():
+            await self._pause(deadline - loop.time())
+
+    async def _loop(self) -> None:
+        attempts = 0
+        while not self._stopping:
+            await self._pause(WRITE_BEHIND_FLUSH_MS / 1000)
+            with self._lock:
+                batch, self._buf = self._buf[:WRITE_BEHIND_MAX_ROWS], self._buf[WRITE_BEHIND_MAX_ROWS:]
+            if not batch:
+                continue
+
+            try:
+                await asyncio.to_thread(_insert_batch, batch)
+                attempts = 0
+                continue
+            except Exception as e:
+                error = e
+            if _is_transient(error):
+                attempts += 1
+                if attempts < WRITE_BEHIND_MAX_ATTEMPTS:
+                    logger.warning("[write-behind] flush failed (attempt {}), retrying: {}", attempts, error)
+                    with self._lock:
+                        self._buf[:0] = batch  # вернуть в начало — порядок сохраняется
+                    await self._backoff(min(30.0, 0.5 * 2 ** attempts))
+                    continue
+                logger.error("[write-behind] giving up after {} attempts on {} rows: {}", attempts, len(batch), error)
+            else:
+                logger.warning("[write-behind] batch of {} rows rejected, splitting: {}", len(batch), error)
+            attempts = 0
+            await self._give_up(batch, error)
+
+    async def _give_up(self, batch: List[Item], error: Exception) -> None:
+        """Повторять пачку бессмысленно: вставить целые строки, остальное — в spool/dead-letter."""
+        if _is_transient(error):
+            # БД недоступна — делить нечего, всё ждёт рестарта
+            retry, dead = batch, []
+        else:
+            retry, dead = await asyncio.to_thread(_salvage, batch)
+        if retry:
+            logger.error("[write-behind] spooling {} rows", len(retry))
+            self._spool(retry)
+        if dead:
+            logger.error("[write-behind] {} rows rejected by the database -> {}", len(dead), WRITE_BEHIND_DEAD_LETTER)
+            self._dead_letter(dead)
+
+    # ---- spool / dead-letter ----
+
+    def _spool(self, items: List[Item]) -> None:
+        os.makedirs(os.path.dirname(WRITE_BEHIND_SPOOL) or ".", exist_ok=True)
+        with open(WRITE_BEHIND_SPOOL, "a", encoding="utf-8") as f:
+            for table_name, row in items:
+                f.write(json.dumps({"table": table_name, "row": row}, ensure_ascii=False, default=_encode) + "\n")
+
+    def _dead_letter(self, items: List[Tuple[Item, str]]) -> None:
+        os.makedirs(os.path.dirname(WRITE_BEHIND_DEAD_LETTER) or ".", exist_ok=True)
+        with open(WRITE_BEHIND_DEAD_LETTER, "a", encoding="utf-8") as f:
+            for (table_name, row), error in items:
+                rec = {"table": table_name, "row": row, "error": error}
+                f.write(json.dumps(rec, ensure_ascii=False, default=_encode) + "\n")
+
+    def _replay_spool(self) -> None:
+        if not os.path.exists(WRITE_BEHIND_SPOOL):
+            return
+        replay = WRITE_BEHIND_SPOOL + ".replay"
+        os.replace(WRITE_BEHIND_SPOOL, replay)
+        items: List[Item] = []
+        with open(replay, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                table = TABLES.get(rec.get("table"))
+                if table is None:
+                    continue
+                items.append((table.name, _decode_row(table, rec["row"])))
+        with self._lock:
+            self._buf.extend(items)
+        os.remove(replay)
+        logger.info("[write-behind] replaying {} spooled rows", len(items))
+
+
+# общий на процесс
+writer = WriteBehind()
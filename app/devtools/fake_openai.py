@@ -0,0 +1,281 @@
+# app/devtools/fake_openai.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from aiohttp import web
+
+# Локальный OpenAI-совместимый сервер (POST /v1/chat/completions, в т.ч. stream=true)
+# для офлайн-прогонов LLM-путей: premium_analysis, analyze_numerology, render_llm,
+# сводки статистики. Бот направляется сюда через LLM_BASE_URL:
+#
+#   python -m app.devtools.fake_openai --port 8090 --latency lognormal:800:0.5 --tps 60 --rate-429 0.05
+#   LLM_BASE_URL=http://127.0.0.1:8090/v1 LLM_DREAM_KEYS=fake LLM_NUMEROLOGY_KEYS=fake ...
+#
+# Ответы — заготовки на русском в тех же разделах, что ждут парсеры бота
+# (extract_symbols_emotions, нормализатор астропрогноза).
+
+
+# ---------------------- задержки -------------------------
+
+@dataclass
+class Latency:
+    """Задержка до первого токена, мс: fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA."""
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, *args = spec.split(":")
+        vals = [float(x) for x in args]
+        if kind == "fixed" and len(vals) == 1:
+            return cls(kind, vals[0])
+        if kind in {"uniform", "lognormal"} and len(vals) == 2:
+            return cls(kind, vals[0], vals[1])
+        raise ValueError(f"bad latency spec: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        """Секунды."""
+        if self.kind == "uniform":
+            ms = rng.uniform(self.a, self.b)
+        elif self.kind == "lognormal":
+            ms = self.a * rng.lognormvariate(0.0, self.b)
+        else:
+            ms = self.a
+        return max(0.0, ms) / 1000.0
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: Latency
+    tokens_per_second: float = 50.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+
+# ---------------------- заготовки ответов ----------------
+
+# (основа слова, символ, эмодзи, пояснение) — основа ловит падежи: «воды», «лестнице»
+_SYMBOLS = [
+    ("зме", "змея", "🐍", "скрытая угроза или обновление"),
+    ("вод", "вода", "🌊", "поток чувств и перемен"),
+    ("лестниц", "лестница", "🪜", "путь к новой ступени"),
+    ("собак", "собака", "🐕", "верность и поддержка близких"),
+    ("зеркал", "зеркало", "🪞", "взгляд на себя со стороны"),
+    ("двер", "дверь", "🚪", "новая возможность рядом"),
+    ("огн", "огонь", "🔥", "сила желаний и страсти"),
+    ("дом", "дом", "🏠", "внутренний мир и опора"),
+    ("поезд", "поезд", "🚆", "движение по выбранному пути"),
+    ("лес", "лес", "🌲", "неизвестность и поиск себя"),
+]
+_DEFAULT_SYMBOLS = [("дорога", "🛤", "поиск своего направления"), ("свет", "✨", "надежда и ясность")]
+_EMOTIONS = [
+    ("тревога", "напряжение перед переменами"),
+    ("интерес", "желание понять происходящее"),
+    ("спокойствие", "ощущение внутренней опоры"),
+    ("радость", "тёплое чувство от встречи"),
+    ("растерянность", "неясно, куда двигаться дальше"),
+]
+
+
+def dream_reply(dream_text: str, rng: random.Random) -> str:
+    """Разбор сна в формате premium_analysis: пять разделов, пункты «Символ — пояснение»."""
+    words = re.findall(r"\w+", dream_text.lower())
+    found = [
+        (key, emoji, meaning)
+        for stem, key, emoji, meaning in _SYMBOLS
+        if any(w.startswith(stem) and len(w) - len(stem) <= 3 for w in words)
+    ][:4] or _DEFAULT_SYMBOLS
+    sym_lines = [f"• {emoji} {key.capitalize()} — {meaning}" for key, emoji, meaning in found]
+    emo_lines = [f"• {e.capitalize()} — {why}" for e, why in rng.sample(_EMOTIONS, 2)]
+    retell = (dream_text.strip().split(".")[0] or "Сон о поиске пути").strip()[:200]
+    return (
+        f"📖 <b>Краткий пересказ</b>\n{retell}.\n\n"
+        "🔑 <b>Символы и мотивы</b>\n" + "\n".join(sym_lines) + "\n\n"
+        "🎭 <b>Эмоциональный фон</b>\n" + "\n".join(emo_lines) + "\n\n"
+        "🧠 <b>Возможный смысл</b>\n"
+        "Сон отражает период перемен: внутри есть и ожидание нового, и желание сохранить опору.\n\n"
+        "✅ <b>Шаги поддержки</b>\n"
+        "• Запишите, какие чувства остались после пробуждения.\n"
+        "• Выделите вечером десять минут на спокойную прогулку.\n"
+        "• Обсудите волнующую тему с близким человеком."
+    )
+
+
+def stats_reply() -> str:
+    return (
+        "Сохраняйте ровный режим сна и отмечайте повторяющиеся образы в коротких заметках.\n"
+        "Период говорит о поиске равновесия: тревога уступает место интересу к переменам."
+    )
+
+
+def numerology_reply(user_prompt: str) -> str:
+    def num(label: str) -> str:
+        m = re.search(rf"{label}[^:\n]*:\s*(\d+)", user_prompt)
+        return m.group(1) if m else "1"
+
+    return (
+        f"🔢 Число судьбы: {num('Число судьбы')}\n<i>Целеустремлённость и умение доводить дела до конца.</i>\n\n"
+        f"🏛 День рождения: {num('День рождения')}\nТалант находить общий язык с людьми.\n\n"
+        f"💜 Число души: {num('Число души')}\nВнутренняя потребность в гармонии и признании.\n\n"
+        f"🪞 Число личности: {num('Число личности')}\nОкружающие видят надёжного и спокойного человека.\n\n"
+        f"🧭 Число имени: {num('Число имени')}\nВектор — развитие через творчество и общение.\n\n"
+        f"📆 Личный год: {num('Личный год')}\nГод завершения старых дел и подготовки к новому циклу.\n\n"
+        "🎯 Фокус на месяц\n1. Разобрать отложенные задачи;\n2. Договориться о важной встрече;\n3. Выделить время на отдых.\n\n"
+        "<b>Итог:</b> сочетание чисел помогает опираться на опыт и смело начинать новое."
+    )
+
+
+def astrology_reply(user_prompt: str) -> str:
+    sign = re.search(r"Солнечный знак:\s*(.+)", user_prompt)
+    phase = re.search(r"Фаза Луны:\s*(.+)", user_prompt)
+    sign_s = sign.group(1).strip() if sign else "Овен"
+    phase_s = phase.group(1).strip() if phase else "Растущая Луна 🌔"
+    return (
+        f"<b>Астропрогноз на день для {sign_s} ({phase_s})</b>\n\n"
+        "✨ Фокус 1\nДень подходит для спокойного планирования и разговоров о главном.\n\n"
+        "✨ Фокус 2\nЭнергия Луны поддерживает начинания, связанные с домом и близкими.\n\n"
+        "✨ Фокус 3\nУделите время телу: прогулка или лёгкая тренировка вернут ясность.\n\n"
+        "⚠️ Предостережение:\nНе принимайте поспешных финансовых решений.\n\n"
+        "<i>🔭 Основано на солнечном знаке и текущей фазе Луны.</i>"
+    )
+
+
+def canned_reply(messages: List[dict], rng: random.Random) -> str:
+    """Выбираем заготовку по системному промпту бота."""
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "user")
+    if "нумеролог" in system:
+        return numerology_reply(user)
+    if "астролог" in system:
+        return astrology_reply(user)
+    if "Сводка:" in user:
+        return stats_reply()
+    return dream_reply(user, rng)
+
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Грубые «токены» — слова с хвостовыми пробелами; для темпа стриминга и usage."""
+    return _TOKEN_RE.findall(text)
+
+
+# ---------------------- HTTP ----------------------------
+
+class FakeOpenAI:
+    def __init__(self, cfg: FakeLLMConfig) -> None:
+        self.cfg = cfg
+        self.rng = random.Random(cfg.seed)
+        self.requests = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        app.router.add_get("/v1/models", self._models)
+        return app
+
+    def _injected_error(self) -> Optional[web.Response]:
+        roll = self.rng.random()
+        headers = {"Retry-After": f"{self.cfg.retry_after:g}"}
+        if roll < self.cfg.rate_429:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached (fake)", "type": "rate_limit_error",
+                           "code": "rate_limit_exceeded"}},
+                status=429, headers=headers,
+            )
+        if roll < self.cfg.rate_429 + self.cfg.rate_5xx:
+            return web.json_response(
+                {"error": {"message": "The server is overloaded (fake)", "type": "server_error", "code": None}},
+                status=self.rng.choice([500, 502, 503]), headers=headers,
+            )
+        return None
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "fake-gpt", "object": "model", "owned_by": "fake"}]})
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        err = self._injected_error()
+        if err is not None:
+            return err
+
+        model = body.get("model") or "fake-gpt"
+        messages = body.get("messages") or []
+        text = canned_reply(messages, self.rng)
+        tokens = split_tokens(text)
+        prompt_tokens = sum(len(split_tokens(m.get("content") or "")) for m in messages)
+        ttft = self.cfg.latency.sample(self.rng)
+        per_token = 1.0 / self.cfg.tokens_per_second if self.cfg.tokens_per_second > 0 else 0.0
+        cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + per_token * len(tokens))
+            return web.json_response({
+                "id": cid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)},
+            })
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+
+        async def send(delta: dict, finish: Optional[str] = None) -> None:
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            await resp.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        await asyncio.sleep(ttft)
+        await send({"role": "assistant", "content": ""})
+        for tok in tokens:
+            if per_token:
+                await asyncio.sleep(per_token)
+            await send({"content": tok})
+        await send({}, finish="stop")
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+
+def main(argv: List[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server for offline runs")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--latency", default="lognormal:600:0.4",
+                   help="time to first token, ms: fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA")
+    p.add_argument("--tps", type=float, default=50.0, help="tokens per second after the first one (0 — instant)")
+    p.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    p.add_argument("--rate-5xx", type=float, default=0.0, help="share of requests answered with 500/502/503")
+    p.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected errors")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args(argv)
+
+    cfg = FakeLLMConfig(
+        latency=Latency.parse(args.latency),
+        tokens_per_second=args.tps,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    web.run_app(FakeOpenAI(cfg).app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# app/devtools/fake_telegram.py
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+# Локальная подделка Telegram Bot API для нагрузочных прогонов.
+# Бот направляется сюда через TELEGRAM_API_URL (см. app.bot.main.build_bot):
+# getUpdates отдаёт синтетические апдейты, а send*/edit*/answer* только
+# записываются — по ним харнесс считает задержку ответа.
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_dream_bot",
+            "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": True}
+
+
+@dataclass
+class Call:
+    method: str
+    chat_id: Optional[int]
+    at: float  # time.perf_counter()
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+class FakeBotAPI:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081) -> None:
+        self.host = host
+        self.port = port
+        self._updates: List[dict] = []
+        self._has_updates = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self.calls: List[Call] = []
+        self._waiters: Dict[int, List[asyncio.Future]] = defaultdict(list)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ---- жизненный цикл ----
+
+    async def start(self) -> None:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        app.router.add_route("*", "/file/bot{token}/{path:.*}", self._file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        if self.port == 0:
+            # свободный порт от ОС (тесты, параллельные прогоны)
+            self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # ---- синтетические апдейты ----
+
+    def push_message(self, user_id: int, text: str) -> int:
+        """Личное сообщение от пользователя user_id; возвращает update_id."""
+        update_id = next(self._update_ids)
+        user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "username": f"user{user_id}"}
+        self._updates.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": user,
+                "text": text,
+            },
+        })
+        self._has_updates.set()
+        return update_id
+
+    def push_callback(self, user_id: int, data: str, message_id: int = 1) -> int:
+        update_id = next(self._update_ids)
+        user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+        self._updates.append({
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": BOT_USER,
+                    "text": "…",
+                },
+            },
+        })
+        self._has_updates.set()
+        return update_id
+
+    def wait_replies(self, chat_id: int, count: int) -> "asyncio.Future[List[Call]]":
+        """Future, который завершится, когда бот сделает count вызовов для chat_id (считая с этого момента)."""
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        fut.remaining = count  # type: ignore[attr-defined]
+        fut.calls = []  # type: ignore[attr-defined]
+        self._waiters[chat_id].append(fut)
+        return fut
+
+    # ---- HTTP ----
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.content_type == "application/json":
+            params.update(await request.json())
+        elif request.can_read_body:
+            form = await request.post()
+            for k, v in form.items():
+                params[k] = v if isinstance(v, str) else "<file>"
+        return params
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._params(request)
+        if method.lower() == "getupdates":
+            return self._ok(await self._get_updates(params))
+
+        chat_id = _to_int(params.get("chat_id"))
+        call = Call(method=method, chat_id=chat_id, at=time.perf_counter(), params=params)
+        self.calls.append(call)
+        if chat_id is not None:
+            self._notify(chat_id, call)
+        return self._ok(self._result(method, params, chat_id))
+
+    async def _file(self, request: web.Request) -> web.Response:
+        return web.Response(body=b"")
+
+    def _notify(self, chat_id: int, call: Call) -> None:
+        waiters = self._waiters.get(chat_id)
+        if not waiters:
+            return
+        for fut in list(waiters):
+            if fut.done():
+                waiters.remove(fut)
+                continue
+            fut.calls.append(call)
+            fut.remaining -= 1
+            if fut.remaining <= 0:
+                fut.set_result(fut.calls)
+                waiters.remove(fut)
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[dict]:
+        offset = _to_int(params.get("offset")) or 0
+        timeout = float(params.get("timeout") or 0)
+        limit = _to_int(params.get("limit")) or 100
+        # offset подтверждает всё, что младше — выбрасываем
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout > 0:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    def _result(self, method: str, params: Dict[str, Any], chat_id: Optional[int]) -> Any:
+        m = method.lower()
+        if m == "getme":
+            return BOT_USER
+        if m.startswith("send") or m in {"editmessagetext", "editmessagereplymarkup", "copymessage"}:
+            return {
+                "message_id": _to_int(params.get("message_id")) or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id or 0, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text") or params.get("caption") or "",
+            }
+        # deleteWebhook, setWebhook, answerCallbackQuery, answerInlineQuery, …
+        return True
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.Response(text=json.dumps({"ok": True, "result": result}), content_type="application/json")
+
+
+def _to_int(v: Any) -> Optional[int]:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
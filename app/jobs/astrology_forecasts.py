@@ -0,0 +1,19 @@
+# app/jobs/astrology_forecasts.py
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from app.core.astrology_service import pregenerate_forecasts
+
+# час (UTC), когда лидер готовит прогнозы на завтра
+ASTRO_PREGEN_HOUR_UTC = int(os.getenv("ASTRO_PREGEN_HOUR_UTC", "21"))
+
+
+def pregenerate_tomorrow() -> int:
+    """
+    Ночная пачка: 12 знаков на завтрашние сутки (UTC).
+    Синхронная — планировщик выполняет её в пуле потоков, не блокируя event loop.
+    """
+    tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).date()
+    return pregenerate_forecasts(tomorrow)
@@ -1,15 +1,16 @@
 # app/jobs/astrology_notifications.py
 from __future__ import annotations
-from datetime import datetime, timezone
-from typing import Iterable, Optional, Callable
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional, Callable
 
 from aiogram import Bot
-from sqlalchemy import select, update
+from loguru import logger
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from zoneinfo import ZoneInfo
 
+from app.bot.broadcast import broadcast
 from app.core.astrology_math import moon_phase
-from app.db.models import User  # путь верный в твоём проекте
 
 
 # --------- helpers ---------
@@ -17,127 +18,156 @@ from app.db.models import User  # путь верный в твоём проек
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
-def _should_fire_daily(now_local: datetime, hhmm: Optional[str]) -> bool:
+def next_daily_fire_utc(hhmm: Optional[str], tz_name: Optional[str], now_utc: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Ближайшее наступление локального времени HH:MM (строго после now) — в UTC.
+    None, если время не задано или не парсится.
+    """
     if not hhmm:
-        return False
+        return None
     try:
         hh, mm = map(int, hhmm.split(":"))
-        return now_local.hour == hh and now_local.minute == mm
+        at = time(hh, mm)
+    except Exception:
+        return None
+
+    try:
+        tz = ZoneInfo(tz_name or "UTC")
     except Exception:
-        return False
+        tz = ZoneInfo("UTC")
+
+    now_local = (now_utc or _now_utc()).astimezone(tz)
+    fire_date = now_local.date()
+    if now_local.time() >= at:
+        fire_date += timedelta(days=1)
+    # combine по локальной дате — корректно переживает переходы на летнее/зимнее время
+    return datetime.combine(fire_date, at, tzinfo=tz).astimezone(timezone.utc)
 
 
 # --------- 1) Уведомление при смене фазы Луны ---------
 
-def check_moon_phase_changes(*, bot: Bot | None, session_maker: Callable[[], Session], batch_size: int = 1000) -> None:
+# Фаза одна на всех: помним последнюю увиденную в процессе и без перехода в БД не ходим.
+_last_seen_phase: Optional[str] = None
+
+
+async def check_moon_phase_changes(*, bot: Bot | None, session_maker: Callable[[], Session]) -> None:
     """
-    Дёргать каждые 30 минут.
-    Синхронная версия под SessionLocal().
+    Запускается планировщиком ровно в момент смены фазы (next_phase_change)
+    и один раз при избрании лидера — чтобы догнать пропущенный переход.
+    Если глобальная фаза не сменилась с прошлого запуска — выходим, не трогая БД.
+    На переходе одним UPDATE … WHERE last_moon_phase IS DISTINCT FROM :phase
+    помечаем всех подписчиков и рассылаем тем, у кого фаза уже была известна
+    (у новых только инициализируем, без отправки).
     """
+    global _last_seen_phase
+
     if bot is None:
         return  # бот ещё не передан — подождём bootstrap_existing()
 
-    offset = 0
-    while True:
-        with session_maker() as s:
-            users: Iterable[User] = s.execute(
-                select(User)
-                .where(User.notify_moon_phase.is_(True))
-                .offset(offset)
-                .limit(batch_size)
-            ).scalars().all()
-
-            if not users:
-                break
-
-            now = _now_utc()
-            phase_label, day, emoji = moon_phase(now)
-
-            for u in users:
-                if hasattr(u, "remind_enabled") and not u.remind_enabled:
-                    continue
-
-                # первый запуск: инициализируем без отправки
-                if not u.last_moon_phase:
-                    s.execute(
-                        update(User)
-                        .where(User.id == u.id)
-                        .values(last_moon_phase=phase_label, last_moon_day=day)
-                    )
-                    continue
-
-                if u.last_moon_phase != phase_label:
-                    try:
-                        bot.send_message(
-                            chat_id=u.tg_id,
-                            text=(
-                                f"{emoji} Сегодня началась новая фаза Луны — <b>{phase_label}</b> {emoji}\n\n"
-                                "Загляните за свежим астропрогнозом в боте ✨"
-                            ),
-                            parse_mode="HTML",
-                        )
-                    except Exception:
-                        pass
-
-                    s.execute(
-                        update(User)
-                        .where(User.id == u.id)
-                        .values(last_moon_phase=phase_label, last_moon_day=day)
-                    )
+    phase_label, day, emoji = moon_phase(_now_utc())
+    if phase_label == _last_seen_phase:
+        return
 
-            s.commit()
+    with session_maker() as s:
+        rows = s.execute(
+            text("""
+                WITH changed AS (
+                    SELECT id, last_moon_phase AS prev_phase
+                    FROM users
+                    WHERE notify_moon_phase = true
+                      AND remind_enabled = true
+                      AND last_moon_phase IS DISTINCT FROM :phase
+                    FOR UPDATE
+                )
+                UPDATE users AS u
+                SET last_moon_phase = :phase, last_moon_day = :day
+                FROM changed AS c
+                WHERE u.id = c.id
+                RETURNING u.tg_id, c.prev_phase
+            """),
+            {"phase": phase_label, "day": day},
+        ).fetchall()
+        s.commit()
+
+    # после рестарта без смены фазы UPDATE ничего не задел — тоже считаем фазу «увиденной»
+    _last_seen_phase = phase_label
+
+    recipients = [r.tg_id for r in rows if r.prev_phase]
+    if not recipients:
+        return
 
-        offset += batch_size
+    await broadcast(
+        bot,
+        recipients,
+        f"{emoji} Сегодня началась новая фаза Луны — <b>{phase_label}</b> {emoji}\n\n"
+        "Загляните за свежим астропрогнозом в боте ✨",
+        label="moon_phase",
+    )
 
 
 # --------- 2) Ежедневное утреннее уведомление ---------
 
-def send_daily_astro_ping(*, bot: Bot | None, session_maker: Callable[[], Session], batch_size: int = 1000) -> None:
+# Если бот лежал дольше этого — «доброе утро» уже неактуально: только сдвигаем время.
+DAILY_PING_STALE = timedelta(hours=1)
+
+
+async def send_daily_astro_ping(*, bot: Bot | None, session_maker: Callable[[], Session], batch_size: int = 1000) -> None:
     """
-    Дёргать каждые 5 минут.
-    Синхронная версия под SessionLocal().
+    Дёргать раз в минуту.
+    Берём только тех, у кого next_astro_ping_utc <= now() и напоминания включены
+    (частичный индекс), в той же транзакции сдвигаем им время на следующее
+    наступление их HH:MM и шлём пинг.
+    Стоимость запуска пропорциональна числу «созревших», а не всех пользователей.
+    Следующее время считает next_daily_fire_utc(), а не SQL: битое время или
+    неизвестная зона у одного пользователя не должны ронять весь UPDATE
+    (и пинги всем остальным) — такой пользователь просто выпадает из рассылки.
     """
     if bot is None:
         return
 
-    offset = 0
     while True:
         with session_maker() as s:
-            users: Iterable[User] = s.execute(
-                select(User)
-                .where(User.notify_daily_time.isnot(None))
-                .offset(offset)
-                .limit(batch_size)
-            ).scalars().all()
-
-            if not users:
-                break
-
+            rows = s.execute(
+                text("""
+                    SELECT id, tg_id, tz, notify_daily_time, next_astro_ping_utc AS fire_at
+                    FROM users
+                    WHERE next_astro_ping_utc <= now()
+                      AND remind_enabled
+                    ORDER BY next_astro_ping_utc
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                """),
+                {"limit": batch_size},
+            ).fetchall()
             now_utc = _now_utc()
+            if rows:
+                next_at = [next_daily_fire_utc(r.notify_daily_time, r.tz, now_utc) for r in rows]
+                for r, nxt in zip(rows, next_at):
+                    if nxt is None:
+                        logger.warning("[astro-ping] user={} bad notify_daily_time={!r}, ping disabled",
+                                       r.id, r.notify_daily_time)
+                s.execute(
+                    text("""
+                        UPDATE users AS u
+                        SET next_astro_ping_utc = v.next_at
+                        FROM unnest(CAST(:ids AS integer[]), CAST(:next_at AS timestamptz[])) AS v(id, next_at)
+                        WHERE u.id = v.id
+                    """),
+                    {"ids": [r.id for r in rows], "next_at": next_at},
+                )
+            s.commit()
 
-            for u in users:
-                if hasattr(u, "remind_enabled") and not u.remind_enabled:
-                    continue
-
-                tz_str = getattr(u, "tz", None) or "UTC"
-                try:
-                    tz = ZoneInfo(tz_str)
-                except Exception:
-                    tz = ZoneInfo("UTC")
-
-                now_local = now_utc.astimezone(tz)
-                if not _should_fire_daily(now_local, u.notify_daily_time):
-                    continue
+        if not rows:
+            break
 
-                phase_label, day, emoji = moon_phase(now_utc)
+        phase_label, day, emoji = moon_phase(now_utc)
 
-                try:
-                    bot.send_message(
-                        chat_id=u.tg_id,
-                        text=f"Доброе утро! Сейчас {phase_label} {emoji}. Получить астропрогноз на сегодня?",
-                        parse_mode="HTML",
-                    )
-                except Exception:
-                    pass
+        await broadcast(
+            bot,
+            [r.tg_id for r in rows if now_utc - r.fire_at <= DAILY_PING_STALE],
+            f"Доброе утро! Сейчас {phase_label} {emoji}. Получить астропрогноз на сегодня?",
+            label="daily_astro_ping",
+        )
 
-        offset += batch_size
+        if len(rows) < batch_size:
+            break
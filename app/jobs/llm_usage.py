@@ -0,0 +1,21 @@
+# app/jobs/llm_usage.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+
+from app.db.llm_usage import LLM_USAGE_RETENTION_DAYS, prune_usage, rollup_usage
+
+
+def rollup_recent() -> None:
+    """
+    Раз в час: пересчитать итоги за вчера и сегодня (UTC) — вчерашний день
+    добирает строки, дописанные после полуночи, — и подрезать старые сырые строки.
+    Синхронная — планировщик выполняет её в пуле потоков.
+    """
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    groups = rollup_usage(today - timedelta(days=1), today)
+    pruned = prune_usage(now - timedelta(days=LLM_USAGE_RETENTION_DAYS))
+    logger.info("[llm-usage] rolled up {} groups, pruned {} raw rows", groups, pruned)
@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.nlp import EmotionsCache, SymbolsCache, analyze_dream, detect_emotions, detect_symbols, make_bigrams, normalize
+
+
+@pytest.fixture(scope="module")
+def tokenized(dream_texts):
+    out = []
+    for t in dream_texts:
+        tokens = normalize(t)
+        out.append((tokens, make_bigrams(tokens)))
+    return out
+
+
+def test_normalize(benchmark, dream_texts):
+    benchmark(lambda: [normalize(t) for t in dream_texts])
+
+
+def test_detect_symbols(benchmark, tokenized):
+    symbols = SymbolsCache(None).get()
+    benchmark(lambda: [detect_symbols(tok, bi, symbols) for tok, bi in tokenized])
+
+
+def test_detect_emotions(benchmark, tokenized):
+    emotions = EmotionsCache(None).get()
+    benchmark(lambda: [detect_emotions(tok, bi, emotions) for tok, bi in tokenized])
+
+
+def test_analyze_dream(benchmark, dream_texts):
+    # без Redis — полный путь: словари, детекторы, архетипы, кризис
+    benchmark(lambda: [analyze_dream(t) for t in dream_texts])
@@ -0,0 +1,24 @@
+from app.core.astrology_service import _sanitize_html
+from app.core.premium import _ensure_tg_html, _normalize_emotion_phrase, extract_symbols_emotions
+from app.core.telegram_html import sanitize_tg_html
+
+
+def test_extract_symbols_emotions(benchmark, premium_answers):
+    benchmark(lambda: [extract_symbols_emotions(a) for a in premium_answers])
+
+
+def test_sanitize_tg_html(benchmark, premium_answers):
+    benchmark(lambda: [sanitize_tg_html(a) for a in premium_answers])
+
+
+def test_ensure_tg_html(benchmark, premium_answers):
+    cleaned = [sanitize_tg_html(a) for a in premium_answers]  # как в premium_analysis: сначала общий санитайзер
+    benchmark(lambda: [_ensure_tg_html(a) for a in cleaned])
+
+
+def test_astrology_sanitize_html(benchmark, forecast_answers):
+    benchmark(lambda: [_sanitize_html(a, allow_tags={"b", "i"}) for a in forecast_answers])
+
+
+def test_normalize_emotion_phrase(benchmark, emotion_phrases):
+    benchmark(lambda: [_normalize_emotion_phrase(p) for p in emotion_phrases])
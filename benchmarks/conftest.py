@@ -0,0 +1,41 @@
+# benchmarks/conftest.py
+"""
+Микробенчмарки горячих функций разбора (pytest-benchmark). Файлы — bench_*.py,
+поэтому обычный прогон тестов их не подхватывает; запуск и сравнение
+с сохранённым baseline — через scripts/bench.py.
+"""
+import os
+
+import pytest
+
+from benchmarks import corpus
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _repo_root():
+    # словари nlp читаются по относительным путям data/...
+    prev = os.getcwd()
+    os.chdir(corpus.ROOT)
+    os.environ.setdefault("USE_DB_SYMBOLS", "false")
+    yield
+    os.chdir(prev)
+
+
+@pytest.fixture(scope="session", params=list(corpus.SIZES))
+def dream_texts(request):
+    return corpus.dream_texts(request.param)
+
+
+@pytest.fixture(scope="session", params=list(corpus.SIZES))
+def premium_answers(request):
+    return corpus.premium_answers(request.param)
+
+
+@pytest.fixture(scope="session")
+def forecast_answers():
+    return corpus.forecast_answers()
+
+
+@pytest.fixture(scope="session")
+def emotion_phrases():
+    return corpus.emotion_phrases()
@@ -0,0 +1,124 @@
+# benchmarks/corpus.py
+from __future__ import annotations
+
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List
+
+# Детерминированный корпус для бенчмарков: тексты снов из словарей data/
+# (символы, синонимы, ключевые слова эмоций) + «сырые» ответы LLM с тем
+# HTML-мусором, который реально приходит в санитайзеры.
+
+ROOT = Path(__file__).resolve().parent.parent
+SEED = 20240501
+
+# число предложений в тексте сна
+SIZES: Dict[str, int] = {"short": 3, "medium": 12, "long": 40}
+# detect_symbols на длинных текстах — секунды на пачку (нечёткий матч по всему словарю)
+TEXTS_PER_SIZE = 10
+
+_OPENINGS = [
+    "Мне снилось, что", "Сначала", "Потом", "Вдруг", "Помню, что", "Кажется,", "В какой-то момент",
+    "Дальше", "Под утро", "Во сне",
+]
+_PLACES = [
+    "я стою в старом доме", "я иду по ночному городу", "мы едем в поезде", "я нахожусь в школе",
+    "я оказался на берегу", "я бегу по лесной тропинке", "я поднимаюсь на крышу", "мы сидим на кухне",
+]
+_LINKS = ["рядом была", "передо мной появилась", "я увидел", "мне показали", "я держал в руках", "за мной шла"]
+_FILLER = [
+    "было очень светло", "всё происходило медленно", "кто-то звал меня по имени", "звуки были приглушены",
+    "я не мог вспомнить дорогу", "вокруг было много людей", "время будто остановилось",
+]
+_EMO_TAILS = ["в своих силах", "от встречи", "перед экзаменом", "за близких", "из-за опоздания", "и облегчение"]
+
+
+def _load(name: str):
+    with open(ROOT / "data" / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _vocab() -> tuple[List[str], List[str]]:
+    symbols = _load("symbols.ru.json")
+    emotions = _load("emotions.ru.json")
+    sym_words: List[str] = []
+    for key, info in symbols.items():
+        sym_words.append(key)
+        sym_words.extend(s for s in (info.get("synonyms") or []) if isinstance(s, str))
+    emo_words: List[str] = []
+    for val in emotions.values():
+        kws = val.get("keywords", []) if isinstance(val, dict) else val
+        emo_words.extend(k for k in kws if isinstance(k, str))
+    return sym_words, emo_words
+
+
+def _sentence(rng: random.Random, sym_words: List[str], emo_words: List[str]) -> str:
+    roll = rng.random()
+    if roll < 0.45:
+        s = f"{rng.choice(_OPENINGS)} {rng.choice(_PLACES)}, {rng.choice(_LINKS)} {rng.choice(sym_words)}"
+    elif roll < 0.75:
+        s = f"{rng.choice(_OPENINGS)} {rng.choice(_FILLER)}, и мне было {rng.choice(emo_words)}"
+    else:
+        s = f"{rng.choice(_OPENINGS)} {rng.choice(_FILLER)}"
+    s = s[0].upper() + s[1:]
+    return s + rng.choice([".", ".", ".", "!", "…"])
+
+
+def dream_texts(size: str, n: int = TEXTS_PER_SIZE, seed: int = SEED) -> List[str]:
+    rng = random.Random(f"{seed}:{size}")
+    sym_words, emo_words = _vocab()
+    return [" ".join(_sentence(rng, sym_words, emo_words) for _ in range(SIZES[size])) for _ in range(n)]
+
+
+def _dirty(html: str, rng: random.Random) -> str:
+    """То, что LLM иногда присылает вместо разрешённых <b>/<i>: абзацы, списки, br, strong."""
+    out = []
+    for block in html.split("\n\n"):
+        lines = block.split("\n")
+        head, items = lines[0], lines[1:]
+        if items and all(l.startswith("•") for l in items) and rng.random() < 0.5:
+            body = "<ul>" + "".join(f"<li>{l.lstrip('• ')}</li>" for l in items) + "</ul>"
+        else:
+            body = "<br>".join(items)
+        head = head.replace("<b>", "<strong>").replace("</b>", "</strong>") if rng.random() < 0.3 else head
+        out.append(f"<p>{head}<br/>{body}</p>" if rng.random() < 0.6 else f"{head}\n{body}")
+    if rng.random() < 0.1:
+        out.append('<script>alert("x")</script>')
+    return "\n\n".join(out)
+
+
+def premium_answers(size: str, n: int = TEXTS_PER_SIZE, seed: int = SEED) -> List[str]:
+    """Ответы в формате premium_analysis (как их отдаёт фейковый LLM), половина — с HTML-мусором."""
+    from app.devtools.fake_openai import dream_reply
+
+    rng = random.Random(f"{seed}:html:{size}")
+    out = []
+    for text in dream_texts(size, n, seed):
+        answer = dream_reply(text, rng)
+        out.append(_dirty(answer, rng) if rng.random() < 0.5 else answer)
+    return out
+
+
+def forecast_answers(n: int = TEXTS_PER_SIZE, seed: int = SEED) -> List[str]:
+    from app.core.astrology_math import SIGNS
+    from app.devtools.fake_openai import astrology_reply
+
+    rng = random.Random(f"{seed}:astro")
+    out = []
+    for i in range(n):
+        prompt = f"Солнечный знак: {SIGNS[i % len(SIGNS)]}\nФаза Луны: Растущая Луна 🌔"
+        out.append(_dirty(astrology_reply(prompt), rng))
+    return out
+
+
+def emotion_phrases(n: int = 200, seed: int = SEED) -> List[str]:
+    """Левые части пунктов «Эмоциональный фон»: «уверенности в своих силах», «тревога за близких»."""
+    rng = random.Random(f"{seed}:emo")
+    _, emo_words = _vocab()
+    singles = [w for w in emo_words if re.fullmatch(r"[а-яё]+", w)]
+    return [
+        f"{rng.choice(singles)} {rng.choice(_EMO_TAILS)}" if rng.random() < 0.6 else rng.choice(singles)
+        for _ in range(n)
+    ]
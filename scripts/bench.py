@@ -0,0 +1,65 @@
+"""
+Бенчмарки функций разбора снов/HTML (benchmarks/bench_*.py) с сохранением baseline
+и гейтом на регрессию.
+
+    python -m scripts.bench run                 # просто прогнать и показать таблицу
+    python -m scripts.bench save                # записать baseline (JSON в benchmarks/baselines/)
+    python -m scripts.bench check --max 15      # сравнить с последним baseline; min хуже на >15% — exit 1
+
+Baseline хранится по машине (pytest-benchmark кладёт его в подпапку вида
+Linux-CPython-3.11-64bit), поэтому сравнивать имеет смысл на той же машине/раннере,
+где он был записан.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+STORAGE = ROOT / "benchmarks" / "baselines"
+
+
+def pytest_args(cmd: str, *, name: str, field: str, max_regression: float, extra: List[str]) -> List[str]:
+    args = [
+        str(ROOT / "benchmarks"),
+        "-o", "python_files=bench_*.py",
+        "-p", "no:cacheprovider",
+        "--benchmark-only",
+        f"--benchmark-storage=file://{STORAGE}",
+        "--benchmark-columns=min,median,mean,stddev,rounds",
+        "--benchmark-sort=name",
+    ]
+    if cmd == "save":
+        args.append(f"--benchmark-save={name}")
+    elif cmd == "check":
+        args += ["--benchmark-compare", f"--benchmark-compare-fail={field}:{max_regression:g}%"]
+    return args + extra
+
+
+def main(argv: List[str] | None = None) -> int:
+    import pytest
+
+    p = argparse.ArgumentParser(description="Run parser benchmarks, save a baseline or check for regressions")
+    p.add_argument("cmd", choices=["run", "save", "check"])
+    p.add_argument("--name", default="baseline", help="suffix of the saved baseline file")
+    p.add_argument("--max", dest="max_regression", type=float, default=15.0,
+                   help="allowed slowdown vs. the baseline, percent")
+    # min меньше всего шумит на общих раннерах; median/mean — если машина выделенная
+    p.add_argument("--field", default="min", choices=["min", "median", "mean"])
+    args, extra = p.parse_known_args(argv)
+
+    from pytest_benchmark.session import PerformanceRegression
+
+    try:
+        return int(pytest.main(pytest_args(
+            args.cmd, name=args.name, field=args.field, max_regression=args.max_regression, extra=extra,
+        )))
+    except PerformanceRegression:
+        # список регрессий pytest-benchmark уже напечатал
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Нагрузочный прогон бота целиком (апдейт → middleware → хэндлер → ответ)
+без Telegram: бот смотрит в локальный фейковый Bot API (app.devtools.fake_telegram).
+
+    PREMIUM_MODE=stub python -m scripts.loadtest --users 200 --rps 50
+    python -m scripts.loadtest --users 50 --rps 20 --json out.json
+
+Нужны БД (DATABASE_URL, миграции применены) и, по желанию, Redis для FSM.
+PREMIUM_MODE=stub, чтобы не ходить в настоящий LLM.
+Пользователи синтетические: id начиная с --user-id-base.
+
+Задержка шага (апдейт → последний ожидаемый вызов Bot API) записывается на хэндлер,
+который этот апдейт обработал (модуль.функция, как в метриках): отчёт — по парам
+(шаг, хэндлер), так что провал FSM (текст сна ушёл не в тот хэндлер) тоже виден.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.bot.middlewares.metrics import _handler_name
+
+# (имя шага, текст сообщения, сколько вызовов send*/edit* ждём в ответ)
+SCENARIO: List[Tuple[str, str, int]] = [
+    ("start", "/start", 2),
+    ("log_dream", "✍ Записать сон", 1),
+    ("dream_text", "", 2),  # текст сна подставляется случайный
+    ("journal", "📜 Мои сны", 1),
+    ("symbol", "/symbol змея", 1),
+]
+
+_PLACES = ["в старом доме", "на берегу моря", "в школе", "в лесу", "в незнакомом городе", "в поезде"]
+_IMAGES = ["змея", "вода", "лестница", "собака", "зеркало", "дверь", "огонь", "ребёнок", "экзамен"]
+_FEELINGS = ["было страшно", "чувствовал радость", "была тревога", "было спокойно", "злился"]
+
+
+def dream_text(rng: random.Random) -> str:
+    a, b = rng.sample(_IMAGES, 2)
+    return f"Мне снилось, что я {rng.choice(_PLACES)}, рядом {a}, потом появилась {b}. {rng.choice(_FEELINGS).capitalize()}."
+
+
+class Pacer:
+    """Общий темп: шаги всех пользователей стартуют не чаще rps в секунду."""
+
+    def __init__(self, rps: float) -> None:
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next = time.perf_counter()
+        self._lock = asyncio.Lock()
+
+    async def slot(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.perf_counter()
+            self._next = max(self._next, now)
+            delay = self._next - now
+            self._next += self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class HandlerTrace(BaseMiddleware):
+    """Внутренний middleware: какой хэндлер обработал апдейт (update_id -> модуль.функция)."""
+
+    def __init__(self) -> None:
+        self.by_update: Dict[int, str] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update = data.get("event_update")
+        if update is not None:
+            self.by_update[update.update_id] = _handler_name(data.get("handler"))
+        return await handler(event, data)
+
+    def pop(self, update_id: int) -> str:
+        # апдейт, не дошедший ни до одного хэндлера (отфильтрован/потерян)
+        return self.by_update.pop(update_id, "unhandled")
+
+
+Key = Tuple[str, str]  # (шаг, хэндлер)
+
+
+@dataclass
+class Stats:
+    latencies: Dict[Key, List[float]] = field(default_factory=dict)
+    timeouts: Dict[Key, int] = field(default_factory=dict)
+
+    def add(self, step: str, handler: str, seconds: float) -> None:
+        self.latencies.setdefault((step, handler), []).append(seconds)
+
+    def timeout(self, step: str, handler: str) -> None:
+        self.timeouts[(step, handler)] = self.timeouts.get((step, handler), 0) + 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    idx = max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+def summarize(stats: Stats, wall: float) -> Dict[str, dict]:
+    """Ключ отчёта — "шаг handler"; шаги в порядке сценария, внутри — хэндлеры по алфавиту."""
+    out: Dict[str, dict] = {}
+    order = {s: i for i, (s, _, _) in enumerate(SCENARIO)}
+    keys = sorted(set(stats.latencies) | set(stats.timeouts), key=lambda k: (order.get(k[0], len(order)), k[1]))
+    for step, handler in keys:
+        vals = sorted(stats.latencies.get((step, handler), []))
+        out[f"{step} {handler}"] = {
+            "step": step,
+            "handler": handler,
+            "count": len(vals),
+            "timeouts": stats.timeouts.get((step, handler), 0),
+            "p50_ms": round(percentile(vals, 50) * 1000, 1),
+            "p90_ms": round(percentile(vals, 90) * 1000, 1),
+            "p99_ms": round(percentile(vals, 99) * 1000, 1),
+            "max_ms": round((vals[-1] if vals else 0.0) * 1000, 1),
+            "throughput_rps": round(len(vals) / wall, 2) if wall else 0.0,
+        }
+    total = sum(v["count"] for v in out.values())
+    out["_total"] = {"count": total, "wall_s": round(wall, 2), "throughput_rps": round(total / wall, 2) if wall else 0.0}
+    return out
+
+
+def print_report(report: Dict[str, dict]) -> None:
+    rows = [r for key, r in report.items() if not key.startswith("_")]
+    width = max([len("handler")] + [len(r["handler"]) for r in rows])
+    head = (f"{'step':<12}{'handler':<{width + 2}}{'count':>7}{'timeouts':>9}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rps':>8}")
+    print(head)
+    print("-" * len(head))
+    for r in rows:
+        print(
+            f"{r['step']:<12}{r['handler']:<{width + 2}}{r['count']:>7}{r['timeouts']:>9}{r['p50_ms']:>9}"
+            f"{r['p90_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}{r['throughput_rps']:>8}"
+        )
+    t = report["_total"]
+    print(f"\n{t['count']} steps in {t['wall_s']} s — {t['throughput_rps']} steps/s")
+
+
+async def run_user(
+    api, trace: HandlerTrace, user_id: int, pacer: Pacer, stats: Stats, rng: random.Random, step_timeout: float,
+) -> None:
+    for step, text, expect in SCENARIO:
+        await pacer.slot()
+        replies = api.wait_replies(user_id, expect)
+        started = time.perf_counter()
+        update_id = api.push_message(user_id, text or dream_text(rng))
+        try:
+            calls = await asyncio.wait_for(replies, timeout=step_timeout)
+        except asyncio.TimeoutError:
+            stats.timeout(step, trace.pop(update_id))
+            return  # дальше сценарий этого пользователя не имеет смысла
+        stats.add(step, trace.pop(update_id), calls[-1].at - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, dict]:
+    from app.devtools.fake_telegram import FakeBotAPI
+
+    api = FakeBotAPI(port=args.port)
+    await api.start()
+
+    # бот читает адрес API при импорте — выставляем до него
+    os.environ["TELEGRAM_API_URL"] = api.base_url
+    os.environ.setdefault("BOT_TOKEN", "123456:LOADTEST")
+    from app.bot.main import build_bot, build_dispatcher
+    from app.db.write_behind import writer
+
+    bot = build_bot()
+    dp = build_dispatcher()
+    trace = HandlerTrace()
+    for name in ("message", "callback_query"):
+        dp.observers[name].middleware(trace)
+    writer.start()
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=1, handle_signals=False))
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    pacer = Pacer(args.rps)
+    started = time.perf_counter()
+    try:
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int) -> None:
+            async with sem:
+                await run_user(api, trace, args.user_id_base + i, pacer, stats, rng, args.step_timeout)
+
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+        wall = time.perf_counter() - started
+    finally:
+        await dp.stop_polling()
+        await asyncio.gather(polling, return_exceptions=True)
+        await writer.stop()
+        await dp.storage.close()
+        await dp.fsm.events_isolation.close()
+        await bot.session.close()
+        await api.stop()
+
+    return summarize(stats, wall)
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Offline load test of the bot against a fake Bot API")
+    p.add_argument("--users", type=int, default=100, help="synthetic users, each runs the whole scenario")
+    p.add_argument("--rps", type=float, default=20.0, help="global step rate limit (0 — as fast as possible)")
+    p.add_argument("--concurrency", type=int, default=100, help="users in flight at once")
+    p.add_argument("--step-timeout", type=float, default=30.0, help="seconds to wait for the bot's replies")
+    p.add_argument("--port", type=int, default=8081, help="fake Bot API port (0 — any free one)")
+    p.add_argument("--user-id-base", type=int, default=9_000_000_000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--json", dest="json_path", help="also write the report here")
+    args = p.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if any(r.get("timeouts") for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
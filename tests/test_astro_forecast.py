@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+import app.core.astrology_service as astro
+import app.db.forecasts as forecasts
+import app.db.llm_usage as llm_usage
+from app.core.astrology_service import _with_subtitle
+
+FACTS = {"sign": "Рак", "phase": "Растущая Луна", "phase_day": 5, "phase_emoji": "🌔"}
+
+LLM_ANSWER = (
+    "<b>Астропрогноз на день для Лев (Растущая Луна 🌔)</b>\n"
+    "✨ Фокус 1\nСмелость.\n✨ Фокус 2\nДело.\n✨ Фокус 3\nОтдых.\n"
+    "⚠️ Предостережение:\nНе спешите."
+)
+
+
+def test_subtitle_goes_right_after_header():
+    body = "<b>Астропрогноз на день для Рак</b>\n\n✨ Фокус 1\nТекст"
+    out = _with_subtitle(body, FACTS, "Иванов <Иван>")
+    assert out.split("\n\n") == [
+        "<b>Астропрогноз на день для Рак</b>",
+        "Астропрогноз для Иванов &lt;Иван&gt; на 5-й день Растущая Луна 🌔",
+        "✨ Фокус 1\nТекст",
+    ]
+
+
+@pytest.fixture()
+def store(monkeypatch):
+    """Кэш прогнозов в словаре + записи llm_usage."""
+    cached, usage = {}, []
+    monkeypatch.setattr(forecasts, "get_forecast", cached.get)
+    monkeypatch.setattr(forecasts, "put_forecast", lambda key, body: cached.setdefault(key, body))
+    monkeypatch.setattr(llm_usage, "record_usage", lambda feature, **kw: usage.append(kw))
+    return cached, usage
+
+
+@pytest.fixture()
+def llm_calls(monkeypatch):
+    calls = []
+
+    def fake_llm(**kw):
+        calls.append(kw)
+        return LLM_ANSWER
+
+    monkeypatch.setattr(astro, "_call_llm", fake_llm)
+    return calls
+
+
+def _facts(sign="Лев"):
+    return dict(FACTS, sign=sign, date=date(2025, 10, 12))
+
+
+def test_forecast_body_generates_once_then_hits_the_cache(store, llm_calls):
+    cached, usage = store
+
+    body = astro.forecast_body(_facts())
+    assert len(llm_calls) == 1 and llm_calls[0]["cache"] == "miss"
+    assert body.startswith("<b>Астропрогноз на день для Лев")
+    assert "Основано на солнечном знаке" in body  # сноска добавлена
+    assert cached == {(date(2025, 10, 12), "Лев", 5, astro.PROMPT_VERSION): body}
+
+    assert astro.forecast_body(_facts()) == body
+    assert len(llm_calls) == 1
+    assert [u["cache"] for u in usage] == ["hit"]
+
+    astro.forecast_body(_facts("Дева"))  # другой знак — промах
+    assert len(llm_calls) == 2 and len(cached) == 2
+
+
+def test_without_a_key_the_demo_is_served_but_not_cached(store, monkeypatch):
+    cached, _ = store
+    monkeypatch.delenv("LLM_ASTROLOGY_KEYS", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    body = astro.forecast_body(_facts("Дева"))
+    assert body.startswith("<b>Астропрогноз на день для Дева (Растущая Луна 🌔)</b>")
+    assert "Демо-режим" in body and "Имя Фамилия" not in body
+    assert cached == {}
+
+    assert astro.pregenerate_forecasts(date(2025, 10, 13)) == 0
+    assert cached == {}
@@ -0,0 +1,84 @@
+# tests/test_astro_ping.py
+from datetime import datetime, timezone
+
+from app.jobs.astrology_notifications import next_daily_fire_utc
+
+
+def test_next_fire_later_today():
+    now = datetime(2025, 10, 1, 5, 0, tzinfo=timezone.utc)  # 08:00 в Москве
+    nxt = next_daily_fire_utc("09:30", "Europe/Moscow", now)
+    assert nxt == datetime(2025, 10, 1, 6, 30, tzinfo=timezone.utc)
+
+
+def test_next_fire_rolls_to_tomorrow_when_passed():
+    now = datetime(2025, 10, 1, 6, 30, tzinfo=timezone.utc)  # ровно 09:30 в Москве
+    nxt = next_daily_fire_utc("09:30", "Europe/Moscow", now)
+    assert nxt == datetime(2025, 10, 2, 6, 30, tzinfo=timezone.utc)
+
+
+def test_next_fire_respects_dst_switch():
+    # в ночь на 26.10.2025 Берлин переходит на зимнее время (UTC+2 -> UTC+1)
+    now = datetime(2025, 10, 25, 8, 0, tzinfo=timezone.utc)  # 10:00 по Берлину
+    nxt = next_daily_fire_utc("09:00", "Europe/Berlin", now)
+    assert nxt == datetime(2025, 10, 26, 8, 0, tzinfo=timezone.utc)
+
+
+def test_next_fire_bad_input():
+    assert next_daily_fire_utc(None, "UTC") is None
+    assert next_daily_fire_utc("25:99", "UTC") is None
+    # неизвестная зона -> UTC
+    now = datetime(2025, 10, 1, 0, 0, tzinfo=timezone.utc)
+    assert next_daily_fire_utc("07:00", "Mars/Olympus", now) == datetime(2025, 10, 1, 7, 0, tzinfo=timezone.utc)
+
+
+def test_daily_ping_survives_bad_rows(monkeypatch):
+    import asyncio
+    from datetime import timedelta
+    from types import SimpleNamespace
+
+    import app.jobs.astrology_notifications as notifications
+
+    now = datetime(2025, 10, 1, 6, 0, tzinfo=timezone.utc)
+    rows = [
+        SimpleNamespace(id=1, tg_id=101, tz="Europe/Moscow", notify_daily_time="09:00", fire_at=now),
+        SimpleNamespace(id=2, tg_id=102, tz="Mars/Olympus", notify_daily_time="07:00", fire_at=now),
+        SimpleNamespace(id=3, tg_id=103, tz="UTC", notify_daily_time="7 утра", fire_at=now),
+        SimpleNamespace(id=4, tg_id=104, tz="UTC", notify_daily_time="08:00", fire_at=now - timedelta(hours=3)),
+    ]
+    executed = []
+
+    class FakeSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, stmt, params):
+            executed.append((str(stmt), params))
+            return SimpleNamespace(fetchall=lambda: rows)
+
+        def commit(self):
+            pass
+
+    sent = []
+
+    async def fake_broadcast(bot, tg_ids, text, *, label):
+        sent.extend(tg_ids)
+
+    monkeypatch.setattr(notifications, "_now_utc", lambda: now)
+    monkeypatch.setattr(notifications, "broadcast", fake_broadcast)
+    asyncio.run(notifications.send_daily_astro_ping(bot=object(), session_maker=FakeSession, batch_size=10))
+
+    select_sql, _ = executed[0]
+    assert "remind_enabled" in select_sql
+    _, update = executed[1]
+    assert update["ids"] == [1, 2, 3, 4]
+    assert update["next_at"] == [
+        datetime(2025, 10, 2, 6, 0, tzinfo=timezone.utc),  # 09:00 МСК уже наступило
+        datetime(2025, 10, 1, 7, 0, tzinfo=timezone.utc),  # неизвестная зона -> UTC
+        None,  # битое время -> пинг выключается, остальные не страдают
+        datetime(2025, 10, 1, 8, 0, tzinfo=timezone.utc),
+    ]
+    # 104 проспал больше DAILY_PING_STALE — только сдвиг времени
+    assert sent == [101, 102, 103]
@@ -0,0 +1,45 @@
+# tests/test_broadcast.py
+import threading
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.bot import broadcast as bc
+
+
+class FakeBot:
+    def __init__(self, blocked=(), flood_once=()):
+        self.blocked = set(blocked)
+        self.flood_once = set(flood_once)
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id, text, **kw):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        if chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0)
+        self.sent.append(chat_id)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_counts_retries_and_blocked(monkeypatch):
+    disabled = []
+    threads = []
+
+    def fake_disable(ids):
+        threads.append(threading.get_ident())
+        disabled.extend(ids)
+
+    monkeypatch.setattr(bc, "disable_notifications", fake_disable)
+
+    bot = FakeBot(blocked={3}, flood_once={2})
+    stats = await bc.broadcast(bot, [1, 2, 3, 2, 4], "hi", rps=1000, concurrency=3)
+
+    assert sorted(bot.sent) == [1, 2, 4]  # дубль чата 2 отброшен
+    assert stats.total == 4
+    assert stats.sent == 3 and stats.blocked == 1 and stats.retries == 1
+    assert disabled == [3]
+    assert threads != [threading.get_ident()]  # UPDATE ушёл в поток, а не на event loop
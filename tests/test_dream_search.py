@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import app.db.dream_search as dream_search
+
+
+class RecordingSession:
+    """Пишет каждый execute; результаты запросов (кроме set_config) отдаёт по очереди."""
+
+    def __init__(self, log, results):
+        self.log, self.results = log, results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, stmt, params):
+        sql = " ".join(str(stmt).split())
+        self.log.append((sql, params))
+        rows = self.results.pop(0) if self.results and "set_config" not in sql else []
+        return SimpleNamespace(all=lambda: rows)
+
+
+def _hit(i, snippet="…"):
+    return SimpleNamespace(id=i, created_at=datetime(2025, 10, i, tzinfo=timezone.utc), snippet=snippet)
+
+
+@pytest.fixture()
+def search(monkeypatch):
+    log, results = [], []
+    monkeypatch.setattr(dream_search, "SessionLocal", lambda: RecordingSession(log, results))
+
+    def run(*rows_per_statement, **kw):
+        results.extend(rows_per_statement)
+        return dream_search.search_dreams(7, kw.pop("query", "  змея в воде "), **kw), log
+
+    return run
+
+
+def test_full_text_page_is_ranked_and_highlighted(search):
+    page, log = search([_hit(1, "<b>змея</b>"), _hit(2), _hit(3)], limit=2)
+
+    [(sql, params)] = log
+    assert "websearch_to_tsquery('russian', :q)" in sql
+    assert "d.user_id = :uid AND d.text_tsv @@ q.tsq" in sql
+    assert "ORDER BY rank DESC, d.created_at DESC, d.id DESC LIMIT :limit OFFSET :offset" in sql
+    # подсветка только по строкам страницы, поверх уже экранированного текста
+    assert "ts_headline('russian', replace(replace(replace(page.text, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'), q.tsq, :opts)" in sql
+    assert params == {"uid": 7, "q": "змея в воде", "limit": 3, "offset": 0, "opts": dream_search._HEADLINE_OPTS}
+    assert "StartSel=<b>, StopSel=</b>" in params["opts"]
+
+    assert [h.id for h in page.hits] == [1, 2]
+    assert page.hits[0].snippet == "<b>змея</b>"
+    assert page.has_more and not page.fuzzy
+
+
+def test_empty_first_page_falls_back_to_trigrams(search):
+    page, log = search([], [_hit(4)])
+
+    [(fts, _), (threshold, t_params), (fuzzy, params)] = log
+    assert "text_tsv @@" in fts
+    # порог только для текущей транзакции (is_local = true) — как SET LOCAL
+    assert threshold == "SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"
+    assert t_params == {"t": str(dream_search.SEARCH_FUZZY_THRESHOLD)}
+    assert "d.user_id = :uid AND :q <% d.text" in fuzzy
+    assert "ORDER BY sim DESC, d.created_at DESC, d.id DESC LIMIT :limit OFFSET :offset" in fuzzy
+    assert "replace(replace(replace(left(text, 300), '&', '&amp;'), '<', '&lt;'), '>', '&gt;') AS snippet" in fuzzy
+    assert params["q"] == "змея в воде"
+
+    assert [h.id for h in page.hits] == [4]
+    assert page.fuzzy and not page.has_more
+
+
+def test_next_pages_stay_in_their_mode(search):
+    # пустая не первая страница полнотекста — не повод переключаться на триграммы
+    page, log = search([], offset=5)
+    assert len(log) == 1 and not page.fuzzy and page.offset == 5
+
+    log.clear()
+    page, log = search([_hit(6)], offset=5, fuzzy=True)
+    assert [sql.split()[0] for sql, _ in log] == ["SELECT", "WITH"]
+    assert "<% d.text" in log[1][0] and "@@" not in log[1][0]
+    assert page.fuzzy and [h.id for h in page.hits] == [6]
+
+
+def test_blank_query_does_not_touch_the_db(search):
+    page, log = search(query="   ", fuzzy=True)
+    assert log == [] and page.hits == [] and page.fuzzy
+
+
+def test_escape_expression_neutralises_user_html():
+    # то же выражение, что уходит в ts_headline и в нечёткий сниппет; replace() есть и в SQLite
+    expr = dream_search._html_escape_sql(":t")
+    with create_engine("sqlite://").connect() as conn:
+        escaped = conn.execute(text(f"SELECT {expr}"), {"t": "<i>змея</i> & <b>вода</b> &amp;"}).scalar_one()
+    assert escaped == "&lt;i&gt;змея&lt;/i&gt; &amp; &lt;b&gt;вода&lt;/b&gt; &amp;amp;"
@@ -0,0 +1,88 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import app.db.dream_tags as dream_tags
+from app.bot.handlers.stats import _kb_drilldown, _parse_tag_callback, _tag_callback
+
+
+class RecordingSession:
+    def __init__(self, log, result):
+        self.log, self.result = log, result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, stmt, params):
+        self.log.append((" ".join(str(stmt).split()), params))
+        return self.result
+
+
+@pytest.fixture()
+def executed(monkeypatch):
+    log = []
+    result = SimpleNamespace(all=lambda: [], scalar_one=lambda: 3)
+    monkeypatch.setattr(dream_tags, "SessionLocal", lambda: RecordingSession(log, result))
+    return log
+
+
+def test_needle_matches_plain_and_object_elements():
+    needle = dream_tags._needle("  Змея ")
+    assert json.loads(needle["as_str"]) == ["змея"]
+    assert json.loads(needle["as_obj"]) == [{"key": "змея"}]
+    assert "змея" in needle["as_str"]  # без \\u-экранирования — как в самом jsonb
+
+
+def test_count_with_tag_uses_both_containment_forms(executed):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert dream_tags.count_with_tag(7, "symbols", "Змея", since=since) == 3
+
+    [(sql, params)] = executed
+    assert "symbols @> CAST(:as_str AS jsonb) OR symbols @> CAST(:as_obj AS jsonb)" in sql
+    assert "created_at >= :since" in sql and ":until" not in sql
+    assert params["uid"] == 7 and params["since"] == since
+    assert json.loads(params["as_str"]) == ["змея"] and json.loads(params["as_obj"]) == [{"key": "змея"}]
+
+
+def test_dreams_with_tag_period_and_limit(executed):
+    until = datetime(2025, 2, 1, tzinfo=timezone.utc)
+    assert dream_tags.dreams_with_tag(7, "emotions", "страх", until=until, limit=5) == []
+
+    [(sql, params)] = executed
+    assert "emotions @> CAST(:as_str AS jsonb) OR emotions @> CAST(:as_obj AS jsonb)" in sql
+    assert "created_at < :until" in sql and ":since" not in sql
+    assert "ORDER BY created_at DESC, id DESC LIMIT :limit" in sql
+    assert params["limit"] == 5 and params["until"] == until
+
+
+def test_top_tags_reads_both_element_shapes(executed):
+    dream_tags.top_tags(7, "symbols", n=3)
+    [(sql, params)] = executed
+    assert "WHEN 'string' THEN e #>> '{}'" in sql and "WHEN 'object' THEN e ->> 'key'" in sql
+    assert params == {"uid": 7, "n": 3}
+
+
+def test_unknown_kind_never_reaches_sql(executed):
+    with pytest.raises(ValueError):
+        dream_tags.count_with_tag(7, "symbols; DROP TABLE dreams", "x")
+    assert executed == []
+
+
+@pytest.mark.parametrize("kind, term", [("symbols", "змея"), ("emotions", "тревога"), ("symbols", "дом: старый")])
+def test_drilldown_callback_round_trip(kind, term):
+    data = _tag_callback(kind, term)
+    assert data is not None and len(data.encode("utf-8")) <= 64
+    assert _parse_tag_callback(data) == (kind, term)
+
+
+def test_drilldown_callback_limits():
+    assert _tag_callback("symbols", "я" * 40) is None  # 80 байт UTF-8 — кнопки не будет
+    assert _parse_tag_callback("stx:x:змея") is None
+    assert _parse_tag_callback("stx:s:") is None
+    kb = _kb_drilldown([("змея", 3), ("я" * 40, 2)])
+    assert [row[0].callback_data for row in kb.inline_keyboard] == ["stx:s:змея"]
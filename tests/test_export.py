@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, Table, Text, create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.db.export as export
+
+meta = MetaData()
+# те же колонки, что читает выгрузка; JSONB/tsvector на SQLite не нужны
+dreams = Table(
+    "dreams", meta,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("text", Text),
+    Column("symbols", JSON),
+    Column("emotions", JSON),
+    Column("note", Text),
+    Column("created_at", DateTime),
+)
+
+
+def _row(**kw):
+    d = {"id": 1, "user_id": 7, "created_at": datetime(2025, 10, 1, 21, 30, tzinfo=timezone.utc),
+         "text": "Сон", "symbols": [], "emotions": [], "note": None}
+    d.update(kw)
+    return SimpleNamespace(_mapping=d)
+
+
+@pytest.fixture()
+def stored(monkeypatch):
+    engine = create_engine("sqlite://")
+    meta.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(dreams), [
+            {"id": i, "user_id": 7 if i % 3 else 8, "text": f"сон {i}", "symbols": [{"key": "змея"}],
+             "emotions": ["страх"], "note": None, "created_at": datetime(2025, 10, 1) + timedelta(hours=i)}
+            for i in range(1, 8)
+        ])
+    monkeypatch.setattr(export, "SessionLocal", sessionmaker(engine))
+    monkeypatch.setattr(export, "iter_dream_batches", partial(export.iter_dream_batches, batch_size=2))
+
+
+def test_as_dict_converts_created_at_to_the_user_zone():
+    d = export._as_dict(_row(), ZoneInfo("Europe/Moscow"))
+    assert d["created_at"] == "2025-10-02T00:30:00+03:00"
+    assert export._as_dict(_row(), None)["created_at"] == "2025-10-01T21:30:00+00:00"
+    assert export._as_dict(_row(created_at=None), ZoneInfo("Europe/Moscow"))["created_at"] is None
+
+
+def test_csv_has_bom_header_and_flat_tags():
+    head, batch, tail = export._FORMATS["csv"]
+    assert head.startswith("\ufeff") and tail == ""
+    d = export._as_dict(_row(text='сон, "в кавычках"\nи перенос', symbols=[{"key": "змея"}, "вода"],
+                             emotions=["страх"], note=None), None)
+    rows = list(csv.reader(io.StringIO(head[1:] + batch([d]))))
+    assert rows[0] == list(export.FIELDS)
+    assert rows[1] == ["1", "7", "2025-10-01T21:30:00+00:00", 'сон, "в кавычках"\nи перенос', "змея, вода", "страх", ""]
+
+
+def test_jsonl_is_one_object_per_line_without_ascii_escapes():
+    rows = [export._as_dict(_row(id=i, symbols=[{"key": "змея"}]), None) for i in (1, 2)]
+    out = export._jsonl_batch(rows)
+    assert "змея" in out
+    lines = out.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2]
+    assert json.loads(lines[0])["symbols"] == [{"key": "змея"}]
+
+
+def test_html_escapes_text_and_note():
+    d = export._as_dict(_row(text="<script>x</script>\nвторая & строка", note="<b>заметка</b>",
+                             symbols=[{"key": "<змея>"}]), None)
+    out = export._html_batch([d])
+    assert "<script>" not in out and "<b>заметка</b>" not in out
+    assert "&lt;script&gt;x&lt;/script&gt;<br>вторая &amp; строка" in out
+    assert "<p><i>&lt;b&gt;заметка&lt;/b&gt;</i></p>" in out
+    assert "<p><b>Символы:</b> &lt;змея&gt;</p>" in out
+    assert "Эмоции" not in out  # пустые теги не выводятся
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        list(export.iter_export("xlsx", 7))
+
+
+def test_iter_export_streams_one_chunk_per_batch(stored):
+    chunks = list(export.iter_export("jsonl", 7))
+    assert len(chunks) == 3  # 5 снов пользователя 7 пачками по 2
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode("utf-8").splitlines()]
+    assert [r["id"] for r in rows] == [1, 2, 4, 5, 7]
+    assert {r["user_id"] for r in rows} == {7}
+    assert rows[0]["symbols"] == [{"key": "змея"}]
+
+
+def test_iter_export_wraps_batches_in_head_and_tail(stored, tmp_path):
+    chunks = list(export.iter_export("html"))  # все пользователи
+    assert chunks[0].decode("utf-8") == export._HTML_HEAD
+    assert chunks[-1] == b"</body></html>\n"
+    assert b"".join(chunks).count(b"<article>") == 7
+
+    path = tmp_path / "dreams.csv"
+    size = export.export_to_file("csv", str(path), 8)
+    data = path.read_bytes()
+    assert size == len(data) and data.startswith(b"\xef\xbb\xbf")
+    assert [r[0] for r in csv.reader(io.StringIO(data.decode("utf-8-sig")))] == ["id", "3", "6"]
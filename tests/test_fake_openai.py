@@ -0,0 +1,40 @@
+import random
+
+from app.core.premium import extract_symbols_emotions
+from app.devtools.fake_openai import Latency, canned_reply, dream_reply, split_tokens
+
+
+def test_dream_reply_parses_like_a_real_premium_answer():
+    text = dream_reply("Мне снилась змея у воды, я стоял на лестнице.", random.Random(1))
+    symbols, emotions = extract_symbols_emotions(text)
+    assert symbols == ["змея", "вода", "лестница"]
+    assert len(emotions) == 2
+
+
+def test_canned_reply_picks_template_by_system_prompt():
+    rng = random.Random(0)
+    numerology = canned_reply(
+        [{"role": "system", "content": "Ты профессиональный нумеролог."},
+         {"role": "user", "content": "• Число судьбы: 7\n• Личный год (2025): 3"}],
+        rng,
+    )
+    assert numerology.startswith("🔢 Число судьбы: 7")
+    assert "Личный год: 3" in numerology
+
+    astro = canned_reply(
+        [{"role": "system", "content": "Ты выступаешь в роли астролога"},
+         {"role": "user", "content": "Солнечный знак: Рак\nФаза Луны: Полнолуние 🌕"}],
+        rng,
+    )
+    assert astro.startswith("<b>Астропрогноз на день для Рак (Полнолуние 🌕)</b>")
+
+
+def test_tokens_rejoin_to_the_text():
+    text = "Сон  о поиске\nпути."
+    assert "".join(split_tokens(text)) == text
+
+
+def test_latency_spec():
+    assert Latency.parse("fixed:250").sample(random.Random(0)) == 0.25
+    lo_hi = Latency.parse("uniform:100:200").sample(random.Random(0))
+    assert 0.1 <= lo_hi <= 0.2
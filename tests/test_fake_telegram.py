@@ -0,0 +1,156 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+
+from app.devtools.fake_telegram import FakeBotAPI
+from scripts.loadtest import HandlerTrace, Stats, print_report, summarize
+
+
+async def on_start(message: Message):
+    await message.answer("привет")
+    await message.answer("меню")
+
+
+async def on_text(message: Message):
+    await message.answer(f"эхо: {message.text}")
+
+
+async def on_button(call: CallbackQuery):
+    await call.answer()
+    await call.message.edit_text(call.data)
+
+
+def _bot(api: FakeBotAPI) -> Bot:
+    return Bot("123456:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(api.base_url)))
+
+
+def _dispatcher(trace: HandlerTrace) -> Dispatcher:
+    router = Router()
+    router.message.register(on_start, Command("start"))
+    router.message.register(on_text, F.text)
+    router.callback_query.register(on_button)
+    dp = Dispatcher()
+    dp.include_router(router)
+    for name in ("message", "callback_query"):
+        dp.observers[name].middleware(trace)
+    return dp
+
+
+def test_bot_methods_are_recorded_per_chat():
+    async def run():
+        api = FakeBotAPI(port=0)
+        await api.start()
+        bot = _bot(api)
+        try:
+            assert api.port != 0
+            me = await bot.get_me()
+            assert me.username == "fake_dream_bot"
+            replies = api.wait_replies(42, 2)
+            sent = await bot.send_message(42, "раз")
+            await bot.send_message(7, "чужой чат")
+            assert not replies.done()
+            await bot.edit_message_text("два", chat_id=42, message_id=sent.message_id)
+            calls = await asyncio.wait_for(replies, 1)
+        finally:
+            await bot.session.close()
+            await api.stop()
+        assert [c.method for c in calls] == ["sendMessage", "editMessageText"]
+        assert calls[0].params["text"] == "раз"
+        assert calls[0].at <= calls[1].at
+        assert [c.chat_id for c in api.calls] == [None, 42, 7, 42]  # getMe без чата
+
+    asyncio.run(run())
+
+
+def test_get_updates_long_polls_and_drops_acknowledged():
+    async def run():
+        api = FakeBotAPI(port=0)
+        await api.start()
+        bot = _bot(api)
+        try:
+            assert await bot.get_updates(timeout=0) == []
+            # long-poll просыпается, как только приходит апдейт
+            poll = asyncio.create_task(bot.get_updates(timeout=5))
+            await asyncio.sleep(0.05)
+            first = api.push_message(42, "сон")
+            second = api.push_callback(42, "tag:s:змея")
+            updates = await asyncio.wait_for(poll, 1)
+            assert [u.update_id for u in updates] == [first, second]
+            assert updates[0].message.text == "сон"
+            assert updates[0].message.from_user.id == 42
+            assert updates[1].callback_query.data == "tag:s:змея"
+            # offset подтверждает всё, что младше
+            rest = await bot.get_updates(offset=second, timeout=0)
+            assert [u.update_id for u in rest] == [second]
+            assert await bot.get_updates(offset=second + 1, timeout=0) == []
+            assert not [c for c in api.calls if c.method.lower() == "getupdates"]
+        finally:
+            await bot.session.close()
+            await api.stop()
+
+    asyncio.run(run())
+
+
+def test_replies_are_attributed_to_the_handler():
+    async def run():
+        api = FakeBotAPI(port=0)
+        await api.start()
+        bot = _bot(api)
+        trace = HandlerTrace()
+        dp = _dispatcher(trace)
+        polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=1, handle_signals=False))
+        try:
+            replies = api.wait_replies(42, 2)
+            start = api.push_message(42, "/start")
+            await asyncio.wait_for(replies, 5)
+            replies = api.wait_replies(42, 1)
+            text = api.push_message(42, "змея")
+            echo = await asyncio.wait_for(replies, 5)
+            replies = api.wait_replies(42, 1)  # answerCallbackQuery идёт без chat_id
+            button = api.push_callback(42, "ok")
+            await asyncio.wait_for(replies, 5)
+        finally:
+            await dp.stop_polling()
+            await asyncio.gather(polling, return_exceptions=True)
+            await bot.session.close()
+            await api.stop()
+        assert echo[0].params["text"] == "эхо: змея"
+        assert trace.pop(start) == "test_fake_telegram.on_start"
+        assert trace.pop(text) == "test_fake_telegram.on_text"
+        assert trace.pop(button) == "test_fake_telegram.on_button"
+        assert trace.pop(button) == "unhandled"
+
+    asyncio.run(run())
+
+
+def test_report_is_keyed_by_step_and_handler(capsys):
+    stats = Stats()
+    for ms in (10, 20, 30):
+        stats.add("dream_text", "dreams.on_dream_text", ms / 1000)
+    stats.add("dream_text", "common.fallback", 0.005)
+    stats.timeout("start", "unhandled")
+    stats.add("start", "start.cmd_start", 0.001)
+
+    report = summarize(stats, wall=2.0)
+
+    assert list(report) == [
+        "start start.cmd_start",
+        "start unhandled",
+        "dream_text common.fallback",
+        "dream_text dreams.on_dream_text",
+        "_total",
+    ]
+    row = report["dream_text dreams.on_dream_text"]
+    assert (row["step"], row["handler"], row["count"], row["p50_ms"], row["max_ms"]) == (
+        "dream_text", "dreams.on_dream_text", 3, 20.0, 30.0,
+    )
+    assert report["start unhandled"]["timeouts"] == 1
+    assert report["_total"]["count"] == 5
+
+    print_report(report)
+    out = capsys.readouterr().out
+    assert "dreams.on_dream_text" in out and "common.fallback" in out
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+
+from app.db.journal import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip_keeps_microseconds():
+    cur = (datetime(2025, 10, 8, 21, 14, 5, 123456, tzinfo=timezone.utc), 987654)
+    raw = encode_cursor(cur)
+    assert decode_cursor(raw) == cur
+
+
+def test_cursor_fits_callback_data():
+    cur = (datetime(2099, 12, 31, 23, 59, 59, 999999, tzinfo=timezone.utc), 2**31 - 1)
+    assert len(f"dj:o:{encode_cursor(cur)}".encode()) <= 64
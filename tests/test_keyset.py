@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import Column, Date, Integer, MetaData, Table, create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.keyset import iter_keyset
+
+meta = MetaData()
+items = Table(
+    "items", meta,
+    Column("id", Integer, primary_key=True),
+    Column("day", Date, nullable=False),
+)
+
+
+@pytest.fixture()
+def session_maker():
+    engine = create_engine("sqlite://")
+    meta.create_all(engine)
+    with engine.begin() as conn:
+        # по 3 строки на день — day неуникален, граница пачки падает внутрь дня
+        conn.execute(insert(items), [{"id": i, "day": date(2025, 1, 1 + (i - 1) // 3)} for i in range(1, 24)])
+    return sessionmaker(engine)
+
+
+def _ids(batches):
+    return [[r.id for r in batch] for batch in batches]
+
+
+def test_full_batches_and_final_short_batch(session_maker):
+    batches = _ids(iter_keyset(session_maker, select(items.c.id), items.c.id, batch_size=10))
+    assert [len(b) for b in batches] == [10, 10, 3]
+    assert sum(batches, []) == list(range(1, 24))
+
+
+def test_exact_multiple_ends_with_an_empty_probe(session_maker):
+    stmt = select(items.c.id).where(items.c.id <= 20)
+    assert [len(b) for b in _ids(iter_keyset(session_maker, stmt, items.c.id, batch_size=10))] == [10, 10]
+
+
+def test_start_after_resumes(session_maker):
+    batches = _ids(iter_keyset(session_maker, select(items.c.id), items.c.id, batch_size=5, start_after=17))
+    assert batches == [[18, 19, 20, 21, 22], [23]]
+
+
+def test_non_unique_key_with_tiebreak(session_maker):
+    stmt = select(items.c.day, items.c.id)
+    key = (items.c.day, items.c.id)
+    # 4 не делится на 3: каждая граница пачки разрезает день
+    batches = _ids(iter_keyset(session_maker, stmt, key, batch_size=4))
+    flat = sum(batches, [])
+    assert flat == list(range(1, 24))  # ни пропусков, ни дублей
+    assert [len(b) for b in batches] == [4, 4, 4, 4, 4, 3]
+
+    resumed = _ids(iter_keyset(session_maker, stmt, key, batch_size=4, start_after=(date(2025, 1, 3), 7)))
+    assert sum(resumed, []) == list(range(8, 24))
+
+
+def test_rows_updated_between_pages_are_not_skipped(session_maker):
+    seen = []
+    for batch in iter_keyset(session_maker, select(items.c.id), items.c.id, batch_size=7):
+        seen.extend(r.id for r in batch)
+        with session_maker() as s:  # вызывающий меняет строки между страницами
+            s.execute(items.update().where(items.c.id.in_([r.id for r in batch])).values(day=date(2030, 1, 1)))
+            s.commit()
+    assert seen == list(range(1, 24))
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app.core.llm_client as llm_client
+import app.db.llm_usage as llm_usage
+import app.db.write_behind as write_behind
+from app.core.metrics import key_label
+from app.core.llm_router import Feature
+
+
+class _FakeCompletions:
+    def __init__(self, fail: Exception | None = None):
+        self.fail = fail
+
+    def create(self, **kwargs):
+        if self.fail:
+            raise self.fail
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ответ"))],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=45),
+        )
+
+
+def _fake_client(fail=None):
+    return SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(fail)))
+
+
+@pytest.fixture()
+def recorded(monkeypatch):
+    rows = []
+    monkeypatch.setattr(llm_usage, "record_usage", lambda feature, **kw: rows.append({"feature": feature, **kw}))
+    monkeypatch.setattr(llm_client.router, "next_creds", lambda feature: ("sk-test-1234567890", "gpt-test"))
+    return rows
+
+
+def test_chat_records_tokens_and_cache(monkeypatch, recorded):
+    monkeypatch.setattr(llm_client, "_client_for", lambda key: _fake_client())
+    assert llm_client.chat(Feature.NUMEROLOGY, [], cache="miss") == "ответ"
+
+    [row] = recorded
+    assert row["feature"] == "numerology"
+    assert row["model"] == "gpt-test"
+    assert row["api_key"] == key_label("sk-test-1234567890")
+    assert not row["api_key"].startswith("sk-")  # в журнал ни одного символа ключа
+    assert (row["prompt_tokens"], row["completion_tokens"]) == (120, 45)
+    assert row["cache"] == "miss" and row["outcome"] == "ok" and row["attempts"] == 1
+
+
+def test_chat_records_failure_once(monkeypatch, recorded):
+    monkeypatch.setattr(llm_client, "_client_for", lambda key: _fake_client(fail=llm_client.OpenAIError("bad")))
+    with pytest.raises(RuntimeError):
+        llm_client.chat(Feature.STATS, [])
+    [row] = recorded
+    assert row["feature"] == "stats" and row["outcome"] == "error"
+
+
+def test_write_behind_accepts_rows_from_threads(monkeypatch):
+    flushed = []
+    monkeypatch.setattr(write_behind, "_insert_batch", lambda items: flushed.extend(items))
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ROWS", 2)
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_FLUSH_MS", 60_000)
+
+    async def run():
+        w = write_behind.WriteBehind()
+        monkeypatch.setattr(w, "_replay_spool", lambda: None)
+        w.start()
+        # как из asyncio.to_thread: буфер заполнен — будим цикл потокобезопасно
+        await asyncio.to_thread(lambda: [w.enqueue("llm_usage", {"feature": "dream"}) for _ in range(2)])
+        for _ in range(50):
+            if flushed:
+                break
+            await asyncio.sleep(0.01)
+        await w.stop()
+
+    asyncio.run(run())
+    assert [t for t, _ in flushed] == ["llm_usage", "llm_usage"]
+
+
+def test_write_behind_loses_no_rows_from_threads_during_flush(monkeypatch):
+    flushed = []
+    monkeypatch.setattr(write_behind, "_insert_batch", lambda items: flushed.extend(items))
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ROWS", 50)
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_FLUSH_MS", 1)
+    w = write_behind.WriteBehind()
+    late = []
+
+    class RacyBuffer(list):
+        """Поток дописывает строку ровно между срезом буфера на пачку и его переприсвоением."""
+
+        def __getitem__(self, idx):
+            rest = list.__getitem__(self, idx)
+            if isinstance(idx, slice) and idx.start is not None and not late:
+                # хвост уже посчитан, буфер ещё не переприсвоен
+                t = threading.Thread(target=w.enqueue, args=("llm_usage", {"feature": "late"}))
+                t.start()
+                t.join(0.05)  # под замком поток ждёт — и дописывает уже в новый буфер
+                late.append(t)
+            return rest
+
+    threads, per_thread = 8, 500
+
+    def produce(t):
+        for i in range(per_thread):
+            w.enqueue("llm_usage", {"feature": f"{t}:{i}"})
+
+    async def run():
+        monkeypatch.setattr(w, "_replay_spool", lambda: None)
+        w.start()
+        w._buf = RacyBuffer([("llm_usage", {"feature": "first"})])
+        await asyncio.gather(*(asyncio.to_thread(produce, t) for t in range(threads)))
+        for _ in range(200):
+            if len(flushed) >= threads * per_thread + 2:
+                break
+            await asyncio.sleep(0.01)
+        await w.stop()
+
+    asyncio.run(run())
+    features = [row["feature"] for _, row in flushed]
+    assert "late" in features and "first" in features
+    assert len(features) == len(set(features)) == threads * per_thread + 2
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.core import lunar
+from app.core.lunar import FULL, NEW, PhaseTable, phase_instants
+
+UTC = timezone.utc
+
+
+@pytest.fixture(scope="module")
+def table():
+    # явный диапазон: общая phase_table() строится вокруг текущего года,
+    # и даты 2025-го со временем из неё выпадут
+    return PhaseTable(2024, 2026)
+
+
+def test_meeus_example_new_moon_1977():
+    # Meeus, пример 49.a: новолуние 18.02.1977 03:37:42 TD
+    ts = phase_instants(np.array([-283.0]))[0]
+    expected = datetime(1977, 2, 18, 3, 37, 42, tzinfo=UTC) - timedelta(seconds=69)
+    assert abs(ts - expected.timestamp()) < 60
+
+
+def test_table_matches_published_phases_2025(table):
+    full_at, code = table.next_transition(datetime(2025, 10, 1, tzinfo=UTC))
+    assert code == FULL
+    assert abs(full_at - datetime(2025, 10, 7, 3, 47, tzinfo=UTC)) < timedelta(minutes=2)
+
+    new_at, code = table.next_transition(full_at + timedelta(days=10))
+    assert code == NEW
+    assert abs(new_at - datetime(2025, 10, 21, 12, 25, tzinfo=UTC)) < timedelta(minutes=2)
+
+
+def test_last_and_next_bracket_the_moment(table):
+    t = datetime(2026, 3, 10, 12, tzinfo=UTC)
+    last_at, _ = table.last_transition(t)
+    next_at, _ = table.next_transition(t)
+    assert last_at <= t < next_at
+    assert timedelta(days=6) < next_at - last_at < timedelta(days=9)
+
+
+def test_next_phase_change_is_where_label_flips(monkeypatch, table):
+    from app.core.astrology_math import moon_phase, next_phase_change
+
+    monkeypatch.setattr(lunar, "_table", table)  # astrology_math берёт таблицу через phase_table()
+    t = datetime(2025, 10, 10, tzinfo=UTC)
+    for _ in range(8):
+        at = next_phase_change(t)
+        assert at > t
+        assert moon_phase(at - timedelta(seconds=1))[0] == moon_phase(t)[0]
+        assert moon_phase(at + timedelta(seconds=1))[0] != moon_phase(t)[0]
+        t = at + timedelta(seconds=1)
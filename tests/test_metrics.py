@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.api.main import app
+from app.bot.middlewares.metrics import MetricsMiddleware
+from app.bot.reminders import _job_label
+from app.core.metrics import key_label
+from app.db.instrumentation import _verb
+
+
+async def on_dream_text(event, data):
+    return "ok"
+
+
+async def broken(event, data):
+    raise ValueError("boom")
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_middleware_records_latency_and_errors():
+    mw = MetricsMiddleware("message")
+    handler_name = f"{__name__.rsplit('.', 1)[-1]}.on_dream_text"
+    before = _sample("dreambot_handler_duration_seconds_count", event="message", handler=handler_name)
+
+    data = {"handler": SimpleNamespace(callback=on_dream_text)}
+    assert asyncio.run(mw(on_dream_text, object(), data)) == "ok"
+    assert _sample("dreambot_handler_duration_seconds_count", event="message", handler=handler_name) == before + 1
+
+    err_name = f"{__name__.rsplit('.', 1)[-1]}.broken"
+    with pytest.raises(ValueError):
+        asyncio.run(mw(broken, object(), {"handler": SimpleNamespace(callback=broken)}))
+    assert _sample("dreambot_handler_errors_total", event="message", handler=err_name, error="ValueError") == 1
+    assert _sample("dreambot_handlers_in_flight", event="message") == 0
+
+
+def test_metric_labels_stay_low_cardinality():
+    assert _verb("  select 1") == "SELECT"
+    assert _verb("INSERT INTO dreams ...") == "INSERT"
+    assert _job_label("remind_user_42") == "remind_user"
+    assert _job_label("daily_astro_ping") == "daily_astro_ping"
+
+
+def test_metrics_endpoint_requires_token(monkeypatch):
+    import app.api.auth as auth
+
+    client = TestClient(app)
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "")
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "scrape")
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "admin")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    for token in ("scrape", "admin"):
+        resp = client.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200
+        assert "dreambot_llm_request_duration_seconds" in resp.text
+
+
+def test_llm_key_label_leaks_nothing_of_the_key():
+    key = "sk-proj-abcdef1234567890XYZW"
+    label = key_label(key)
+    assert len(label) == 8 and label == key_label(key) != key_label(key + "1")
+    assert key[:7] not in label and key[-4:] not in label
+    assert key_label(None) == "<empty>"
@@ -0,0 +1,70 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import app.core.numerology_service as numerology
+import app.db.interpretations as interpretations
+import app.db.llm_usage as llm_usage
+from app.core.cache import TTLCache
+
+
+@pytest.fixture()
+def calls(monkeypatch):
+    # общая таблица кэша — в SQLite (тот же INSERT … ON CONFLICT … RETURNING)
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE numerology_interpretations (cache_key TEXT PRIMARY KEY, body_html TEXT NOT NULL)"))
+    monkeypatch.setattr(interpretations, "SessionLocal", sessionmaker(engine))
+    monkeypatch.setattr(interpretations, "_local", TTLCache(100, 3600))
+
+    made = []
+
+    def fake_chat(feature, messages, temperature=0.3, **kwargs):
+        made.append(messages[1]["content"])
+        return f"🔢 Число судьбы: интерпретация #{len(made)}"
+
+    monkeypatch.setattr(numerology, "chat", fake_chat)
+    monkeypatch.setattr(llm_usage, "record_usage", lambda *a, **kw: None)
+    return made
+
+
+def _hits(result):
+    return REGISTRY.get_sample_value("dreambot_llm_cache_requests_total", {"cache": "numerology", "result": result}) or 0.0
+
+
+def test_same_numbers_hit_the_cache(calls):
+    hits, misses = _hits("hit"), _hits("miss")
+    first = numerology.analyze_numerology("Иван Петров", "01.02.1990", "м")
+    second = numerology.analyze_numerology("Иван Петров", "01.02.1990", "м")
+
+    assert len(calls) == 1
+    assert first == second
+    assert "Иван Петров" in second and "#1" in second
+    assert (_hits("hit") - hits, _hits("miss") - misses) == (1, 1)
+
+
+def test_process_cache_miss_falls_back_to_the_shared_table(calls, monkeypatch):
+    numerology.analyze_numerology("Иван Петров", "01.02.1990", "м")
+    monkeypatch.setattr(interpretations, "_local", TTLCache(100, 3600))  # другая реплика
+    numerology.analyze_numerology("Иван Петров", "01.02.1990", "м")
+    assert len(calls) == 1
+
+
+def test_different_gender_or_numbers_miss(calls):
+    numerology.analyze_numerology("Иван Петров", "01.02.1990", "м")
+    numerology.analyze_numerology("Иван Петров", "01.02.1990", "ж")
+    numerology.analyze_numerology("Иван Петров", "02.02.1990", "м")
+    assert len(calls) == 3
+
+
+def test_cache_key_covers_every_number_and_gender():
+    nums = {
+        "destiny_number": 1, "birth_day_number": 2, "soul_number": 3, "personality_number": 4,
+        "name_number": 5, "year": 2025, "personal_year": 6,
+    }
+    base = numerology._cache_key(nums, "М")
+    assert base == numerology._cache_key(nums, "м")  # пол без учёта регистра
+    assert numerology._cache_key(nums, None) != base
+    for field in nums:
+        assert numerology._cache_key({**nums, field: nums[field] + 1}, "м") != base, field
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.auth as auth
+import app.core.profiling as profiling
+from app.api.main import app
+from app.bot.middlewares.profiling import SlowUpdateMiddleware
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profile_returns_folded_stacks_and_is_exclusive():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        results = {}
+
+        def second():
+            time.sleep(0.05)
+            try:
+                profiling.profile(0.1)
+            except profiling.ProfilerBusy:
+                results["busy"] = True
+
+        t = threading.Thread(target=second)
+        t.start()
+        folded = profiling.profile(0.3, interval_ms=2)
+        t.join()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert results == {"busy": True}
+    lines = [l for l in folded.splitlines() if l.startswith("busy;")]
+    assert lines and any("busy_loop" in l for l in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+async def slow_handler(event, data):
+    await asyncio.to_thread(time.sleep, 0.2)
+    return "ok"
+
+
+async def fast_handler(event, data):
+    return "ok"
+
+
+def test_slow_update_capture(tmp_path):
+    watch = profiling.SlowUpdateWatch(50, sample_ms=5, directory=str(tmp_path))
+    mw = SlowUpdateMiddleware("message", watch)
+    update = SimpleNamespace(model_dump=lambda **kw: {"update_id": 7, "message": {"text": "сон"}})
+
+    async def run():
+        await mw(fast_handler, object(), {"handler": SimpleNamespace(callback=fast_handler), "event_update": update})
+        await mw(slow_handler, object(), {"handler": SimpleNamespace(callback=slow_handler), "event_update": update})
+        for _ in range(100):
+            if profiling.list_captures(str(tmp_path)):
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    [name] = profiling.list_captures(str(tmp_path))
+    capture = profiling.read_capture(name, str(tmp_path))
+    assert capture["handler"] == "test_profiling.slow_handler"
+    assert capture["elapsed_ms"] >= 200
+    assert capture["update"]["update_id"] == 7
+    assert any("slow_handler" in f for f in capture["awaiting"])
+    assert capture["samples"] > 0 and capture["stacks"]
+    assert profiling.read_capture("../secrets.json", str(tmp_path)) is None
+
+
+def test_debug_endpoints_require_admin(monkeypatch, tmp_path):
+    client = TestClient(app)
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "")
+    assert client.post("/debug/profile?seconds=0.05").status_code == 404
+
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    assert client.post("/debug/profile?seconds=0.05", headers={"Authorization": "Bearer nope"}).status_code == 401
+    resp = client.post("/debug/profile?seconds=0.05&interval_ms=5&idle=true", headers=headers)
+    assert resp.status_code == 200
+    assert "attachment" in resp.headers["content-disposition"]
+
+    (tmp_path / "20240101T000000.000000-dreams.on_dream_text.json").write_text(json.dumps({"elapsed_ms": 1}))
+    monkeypatch.setattr("app.api.profiling.list_captures", lambda: profiling.list_captures(str(tmp_path)))
+    monkeypatch.setattr("app.api.profiling.read_capture", lambda n: profiling.read_capture(n, str(tmp_path)))
+    assert client.get("/debug/slow-updates", headers=headers).json()["captures"] == [
+        "20240101T000000.000000-dreams.on_dream_text.json"
+    ]
+    assert client.get("/debug/slow-updates/missing.json", headers=headers).status_code == 404
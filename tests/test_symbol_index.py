@@ -0,0 +1,75 @@
+from app.core.symbol_index import SymbolIndex
+
+SYMBOLS = {
+    "вода": {"synonyms": ["река", "море", "Волна"], "meaning": "эмоции"},
+    "море": {"synonyms": ["океан"], "meaning": "бескрайность"},
+    "волк": {"synonyms": ["Ёж"], "meaning": "инстинкты"},
+}
+
+
+def test_lookup_by_key_and_synonym():
+    ix = SymbolIndex(SYMBOLS)
+    assert ix.lookup("Вода") == "вода"
+    assert ix.lookup("река") == "вода"
+    assert ix.lookup("еж") == "волк"  # ё -> е
+    assert ix.lookup("пустыня") is None
+
+
+def test_key_wins_over_foreign_synonym():
+    ix = SymbolIndex(SYMBOLS)
+    assert ix.lookup("море") == "море"
+
+
+def test_suggest_by_prefix_without_duplicates():
+    ix = SymbolIndex(SYMBOLS)
+    assert ix.suggest("во") == ["вода", "волк"]
+    assert ix.suggest("ок") == ["море"]
+    assert ix.suggest("я") == []
+
+
+def _inline(monkeypatch, symbols):
+    from app.bot.handlers import symbol
+    from app.core.cache import TTLCache
+
+    ix = SymbolIndex(symbols)
+    monkeypatch.setattr(symbol, "get_symbol_index", lambda: ix)
+    monkeypatch.setattr(symbol, "_inline_cache", TTLCache(100, 60))
+    return symbol
+
+
+def test_inline_results_are_cached_per_normalised_prefix(monkeypatch):
+    symbol = _inline(monkeypatch, SYMBOLS)
+    calls = []
+    real_suggest = SymbolIndex.suggest
+    monkeypatch.setattr(SymbolIndex, "suggest", lambda self, *a, **kw: calls.append(a) or real_suggest(self, *a, **kw))
+
+    first = symbol.inline_results("Во")
+    assert [r.title for r in first] == ["вода", "волк"]
+    assert symbol.inline_results("во") is first  # тот же список, без повторной сборки
+    assert symbol.inline_results(" ВО ") is first
+    assert len(calls) == 1
+    assert [r.title for r in symbol.inline_results("ок")] == ["море"]
+    assert len(calls) == 2
+
+
+def test_inline_article_ids_are_stable(monkeypatch):
+    ids = [r.id for r in _inline(monkeypatch, SYMBOLS).inline_results("во")]
+    again = [r.id for r in _inline(monkeypatch, SYMBOLS).inline_results("во")]  # новый кэш
+    assert ids == again and len(set(ids)) == 2
+    assert all(len(i) <= 64 for i in ids)  # лимит Bot API на id результата
+
+
+def test_inline_article_text_is_escaped(monkeypatch):
+    symbol = _inline(monkeypatch, {
+        "змея": {"meaning": "<b>опасность</b> & мудрость", "actions": ["не <i>спорить</i>"]},
+    })
+    [article] = symbol.inline_results("Зме")
+    assert symbol.inline_results("зме") == [article]
+    content = article.input_message_content
+    assert content.parse_mode == "HTML"
+    assert content.message_text == (
+        "<b>Символ: змея</b>\n"
+        "Значение: &lt;b&gt;опасность&lt;/b&gt; &amp; мудрость\n\n"
+        "Действия:\n• не &lt;i&gt;спорить&lt;/i&gt;"
+    )
+    assert article.description == "<b>опасность</b> & мудрость"  # описание — обычный текст, не HTML
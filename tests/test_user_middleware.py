@@ -0,0 +1,26 @@
+import asyncio
+from types import SimpleNamespace
+
+import app.bot.middlewares.user as user_mw
+
+
+async def handler(event, data):
+    return data["db_user"]
+
+
+def test_injects_db_user(monkeypatch):
+    monkeypatch.setattr(user_mw, "get_or_create_user", lambda tg_id, username: ("user", tg_id, username))
+    data = {"event_from_user": SimpleNamespace(id=42, username="sonya", is_bot=False)}
+    assert asyncio.run(user_mw.UserMiddleware()(handler, object(), data)) == ("user", 42, "sonya")
+
+
+def test_skips_updates_without_a_human_sender(monkeypatch):
+    def fail(*args):
+        raise AssertionError("must not touch the database")
+
+    monkeypatch.setattr(user_mw, "get_or_create_user", fail)
+    mw = user_mw.UserMiddleware()
+    # без from_user и от ботов хэндлер (которому нужен db_user) не вызывается вовсе
+    assert asyncio.run(mw(handler, object(), {})) is None
+    bot_sender = {"event_from_user": SimpleNamespace(id=1087968824, username="GroupAnonymousBot", is_bot=True)}
+    assert asyncio.run(mw(handler, object(), bot_sender)) is None
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import app.db.write_behind as write_behind
+
+
+class FakeDB:
+    """_insert_batch, который отвергает строки с "bad" и может «пропасть»."""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+        self.calls = 0
+
+    def insert(self, items):
+        self.calls += 1
+        if self.down:
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+        if any(row.get("text") == "bad" for _, row in items):
+            raise IntegrityError("INSERT", {}, Exception("violates check constraint\nDETAIL: ..."))
+        self.rows.extend(items)
+
+
+@pytest.fixture()
+def db(monkeypatch, tmp_path):
+    fake = FakeDB()
+    monkeypatch.setattr(write_behind, "_insert_batch", fake.insert)
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_SPOOL", str(tmp_path / "spool.jsonl"))
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_DEAD_LETTER", str(tmp_path / "dead.jsonl"))
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_FLUSH_MS", 5)
+    return fake
+
+
+def _lines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(l) for l in f if l.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _run(items, *, settle=0.1):
+    async def run():
+        w = write_behind.WriteBehind()
+        w.start()
+        for table, row in items:
+            w.enqueue(table, row)
+        await asyncio.sleep(settle)
+        await w.stop()
+
+    asyncio.run(run())
+
+
+def test_bad_row_is_dead_lettered_and_the_rest_inserted(db):
+    items = [("dreams", {"text": f"ok {i}"}) for i in range(10)]
+    items[3] = ("dreams", {"text": "bad"})
+    items.append(("llm_usage", {"feature": "dream"}))
+    _run(items)
+
+    assert sorted(row.get("text") or row["feature"] for _, row in db.rows) == sorted(
+        [f"ok {i}" for i in range(10) if i != 3] + ["dream"]
+    )
+    [dead] = _lines(write_behind.WRITE_BEHIND_DEAD_LETTER)
+    assert dead["table"] == "dreams" and dead["row"] == {"text": "bad"}
+    assert dead["error"].startswith("(builtins.Exception) violates check constraint")
+    assert _lines(write_behind.WRITE_BEHIND_SPOOL) == []
+
+
+def test_rejected_batch_is_not_retried(db, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 5)
+    _run([("dreams", {"text": "bad"})])
+    # одна попытка пачкой, без повторов с паузой; строка одна — сразу в dead-letter
+    assert db.calls == 2
+    assert len(_lines(write_behind.WRITE_BEHIND_DEAD_LETTER)) == 1
+
+
+def test_unreachable_database_spools_for_replay(db, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 2)
+    db.down = True
+    _run([("dreams", {"text": "ok"}), ("dreams", {"text": "bad"})], settle=0.8)
+
+    assert [r["row"]["text"] for r in _lines(write_behind.WRITE_BEHIND_SPOOL)] == ["ok", "bad"]
+    assert _lines(write_behind.WRITE_BEHIND_DEAD_LETTER) == []
+
+    # следующий старт: БД снова жива — целая строка доезжает, плохая уходит в dead-letter
+    db.down = False
+    _run([])
+    assert [row["text"] for _, row in db.rows] == ["ok"]
+    assert [r["row"]["text"] for r in _lines(write_behind.WRITE_BEHIND_DEAD_LETTER)] == ["bad"]
+    assert _lines(write_behind.WRITE_BEHIND_SPOOL) == []
+
+
+def test_dream_is_queued_even_if_the_reply_fails(monkeypatch):
+    from aiogram.exceptions import TelegramBadRequest
+    from aiogram.methods import SendMessage
+
+    import app.bot.main as bot_main
+
+    queued = []
+    monkeypatch.setattr(bot_main, "premium_analysis", lambda text: "<b>Разбор</b>")
+    monkeypatch.setattr(bot_main.writer, "enqueue", lambda table, row: queued.append((table, row)))
+
+    class Msg:
+        async def answer(self, text, **kw):
+            raise TelegramBadRequest(method=SendMessage(chat_id=1, text=text), message="can't parse entities")
+
+    user = bot_main.UserRecord(id=5, tg_id=1, username=None, tz="UTC", is_premium=False)
+    with pytest.raises(TelegramBadRequest):
+        asyncio.run(bot_main._analyze_and_reply(Msg(), "Снилась вода", user))
+    [(table, row)] = queued
+    assert table == "dreams" and row["user_id"] == 5 and row["text"] == "Снилась вода"